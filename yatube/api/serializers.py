@@ -0,0 +1,27 @@
+"""Компактные представления моделей для JSON API.
+
+Поля плоские, связанные объекты — строковыми ключами (username, slug),
+чтобы ответ не тянул лишних запросов и весил меньше.
+"""
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.thumbnail or None,
+        'comments': post.comments_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'post': comment.post_id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(12):
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Пост {i}'
+            )
+        cls.post = Post.objects.create(author=cls.user, text='Без группы')
+        Comment.objects.create(post=cls.post, author=cls.reader, text='к')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def test_feeds(self):
+        """ ленты отдают компактный JSON с курсорами """
+        feeds = {
+            reverse('api:v1:posts'): (self.guest_client, 10),
+            reverse(
+                'api:v1:group_posts', kwargs={'slug': 'test-slug'}
+            ): (self.guest_client, 10),
+            reverse(
+                'api:v1:profile', kwargs={'username': 'auth'}
+            ): (self.guest_client, 10),
+            reverse('api:v1:follow_index'): (self.reader_client, 10),
+            reverse(
+                'api:v1:comments', kwargs={'post_id': self.post.pk}
+            ): (self.guest_client, 1),
+        }
+        for url, (client, amount) in feeds.items():
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertEqual(len(data['results']), amount)
+                self.assertIsNone(data['previous'])
+                self.assertIn('ETag', response)
+
+    def test_cursor_walks_feed(self):
+        """ ссылки next проходят ленту без повторов """
+        url, seen = reverse('api:v1:posts'), []
+        while url:
+            data = self.guest_client.get(url).json()
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), Post.objects.count())
+
+    def test_post_detail(self):
+        """ пост сериализуется со счетчиком комментариев """
+        response = self.guest_client.get(
+            reverse('api:v1:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.json(), {
+            'id': self.post.pk,
+            'text': 'Без группы',
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'auth',
+            'group': None,
+            'image': None,
+            'comments': 1,
+        })
+        self.assertIn('Last-Modified', response)
+
+    def test_not_modified(self):
+        """ неизменная страница отдается как 304 без сериализации """
+        url = reverse('api:v1:posts')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.assertMaxQueries(
+            1, self.guest_client.get, url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_content(self):
+        """ правка поста и новый комментарий меняют ETag """
+        url = reverse('api:v1:post_detail', kwargs={'post_id': self.post.pk})
+        feed_url = reverse('api:v1:posts')
+        etag = self.guest_client.get(url)['ETag']
+        feed_etag = self.guest_client.get(feed_url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, text='еще')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comments'], 2)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка'
+        post.save()
+        response = self.guest_client.get(
+            feed_url, HTTP_IF_NONE_MATCH=feed_etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'Правка')
+
+    def test_etag_changes_with_author(self):
+        """ переименование автора меняет ETag ленты и поста """
+        urls = (
+            reverse('api:v1:posts'),
+            reverse('api:v1:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        etags = [self.guest_client.get(url)['ETag'] for url in urls]
+        self.user.username = 'renamed'
+        self.user.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('renamed', response.content.decode())
+
+    def test_errors(self):
+        """ ошибки отдаются в JSON с нужным статусом """
+        cases = {
+            reverse('api:v1:follow_index'): 401,
+            reverse('api:v1:group_posts', kwargs={'slug': 'nope'}): 404,
+            reverse('api:v1:profile', kwargs={'username': 'nope'}): 404,
+            reverse('api:v1:post_detail', kwargs={'post_id': 999}): 404,
+            reverse('api:v1:comments', kwargs={'post_id': 999}): 404,
+        }
+        for url, status in cases.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+        response = self.guest_client.post(reverse('api:v1:posts'))
+        self.assertEqual(response.status_code, 405)
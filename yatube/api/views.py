@@ -0,0 +1,176 @@
+"""JSON API только для чтения: ленты, пост и комментарии.
+
+Каждый ответ несет ETag и Last-Modified. Состояние страницы — id,
+время правки и счетчики ее записей, а также общие версии 'users' и
+'groups' — известно сразу после выборки, поэтому на повторный запрос
+без изменений отдается 304 еще до сериализации.
+"""
+import hashlib
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+
+from posts.feed import FollowFeedPaginator
+from posts.fragments import feed_key, feed_state
+from posts.freshness import SHARED
+from posts.models import Comment, Group, Post, User
+from posts.utils import AMOUNT, CursorPaginator
+
+from .serializers import serialize_comment, serialize_post
+
+API_VERSION = 'v1'
+JSON_OPTIONS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_OPTIONS)
+
+
+def error(status, detail):
+    return json_response({'detail': detail}, status)
+
+
+def post_state(post):
+    return post.pk, post.updated_at.timestamp(), post.comments_count
+
+
+def comment_state(comment):
+    return comment.pk, comment.created.timestamp()
+
+
+def conditional(request, state, last_modified, render):
+    """Ответ render() с ETag и Last-Modified или 304, если не изменился.
+
+    В токен входят общие версии 'users' и 'groups': username автора и
+    slug группы есть в ответе, но не в state записей.
+    """
+    versions, changed = feed_state(*SHARED)
+    digest = hashlib.md5(
+        repr((API_VERSION, versions, state)).encode()
+    ).hexdigest()
+    etag = f'"{digest}"'
+    timestamp = (
+        int(max(last_modified.timestamp(), changed))
+        if last_modified else None
+    )
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = json_response(render())
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+def page_response(request, paginator, serialize, state, modified):
+    page = paginator.page(request.GET.get('cursor'))
+    rows = list(page)
+    page_state = (
+        page.has_next(),
+        page.has_previous(),
+        tuple(state(row) for row in rows),
+    )
+    last_modified = max(
+        (getattr(row, modified) for row in rows), default=None
+    )
+
+    def render():
+        return {
+            'results': [serialize(row) for row in rows],
+            'next': (
+                f'{request.path}?cursor={paginator.next_cursor}'
+                if page.has_next() else None
+            ),
+            'previous': (
+                f'{request.path}?cursor={paginator.previous_cursor}'
+                if page.has_previous() else None
+            ),
+        }
+
+    return conditional(request, page_state, last_modified, render)
+
+
+def posts_response(request, paginator):
+    return page_response(
+        request, paginator, serialize_post, post_state, 'updated_at'
+    )
+
+
+@require_GET
+def index(request):
+    posts = Post.objects.select_related('author', 'group')
+    return posts_response(
+        request, CursorPaginator(posts, AMOUNT, 'pub_date', feed_key('index'))
+    )
+
+
+@require_GET
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error(404, 'Группа не найдена')
+    posts = group.posts.select_related('author', 'group')
+    return posts_response(
+        request,
+        CursorPaginator(
+            posts, AMOUNT, 'pub_date', feed_key('group', group.pk)
+        ),
+    )
+
+
+@require_GET
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error(404, 'Пользователь не найден')
+    posts = author.posts.select_related('author', 'group')
+    return posts_response(
+        request,
+        CursorPaginator(
+            posts, AMOUNT, 'pub_date', feed_key('profile', author.pk)
+        ),
+    )
+
+
+@require_GET
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error(401, 'Требуется авторизация')
+    return posts_response(
+        request, FollowFeedPaginator(request.user, AMOUNT)
+    )
+
+
+@require_GET
+def post_detail(request, post_id):
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None:
+        return error(404, 'Пост не найден')
+    return conditional(
+        request, post_state(post), post.updated_at,
+        lambda: serialize_post(post),
+    )
+
+
+@require_GET
+def comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Пост не найден')
+    comment_list = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).order_by('-created', '-pk')
+    return page_response(
+        request,
+        CursorPaginator(
+            comment_list, AMOUNT, 'created', feed_key('comments', post_id)
+        ),
+        serialize_comment,
+        comment_state,
+        'created',
+    )
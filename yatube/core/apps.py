@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.test.signals import setting_changed
+
+        from . import querylog, urlbuilder
+
+        connection_created.connect(querylog.install)
+        setting_changed.connect(urlbuilder.setting_changed)
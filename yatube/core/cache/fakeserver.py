@@ -0,0 +1,158 @@
+"""Встроенный в процесс сервер с подмножеством протокола Redis.
+
+Нужен, чтобы тесты и локальная разработка работали с
+core.cache.redis.RedisCache без настоящего Redis. EVAL выполняет
+только скрипты, которые шлет RedisCache:
+
+    server = FakeRedisServer().start()
+    CACHES['default']['LOCATION'] = server.url
+    ...
+    server.stop()
+"""
+import socketserver
+import threading
+import time
+
+from .redis import INCR_EXISTING, ResponseError, read_reply
+
+
+def encode_reply(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, ResponseError):
+        return b'-%s\r\n' % str(value).encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, str):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(
+            encode_reply(item) for item in value
+        )
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+class Storage:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def _alive(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, command, *args):
+        handler = getattr(self, f'cmd_{command.decode().lower()}', None)
+        if handler is None:
+            return ResponseError(f'ERR unknown command {command!r}')
+        with self.lock:
+            return handler(*args)
+
+    def cmd_ping(self, *args):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_get(self, key):
+        entry = self._alive(key)
+        return None if entry is None else entry[0]
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        if b'PX' in options:
+            milliseconds = int(options[options.index(b'PX') + 1])
+            expires = time.monotonic() + milliseconds / 1000
+        if b'NX' in options and self._alive(key) is not None:
+            return None
+        self.data[key] = (value, expires)
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def cmd_exists(self, *keys):
+        return sum(self._alive(key) is not None for key in keys)
+
+    def cmd_incrby(self, key, delta):
+        entry = self._alive(key)
+        value, expires = entry if entry else (b'0', None)
+        try:
+            value = int(value) + int(delta)
+        except ValueError:
+            return ResponseError('ERR value is not an integer')
+        self.data[key] = (str(value).encode(), expires)
+        return value
+
+    def cmd_eval(self, script, numkeys, *args):
+        # Lua нет: понимаем только скрипты самого RedisCache.
+        if script.decode() != INCR_EXISTING:
+            return ResponseError('ERR unsupported script')
+        key, delta = args
+        if self._alive(key) is None:
+            return None
+        return self.cmd_incrby(key, delta)
+
+    def cmd_pexpire(self, key, milliseconds):
+        entry = self._alive(key)
+        if entry is None:
+            return 0
+        expires = time.monotonic() + int(milliseconds) / 1000
+        self.data[key] = (entry[0], expires)
+        return 1
+
+    def cmd_persist(self, key):
+        entry = self._alive(key)
+        if entry is None or entry[1] is None:
+            return 0
+        self.data[key] = (entry[0], None)
+        return 1
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        return 'OK'
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, ResponseError):
+                return
+            reply = self.server.storage.execute(*command)
+            self.wfile.write(encode_reply(reply))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), RequestHandler)
+        self.storage = Storage()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,70 @@
+"""Кэш, считающий попадания и промахи для метрик запроса.
+
+Оборачивает другой алиас из CACHES (OPTIONS['TARGET']) и передает ему
+все вызовы; чтения отмечаются в core.metrics, если текущий запрос
+попал в выборку.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.instrumented.InstrumentedCache',
+            'OPTIONS': {'TARGET': 'backend'},
+        },
+        'backend': {...},
+    }
+"""
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core import metrics
+
+
+class InstrumentedCache(BaseCache):
+    def __init__(self, name, params):
+        super().__init__(params)
+        self.target_alias = params.get('OPTIONS', {}).get('TARGET', 'backend')
+
+    @property
+    def target(self):
+        return caches[self.target_alias]
+
+    def get(self, key, default=None, version=None):
+        value = self.target.get(key, version=version)
+        hit = value is not None
+        metrics.cache_result(hit, not hit)
+        return default if value is None else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.target.get_many(keys, version=version)
+        metrics.cache_result(len(found), len(keys) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.target.set(key, value, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.target.set_many(data, timeout, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.target.add(key, value, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.target.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        return self.target.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self.target.decr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self.target.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self.target.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.target.has_key(key, version=version)
+
+    def clear(self):
+        self.target.clear()
@@ -0,0 +1,289 @@
+"""Кэш-бэкенд, говорящий на протоколе Redis (RESP).
+
+Сторонних зависимостей нет: соединения открываются сокетами и
+переиспользуются через общий для процесса пул.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.redis.RedisCache',
+            'LOCATION': 'redis://127.0.0.1:6379/0',
+            'OPTIONS': {'MAX_CONNECTIONS': 10, 'SOCKET_TIMEOUT': 1},
+        },
+    }
+"""
+import pickle
+import queue
+import socket
+import threading
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+# incr одним атомарным вызовом: отдельные EXISTS и INCRBY между собой
+# могли пропустить истечение ключа, и INCRBY создал бы его заново без
+# срока жизни.
+INCR_EXISTING = (
+    "if redis.call('EXISTS', KEYS[1]) == 1 then "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1]) end "
+    "return false"
+)
+
+
+# Команды, повтор которых после отправки не меняет результат. Остальные
+# (EVAL из incr, SET ... NX из add) повторяются, только если запрос не
+# ушел на сервер: иначе он мог выполниться дважды.
+IDEMPOTENT = {
+    b'GET', b'MGET', b'SET', b'EXISTS', b'DEL', b'PEXPIRE', b'PERSIST',
+    b'FLUSHDB', b'PING', b'SELECT',
+}
+
+
+def _word(arg):
+    if not isinstance(arg, bytes):
+        arg = str(arg).encode()
+    return arg.upper()
+
+
+def is_idempotent(args):
+    command = _word(args[0])
+    if command == b'SET':
+        # Значение (args[2]) не разбираем: оно может быть большим.
+        return b'NX' not in map(_word, args[3:])
+    return command in IDEMPOTENT
+
+
+class ResponseError(Exception):
+    pass
+
+
+def pack_command(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    line = stream.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('Соединение с кэшем закрыто')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest
+    if kind == b'-':
+        raise ResponseError(rest.decode())
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        length = int(rest)
+        if length == -1:
+            return None
+        return stream.read(length + 2)[:-2]
+    if kind == b'*':
+        length = int(rest)
+        if length == -1:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise ResponseError(f'Неизвестный ответ: {line!r}')
+
+
+class Connection:
+    def __init__(self, host, port, db, timeout):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.stream = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    def send(self, *args):
+        self.sock.sendall(pack_command(*args))
+
+    def read(self):
+        return read_reply(self.stream)
+
+    def execute(self, *args):
+        self.send(*args)
+        return self.read()
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений, общий для всех потоков процесса."""
+
+    def __init__(self, host, port, db=0, max_connections=10, timeout=None):
+        self.host, self.port, self.db = host, port, db
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(max_connections)
+
+    def connect(self):
+        return Connection(self.host, self.port, self.db, self.timeout)
+
+    def acquire(self):
+        """Возвращает соединение и признак того, что оно взято из пула."""
+        try:
+            return self.idle.get_nowait(), True
+        except queue.Empty:
+            return self.connect(), False
+
+    def release(self, connection):
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def execute(self, *args):
+        connection, pooled = self.acquire()
+        sent = False
+        try:
+            connection.send(*args)
+            sent = True
+            reply = connection.read()
+        except ResponseError:
+            self.release(connection)
+            raise
+        except OSError:
+            connection.close()
+            if not pooled or (sent and not is_idempotent(args)):
+                raise
+            # Соединение из пула могло устареть: пробуем один раз заново.
+            connection = self.connect()
+            try:
+                reply = connection.execute(*args)
+            except OSError:
+                connection.close()
+                raise
+        self.release(connection)
+        return reply
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(location, max_connections, timeout):
+    key = (location, max_connections, timeout)
+    with _pools_lock:
+        if key not in _pools:
+            url = urlparse(location)
+            _pools[key] = ConnectionPool(
+                url.hostname or '127.0.0.1',
+                url.port or 6379,
+                int(url.path.strip('/') or 0),
+                max_connections,
+                timeout,
+            )
+        return _pools[key]
+
+
+class RedisCache(BaseCache):
+    def __init__(self, server, params):
+        super().__init__(params)
+        if isinstance(server, (list, tuple)):
+            server = server[0]
+        options = params.get('OPTIONS', {})
+        self.pool = get_pool(
+            server or 'redis://127.0.0.1:6379/0',
+            options.get('MAX_CONNECTIONS', 10),
+            options.get('SOCKET_TIMEOUT'),
+        )
+
+    def dumps(self, value):
+        # Целые числа храним как есть, чтобы работал INCRBY.
+        if type(value) is int:
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        if data is None:
+            return None
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expiry(self, timeout):
+        """Аргументы SET для таймаута; None — ключ не нужно сохранять."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return ()
+        if timeout <= 0:
+            return None
+        return ('PX', int(timeout * 1000))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return False
+        reply = self.pool.execute(
+            'SET', key, self.dumps(value), *expiry, 'NX'
+        )
+        return reply is not None
+
+    def get(self, key, default=None, version=None):
+        value = self.loads(self.pool.execute('GET', self._key(key, version)))
+        return default if value is None else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            self.pool.execute('DEL', key)
+            return
+        self.pool.execute('SET', key, self.dumps(value), *expiry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return bool(self.pool.execute('DEL', key))
+        if not expiry:
+            self.pool.execute('PERSIST', key)
+            return bool(self.pool.execute('EXISTS', key))
+        return bool(self.pool.execute('PEXPIRE', key, expiry[1]))
+
+    def delete(self, key, version=None):
+        self.pool.execute('DEL', self._key(key, version))
+
+    def has_key(self, key, version=None):
+        return bool(self.pool.execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        try:
+            value = self.pool.execute('EVAL', INCR_EXISTING, 1, key, delta)
+        except ResponseError as error:
+            raise ValueError(str(error))
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        keys = list(keys)
+        redis_keys = [self._key(key, version) for key in keys]
+        values = self.pool.execute('MGET', *redis_keys)
+        return {
+            key: self.loads(value)
+            for key, value in zip(keys, values) if value is not None
+        }
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.pool.execute('DEL', *keys)
+
+    def clear(self):
+        self.pool.execute('FLUSHDB')
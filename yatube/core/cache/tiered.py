@@ -0,0 +1,163 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим хранилищем.
+
+Чтения сначала идут в локальный LRU, промахи — в общий кэш (алиас
+OPTIONS['SHARED']). Локальные записи живут не дольше LOCAL_TIMEOUT
+секунд: это верхняя граница того, насколько другой процесс может
+отстать от инвалидации.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.tiered.TieredCache',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_TIMEOUT': 2,
+                'MAX_LOCAL_ENTRIES': 1000,
+            },
+        },
+        'shared': {...},
+    }
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class LocalLRU:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.data[key] = (time.monotonic() + timeout, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+# Django создает экземпляры бэкендов на поток; LRU общий на процесс.
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(name, max_entries):
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = LocalLRU(max_entries)
+        return _stores[name]
+
+
+class TieredCache(BaseCache):
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 2)
+        self.local = get_store(
+            name or self.shared_alias,
+            options.get('MAX_LOCAL_ENTRIES', 1000),
+        )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def _remember(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.shared.default_timeout
+        local_timeout = self.local_timeout
+        if timeout is not None:
+            local_timeout = min(timeout, local_timeout)
+        local_key = self._local_key(key, version)
+        if local_timeout > 0:
+            self.local.set(local_key, value, local_timeout)
+        else:
+            self.local.delete(local_key)
+
+    def get(self, key, default=None, version=None):
+        value = self.local.get(self._local_key(key, version))
+        if value is not None:
+            return value
+        value = self.shared.get(key, version=version)
+        if value is None:
+            return default
+        self._remember(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            value = self.local.get(self._local_key(key, version))
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                self._remember(key, value, version=version)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(key, value, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._remember(key, value, version=version)
+        return value
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self.local.delete(self._local_key(key, version))
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(keys, version=version)
+        for key in keys:
+            self.local.delete(self._local_key(key, version))
+
+    def has_key(self, key, version=None):
+        if self.local.get(self._local_key(key, version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def clear(self):
+        self.shared.clear()
+        self.local.clear()
@@ -0,0 +1,82 @@
+"""Условные ответы и Cache-Control для публичных страниц.
+
+Декоратор conditional_page считает для анонимного GET дешевый токен
+свежести страницы — функция state(request, *args, **kwargs) отдает
+(части ETag, время изменения) или None — и отвечает 304 на
+If-None-Match / If-Modified-Since до вызова view и рендера шаблона.
+
+PublicCacheMiddleware помечает такие ответы анонимам как
+Cache-Control: public, s-maxage, чтобы их мог держать CDN или прокси.
+Ее нужно ставить первой в MIDDLEWARE: она видит ответ последней,
+уже с cookie, выставленными остальными middleware.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date
+
+
+def public_cache_settings():
+    return (
+        getattr(settings, 'PUBLIC_CACHE_MAX_AGE', 0),
+        getattr(settings, 'PUBLIC_CACHE_S_MAXAGE', 60),
+    )
+
+
+def is_public_request(request):
+    return request.method in ('GET', 'HEAD') and not (
+        request.user.is_authenticated
+    )
+
+
+def conditional_page(state):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_public_request(request):
+                return view(request, *args, **kwargs)
+            current = state(request, *args, **kwargs)
+            if current is None:
+                return view(request, *args, **kwargs)
+            parts, last_modified = current
+            raw = repr((request.get_full_path(), parts)).encode()
+            etag = f'"{hashlib.md5(raw).hexdigest()}"'
+            timestamp = int(last_modified) if last_modified else None
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if timestamp is not None:
+                    response['Last-Modified'] = http_date(timestamp)
+                request.public_page = True
+            return response
+        return wrapper
+    return decorator
+
+
+class PublicCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            getattr(request, 'public_page', False)
+            and is_public_request(request)
+            and response.status_code in (200, 304)
+            and not response.cookies
+            and not response.has_header('Cache-Control')
+        ):
+            max_age, s_maxage = public_cache_settings()
+            patch_cache_control(
+                response, public=True, max_age=max_age, s_maxage=s_maxage
+            )
+            patch_vary_headers(response, ('Cookie',))
+        return response
@@ -0,0 +1,45 @@
+"""Повтор записи, если SQLite занят другим писателем.
+
+BEGIN IMMEDIATE и busy_timeout (см. core.db.sqlite3) убирают почти все
+«database is locked», но под долгой нагрузкой ожидание может истечь.
+retry_on_busy выполняет функцию в транзакции и при такой ошибке
+повторяет ее целиком с экспоненциальной паузой. Внутри уже открытой
+транзакции повтор невозможен — ошибка пробрасывается как есть.
+"""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+)
+
+BUSY_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_busy(exc):
+    return any(message in str(exc) for message in BUSY_MESSAGES)
+
+
+def retry_on_busy(func=None, using=DEFAULT_DB_ALIAS, attempts=None,
+                  delay=None):
+    if func is None:
+        return lambda func: retry_on_busy(func, using, attempts, delay)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        tries = attempts or getattr(settings, 'DB_RETRY_ATTEMPTS', 5)
+        pause = delay or getattr(settings, 'DB_RETRY_DELAY', 0.05)
+        for attempt in range(tries):
+            try:
+                with transaction.atomic(using=using):
+                    return func(*args, **kwargs)
+            except OperationalError as exc:
+                nested = connections[using].in_atomic_block
+                if attempt == tries - 1 or nested or not is_busy(exc):
+                    raise
+            time.sleep(pause * 2 ** attempt * random.uniform(0.5, 1.5))
+    # Пишущие view целиком читают из основной базы (core.db.routers).
+    wrapper.writes_database = True
+    return wrapper
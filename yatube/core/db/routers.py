@@ -0,0 +1,100 @@
+"""Чтение с реплик для GET-запросов с привязкой к основной базе.
+
+ReplicaRouter отправляет чтения на случайную реплику из
+settings.DATABASE_REPLICAS, только если ReplicaMiddleware разрешила
+это для текущего запроса: GET или HEAD, view не помечен как пишущий
+(retry_on_busy) и у клиента нет свежей метки записи. Вне запросов
+(команды, фоновые задачи) все идет в основную базу.
+
+Read-your-writes: как только в запросе что-то записано, дальнейшие
+чтения идут в основную базу, а ответ ставит cookie, по которой
+следующие REPLICA_STICKY_SECONDS секунд запросы этого клиента тоже
+читают из основной базы — дольше, чем отстает реплика. Подделанная
+cookie только отключает реплики для ее владельца.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+COOKIE_NAME = 'primary_until'
+
+_state = ContextVar('replica_routing', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+
+class RoutingState:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        aliases = replicas()
+        if state is None or not state.use_replica or not aliases:
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.use_replica = False
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
+
+
+def is_pinned(request):
+    try:
+        return float(request.COOKIES.get(COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(
+            request.method in ('GET', 'HEAD') and not is_pinned(request)
+        )
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            seconds = sticky_seconds()
+            response.set_cookie(
+                COOKIE_NAME,
+                str(int(time.time()) + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'writes_database', False):
+            state = _state.get()
+            if state is not None:
+                state.use_replica = False
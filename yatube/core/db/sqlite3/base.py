@@ -0,0 +1,46 @@
+"""SQLite, настроенный для одновременных запросов.
+
+Отличия от стандартного бэкенда:
+
+* при каждом подключении выполняются PRAGMA из OPTIONS['pragmas']
+  (WAL, synchronous=NORMAL, mmap, размер кэша, busy_timeout);
+* с OPTIONS['immediate_transactions'] транзакции начинаются с
+  BEGIN IMMEDIATE. Обычный BEGIN берет блокировку записи только на
+  первой записи, и если к этому времени базу уже пишет другое
+  соединение, SQLite сразу отвечает «database is locked», не дожидаясь
+  busy_timeout. IMMEDIATE ждет блокировку в начале транзакции, так что
+  писатели встают в очередь, а читатели в WAL не блокируются.
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.db.sqlite3',
+            'OPTIONS': {
+                'pragmas': {'journal_mode': 'WAL', ...},
+                'immediate_transactions': True,
+            },
+        },
+    }
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Свои ключи OPTIONS не должны попасть в sqlite3.connect().
+        params.pop('pragmas', None)
+        params.pop('immediate_transactions', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.settings_dict['OPTIONS'].get('immediate_transactions'):
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
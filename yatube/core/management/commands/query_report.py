@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import querylog
+
+SORT_KEYS = {
+    'total': lambda entry: entry['total'],
+    'count': lambda entry: entry['count'],
+    'max': lambda entry: entry['max'],
+    'mean': lambda entry: entry['total'] / entry['count'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает самые дорогие отпечатки SQL по сводкам всех процессов '
+        'из QUERY_LOG_DIR: число вызовов, суммарное, среднее и '
+        'максимальное время по view.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total'
+        )
+        parser.add_argument('--view', help='Только запросы этого view.')
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести отчет в JSON.'
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Удалить накопленные сводки после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        entries = querylog.load_reports()
+        if options['view']:
+            entries = [
+                entry for entry in entries
+                if entry['view'] == options['view']
+            ]
+        entries.sort(key=SORT_KEYS[options['sort']], reverse=True)
+        entries = entries[:options['top']]
+        if options['json']:
+            self.stdout.write(json.dumps(entries, ensure_ascii=False))
+        elif not entries:
+            self.stdout.write('Сводок запросов пока нет')
+        else:
+            self.stdout.write(
+                f'{"всего мс":>10} {"вызовов":>8} {"сред. мс":>9} '
+                f'{"макс. мс":>9}  view / запрос'
+            )
+            for entry in entries:
+                self.stdout.write(
+                    f'{entry["total"] * 1000:10.1f} {entry["count"]:8} '
+                    f'{entry["total"] / entry["count"] * 1000:9.2f} '
+                    f'{entry["max"] * 1000:9.2f}  {entry["view"]}\n'
+                    f'{"":>40}{entry["fingerprint"]}'
+                )
+        if options['reset']:
+            querylog.clear_reports()
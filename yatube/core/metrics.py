@@ -0,0 +1,411 @@
+"""Метрики запросов для продакшена: Server-Timing и Prometheus.
+
+MetricsMiddleware для каждого запроса пишет в гистограмму время ответа
+по имени view. Подробности — SQL-запросы и их время, рендер шаблонов,
+попадания и промахи кэша, подготовка миниатюр — собираются только для
+доли запросов settings.METRICS_SAMPLE_RATE: на остальных не ставятся
+обертки вокруг базы и шаблонов, и накладные расходы — пара вызовов
+perf_counter. Выбранный запрос получает заголовок Server-Timing.
+
+Источники данных находят текущий запрос через contextvar:
+обертка execute_wrapper для базы, бэкенд шаблонов InstrumentedTemplates,
+кэш core.cache.instrumented.InstrumentedCache и thumbnail_timer для
+миниатюр.
+
+Гистограммы живут в памяти процесса; core.views.metrics отдает их в
+текстовом формате Prometheus адресам из METRICS_ALLOWED_IPS. При
+нескольких процессах сервера каждый отдает свои значения.
+
+Миниатюры с очередью задач в базе готовятся в процессах run_worker,
+поэтому исполнитель раз в METRICS_WORKER_FLUSH_INTERVAL секунд пишет
+свою гистограмму в METRICS_WORKER_DIR/<pid>.json. /metrics/ складывает
+файлы всех исполнителей, обновленные не раньше METRICS_WORKER_MAX_AGE
+секунд назад, и отдает их с меткой source="worker".
+"""
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+from . import querylog
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+WORKER_LABELS = (('source', 'worker'),)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def sample_rate():
+    return getattr(settings, 'METRICS_SAMPLE_RATE', 0.05)
+
+
+def worker_dir():
+    return getattr(
+        settings, 'METRICS_WORKER_DIR',
+        os.path.join(settings.BASE_DIR, 'metrics'),
+    )
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [
+                [0] * (len(self.buckets) + 1), 0.0, 0
+            ]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def dump(self):
+        """Серии в виде, пригодном для JSON."""
+        return [
+            [[list(label) for label in labels], counts, total, count]
+            for labels, (counts, total, count) in self.series.items()
+        ]
+
+    def load(self, dumped, extra_labels=()):
+        """Прибавляет серии из dump(), дописывая к меткам extra_labels."""
+        for labels, counts, total, count in dumped:
+            key = tuple(map(tuple, labels)) + extra_labels
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0
+                ]
+            series[0] = [a + b for a, b in zip(series[0], counts)]
+            series[1] += total
+            series[2] += count
+
+    def exposition(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            bounds = [*map(str, self.buckets), '+Inf']
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                yield (
+                    f'{self.name}_bucket'
+                    f'{format_labels(labels + (("le", bound),))} {cumulative}'
+                )
+            yield f'{self.name}_sum{format_labels(labels)} {total}'
+            yield f'{self.name}_count{format_labels(labels)} {count}'
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def exposition(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} counter'
+        for labels, value in sorted(self.series.items()):
+            yield f'{self.name}{format_labels(labels)} {value}'
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f'{{{pairs}}}'
+
+
+class Registry:
+    """Метрики процесса; запись и выгрузка под одной блокировкой."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Histogram(
+            'yatube_request_duration_seconds', 'Время ответа по view.'
+        )
+        self.queries = Histogram(
+            'yatube_db_queries',
+            'SQL-запросов на запрос (выборка).',
+            QUERY_BUCKETS,
+        )
+        self.db = Histogram(
+            'yatube_db_duration_seconds',
+            'Время SQL-запросов на запрос (выборка).',
+        )
+        self.render = Histogram(
+            'yatube_template_render_seconds',
+            'Время рендера шаблонов на запрос (выборка).',
+        )
+        self.cache = Counter(
+            'yatube_cache_requests_total',
+            'Чтения кэша по результату (выборка).',
+        )
+        self.thumbnails = Histogram(
+            'yatube_thumbnail_seconds', 'Время подготовки миниатюры.'
+        )
+        # None — исполнитель еще не сохранял метрики: первый раз сразу.
+        self.last_flush = None
+        self.unsaved = False
+
+    def record_request(self, view, elapsed, metrics=None):
+        labels = (('view', view),)
+        with self.lock:
+            self.requests.observe(labels, elapsed)
+            if metrics is None:
+                return
+            self.queries.observe(labels, metrics.queries)
+            self.db.observe(labels, metrics.timings['db'])
+            self.render.observe(labels, metrics.timings['render'])
+            for result in ('hit', 'miss'):
+                self.cache.inc(
+                    labels + (('result', result),), metrics.cache[result]
+                )
+
+    def record_thumbnail(self, elapsed):
+        with self.lock:
+            self.thumbnails.observe((), elapsed)
+            self.unsaved = True
+
+    def flush_worker(self, directory=None):
+        """Сохраняет метрики исполнителя задач; запись атомарна."""
+        directory = directory or worker_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with self.lock:
+            state = {'thumbnails': self.thumbnails.dump()}
+            self.unsaved = False
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as stream:
+            json.dump(state, stream)
+        os.replace(temporary, path)
+        self.last_flush = time.monotonic()
+
+    def maybe_flush_worker(self):
+        interval = getattr(settings, 'METRICS_WORKER_FLUSH_INTERVAL', 15)
+        if not self.unsaved or (
+            self.last_flush is not None
+            and time.monotonic() - self.last_flush < interval
+        ):
+            return
+        try:
+            self.flush_worker()
+        except OSError:
+            self.last_flush = time.monotonic()
+
+    def worker_thumbnails(self, directory=None):
+        """Гистограмма миниатюр этого процесса и живых исполнителей."""
+        directory = directory or worker_dir()
+        combined = Histogram(
+            self.thumbnails.name, self.thumbnails.help_text,
+            self.thumbnails.buckets,
+        )
+        with self.lock:
+            combined.load(self.thumbnails.dump())
+        if not os.path.isdir(directory):
+            return combined
+        oldest = time.time() - getattr(
+            settings, 'METRICS_WORKER_MAX_AGE', 24 * 60 * 60
+        )
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if name == f'{os.getpid()}.json' or not name.endswith('.json'):
+                continue
+            try:
+                if os.path.getmtime(path) < oldest:
+                    continue
+                with open(path, encoding='utf-8') as stream:
+                    state = json.load(stream)
+            except (OSError, ValueError):
+                continue
+            combined.load(state.get('thumbnails', []), WORKER_LABELS)
+        return combined
+
+    def exposition(self):
+        thumbnails = self.worker_thumbnails()
+        metrics = (
+            self.requests, self.queries, self.db, self.render, self.cache,
+        )
+        with self.lock:
+            lines = [
+                line for metric in metrics for line in metric.exposition()
+            ]
+        lines.extend(thumbnails.exposition())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        self.__init__()
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    """Подробности одного выбранного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = {'db': 0.0, 'render': 0.0, 'thumbnail': 0.0}
+        self.cache = {'hit': 0, 'miss': 0}
+        self.active = set()
+
+    @contextmanager
+    def timer(self, name):
+        # Вложенные замеры одного вида (include, render_to_string в
+        # теге) уже входят во внешний.
+        if name in self.active:
+            yield
+            return
+        self.active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - started
+            self.active.discard(name)
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper для соединений с базой."""
+        self.queries += 1
+        with self.timer('db'):
+            return execute(sql, params, many, context)
+
+    def server_timing(self, total):
+        parts = [
+            f'db;dur={self.timings["db"] * 1000:.1f};desc="{self.queries} q"',
+            f'render;dur={self.timings["render"] * 1000:.1f}',
+            f'cache;desc="{self.cache["hit"]} hit {self.cache["miss"]} miss"',
+        ]
+        if self.timings['thumbnail']:
+            parts.append(
+                f'thumbnail;dur={self.timings["thumbnail"] * 1000:.1f}'
+            )
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def current():
+    return _current.get()
+
+
+def cache_result(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache['hit'] += hits
+        metrics.cache['miss'] += misses
+
+
+@contextmanager
+def thumbnail_timer():
+    """Замер миниатюры: в гистограмму и, если есть, в текущий запрос."""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        if metrics is None:
+            yield
+        else:
+            with metrics.timer('thumbnail'):
+                yield
+    finally:
+        registry.record_thumbnail(time.perf_counter() - started)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name
+
+
+class MetricsMiddleware:
+    """Ставить первой в MIDDLEWARE, чтобы время включало остальные."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        view_token = querylog.current_view.set(querylog.BACKGROUND)
+        try:
+            return self.measure(request)
+        finally:
+            querylog.current_view.reset(view_token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        querylog.current_view.set(view_name(request))
+
+    def measure(self, request):
+        if random.random() >= sample_rate():
+            started = time.perf_counter()
+            response = self.get_response(request)
+            registry.record_request(
+                view_name(request), time.perf_counter() - started
+            )
+            return response
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(metrics)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+        registry.record_request(view_name(request), elapsed, metrics)
+        if getattr(settings, 'METRICS_SERVER_TIMING', True):
+            response['Server-Timing'] = metrics.server_timing(elapsed)
+        return response
+
+
+class TimedTemplate:
+    """Шаблон бэкенда с замером render; остальное — как у оригинала."""
+
+    def __init__(self, template):
+        self._wrapped = template
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self._wrapped.render(context, request)
+        with metrics.timer('render'):
+            return self._wrapped.render(context, request)
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """DjangoTemplates, замеряющий рендер в выбранных запросах."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -0,0 +1,267 @@
+"""Журнал медленных запросов и сводка по отпечаткам SQL.
+
+CoreConfig.ready ставит record() в execute_wrappers каждого нового
+соединения. Для каждого запроса считается отпечаток — SQL без
+параметров, с одинаковыми списками IN и VALUES, — и копится число
+вызовов, суммарное и максимальное время по паре (view, отпечаток).
+Имя view выставляет MetricsMiddleware; запросы вне запроса
+пользователя попадают под '<background>'.
+
+Запрос дольше SLOW_QUERY_MS пишется в лог core.querylog вместе с view,
+строкой шаблона, при рендере которой он случился, и строкой кода
+проекта. Поиск по стеку делается только для медленных запросов.
+
+Сводка живет в памяти процесса и раз в QUERY_LOG_FLUSH_INTERVAL секунд
+(и при выходе, если процесс уже сохранял ее) пишется в
+QUERY_LOG_DIR/<pid>.json. Команда query_report складывает файлы всех
+процессов и печатает top-N.
+
+query_report --reset пишет время сброса в QUERY_LOG_DIR/reset. Процесс
+перед сохранением сравнивает его с началом своей сводки и, если сброс
+был позже, начинает сводку заново, а не возвращает старые счетчики.
+Файлы со сводкой, начатой до сброса, load_reports пропускает.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND = '<background>'
+RESET_FILE = 'reset'
+OTHER = '<other>'
+# Модули с обертками execute: их кадры не указывают на источник.
+WRAPPERS = (
+    os.path.join('core', 'querylog.py'), os.path.join('core', 'metrics.py'),
+)
+current_view = ContextVar('current_view', default=BACKGROUND)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_RE = re.compile(r'%s|\?')
+LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+VALUES_RE = re.compile(r'(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+SPACE_RE = re.compile(r'\s+')
+
+
+def slow_query_seconds():
+    return getattr(settings, 'SLOW_QUERY_MS', 100) / 1000
+
+
+def log_dir():
+    return getattr(
+        settings, 'QUERY_LOG_DIR', os.path.join(settings.BASE_DIR, 'querylog')
+    )
+
+
+def reset_time(directory=None):
+    """Время последнего query_report --reset или 0."""
+    path = os.path.join(directory or log_dir(), RESET_FILE)
+    try:
+        with open(path, encoding='utf-8') as stream:
+            return float(stream.read())
+    except (OSError, ValueError):
+        return 0.0
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """SQL без значений: литералы и плейсхолдеры — ?, списки — (...)."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PLACEHOLDER_RE.sub('?', sql)
+    sql = LIST_RE.sub('(...)', sql)
+    sql = VALUES_RE.sub(r'\1', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def template_position(frame):
+    """'шаблон:строка' самого внутреннего узла шаблона в стеке."""
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+def code_position(frame):
+    """'файл:строка' первого кадра проекта вне оберток execute."""
+    root = str(settings.BASE_DIR)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and not filename.endswith(WRAPPERS):
+            return (
+                f'{os.path.relpath(filename, root)}:{frame.f_lineno}'
+            )
+        frame = frame.f_back
+    return None
+
+
+class QueryStats:
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.last_flush = time.monotonic()
+        self.flushed = False
+        # Время начала сводки; сравнивается с reset_time().
+        self.since = time.time()
+
+    def add(self, view, sql, elapsed):
+        key = (view, sql)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                if len(self.entries) >= self.max_entries:
+                    key = (view, OTHER)
+                entry = self.entries.setdefault(key, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+    def snapshot(self):
+        with self.lock:
+            return [
+                {
+                    'view': view,
+                    'fingerprint': sql,
+                    'count': count,
+                    'total': total,
+                    'max': longest,
+                }
+                for (view, sql), (count, total, longest)
+                in self.entries.items()
+            ]
+
+    def flush(self, directory=None):
+        """Сохраняет сводку процесса; запись атомарна.
+
+        Если после начала сводки был общий сброс, она начинается заново.
+        """
+        directory = directory or log_dir()
+        if reset_time(directory) > self.since:
+            self.reset()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        temporary = f'{path}.tmp'
+        report = {'since': self.since, 'entries': self.snapshot()}
+        with open(temporary, 'w', encoding='utf-8') as stream:
+            json.dump(report, stream, ensure_ascii=False)
+        os.replace(temporary, path)
+        self.last_flush = time.monotonic()
+        self.flushed = True
+
+    def maybe_flush(self):
+        interval = getattr(settings, 'QUERY_LOG_FLUSH_INTERVAL', 60)
+        if time.monotonic() - self.last_flush < interval:
+            return
+        self.last_flush = time.monotonic()
+        try:
+            self.flush()
+        except OSError:
+            logger.exception('Не удалось сохранить сводку запросов')
+
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+            self.since = time.time()
+
+
+stats = QueryStats()
+
+
+def record(execute, sql, params, many, context):
+    """execute_wrapper: время запроса в сводку, медленные — в лог."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        view = current_view.get()
+        stats.add(view, fingerprint(sql), elapsed)
+        if elapsed >= slow_query_seconds():
+            frame = sys._getframe(1)
+            logger.warning(
+                'Медленный запрос %.1f мс, view %s, шаблон %s, код %s: %s',
+                elapsed * 1000,
+                view,
+                template_position(frame) or '-',
+                code_position(frame) or '-',
+                sql,
+            )
+        stats.maybe_flush()
+
+
+def install(sender=None, connection=None, **kwargs):
+    """Обработчик connection_created."""
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record)
+
+
+def flush_at_exit():
+    # Дописываем только за долгоживущими процессами сервера, которые
+    # уже сохраняли сводку: migrate, shell и тесты файлов не оставляют.
+    if stats.flushed:
+        try:
+            stats.flush()
+        except OSError:
+            pass
+
+
+atexit.register(flush_at_exit)
+
+
+def load_reports(directory=None):
+    """Сводки всех процессов, сложенные по (view, отпечаток).
+
+    Сводки, начатые до последнего сброса, не учитываются.
+    """
+    directory = directory or log_dir()
+    merged = {}
+    if not os.path.isdir(directory):
+        return []
+    reset_at = reset_time(directory)
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(directory, name), encoding='utf-8') as stream:
+            report = json.load(stream)
+        if report['since'] < reset_at:
+            continue
+        for entry in report['entries']:
+            key = (entry['view'], entry['fingerprint'])
+            if key not in merged:
+                merged[key] = dict(entry)
+                continue
+            total = merged[key]
+            total['count'] += entry['count']
+            total['total'] += entry['total']
+            total['max'] = max(total['max'], entry['max'])
+    return list(merged.values())
+
+
+def clear_reports(directory=None):
+    """Общий сброс: отметка времени для всех процессов и удаление файлов."""
+    directory = directory or log_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, RESET_FILE)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as stream:
+        stream.write(repr(time.time()))
+    os.replace(f'{path}.tmp', path)
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            os.remove(os.path.join(directory, name))
+    stats.reset()
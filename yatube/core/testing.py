@@ -0,0 +1,40 @@
+"""Проверки бюджета SQL-запросов для тестов."""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+@contextmanager
+def assert_max_queries(max_queries, using=DEFAULT_DB_ALIAS, label=''):
+    """Падает, если внутри блока выполнено больше max_queries запросов.
+
+    В сообщение об ошибке попадают все выполненные запросы, чтобы
+    сразу было видно, какой из них повторяется.
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    executed = len(context)
+    if executed > max_queries:
+        queries = '\n'.join(
+            f'{number}. {query["sql"]}'
+            for number, query in enumerate(context.captured_queries, 1)
+        )
+        raise AssertionError(
+            f'{label or "Блок"}: {executed} запросов при бюджете '
+            f'{max_queries}\n{queries}'
+        )
+
+
+class QueryBudgetMixin:
+    """Примесь к TestCase: бюджет запросов для страницы."""
+
+    def assertMaxQueries(self, max_queries, func, *args, **kwargs):
+        label = kwargs.pop('label', getattr(func, '__name__', ''))
+        with assert_max_queries(max_queries, label=label):
+            return func(*args, **kwargs)
+
+    def count_queries(self, func, *args, **kwargs):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as context:
+            func(*args, **kwargs)
+        return len(context)
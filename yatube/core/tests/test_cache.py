@@ -0,0 +1,176 @@
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from core.cache.fakeserver import FakeRedisServer
+from core.cache.redis import RedisCache
+from core.cache.tiered import TieredCache
+
+
+class RedisCacheTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = RedisCache(self.server.url, {'KEY_PREFIX': 'test'})
+        self.cache.clear()
+
+    def test_set_get_delete(self):
+        """ значения переживают сериализацию и удаляются """
+        self.cache.set('post', {'id': 1, 'text': 'пост'})
+        self.assertEqual(self.cache.get('post'), {'id': 1, 'text': 'пост'})
+        self.cache.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+
+    def test_add_incr_and_many(self):
+        """ add, incr и get_many работают как у встроенных бэкендов """
+        self.assertTrue(self.cache.add('version', 1, None))
+        self.assertFalse(self.cache.add('version', 5))
+        self.assertEqual(self.cache.incr('version'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('other', 'значение')
+        self.assertEqual(
+            self.cache.get_many(['version', 'other', 'missing']),
+            {'version': 2, 'other': 'значение'},
+        )
+
+    def test_incr_keeps_expired_key_missing(self):
+        """ incr истекшего ключа не создает его заново без срока """
+        self.cache.set('counter', 1, 0.05)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        time.sleep(0.1)
+        with self.assertRaises(ValueError):
+            self.cache.incr('counter')
+        self.assertFalse(self.cache.has_key('counter'))
+        self.cache.set('text', 'не число')
+        with self.assertRaises(ValueError):
+            self.cache.incr('text')
+
+    def test_timeout_and_versions(self):
+        """ ключи истекают и разделяются по версиям """
+        self.cache.set('short', 'x', 0.05)
+        self.cache.set('key', 'v1', version=1)
+        self.cache.set('key', 'v2', version=2)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('key', version=1), 'v1')
+        self.assertEqual(self.cache.get('key', version=2), 'v2')
+
+    def test_connections_are_pooled(self):
+        """ соединения переиспользуются """
+        for i in range(20):
+            self.cache.set(f'key{i}', i)
+        self.assertEqual(self.cache.pool.idle.qsize(), 1)
+
+
+class BrokenConnection:
+    """Соединение из пула, оборванное до или после отправки команды."""
+
+    def __init__(self, on_send):
+        self.on_send = on_send
+
+    def send(self, *args):
+        if self.on_send:
+            raise ConnectionResetError('оборвано')
+
+    def read(self):
+        raise ConnectionError('оборвано')
+
+    def close(self):
+        pass
+
+
+class RedisRetryTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = RedisCache(self.server.url, {'KEY_PREFIX': 'retry'})
+        self.cache.clear()
+        self.cache.set('counter', 1)
+
+    def break_pool(self, on_send):
+        pool = self.cache.pool
+        while not pool.idle.empty():
+            pool.idle.get_nowait().close()
+        pool.idle.put_nowait(BrokenConnection(on_send))
+
+    def test_incr_is_not_repeated_after_send(self):
+        """ incr не повторяется, если команда могла дойти до сервера """
+        self.break_pool(on_send=False)
+        with self.assertRaises(ConnectionError):
+            self.cache.incr('counter')
+        self.assertEqual(self.cache.get('counter'), 1)
+
+    def test_incr_repeated_when_not_sent(self):
+        """ incr повторяется, если команда не ушла """
+        self.break_pool(on_send=True)
+        self.assertEqual(self.cache.incr('counter'), 2)
+
+    def test_reads_are_repeated(self):
+        """ чтение повторяется на новом соединении """
+        self.break_pool(on_send=False)
+        self.assertEqual(self.cache.get('counter'), 1)
+        self.break_pool(on_send=False)
+        with self.assertRaises(ConnectionError):
+            self.cache.add('other', 1)
+
+
+class TieredCacheTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeRedisServer().start()
+        cls.caches = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'tiered_shared': {
+                'BACKEND': 'core.cache.redis.RedisCache',
+                'LOCATION': cls.server.url,
+            },
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    def test_local_tier_serves_reads(self):
+        """ повторное чтение обслуживает локальный LRU """
+        with override_settings(CACHES=self.caches):
+            tiered = TieredCache('tiered-test', {
+                'OPTIONS': {'SHARED': 'tiered_shared', 'LOCAL_TIMEOUT': 60},
+            })
+            tiered.set('key', 'value')
+            self.server.storage.data.clear()
+            self.assertEqual(tiered.get('key'), 'value')
+            tiered.delete('key')
+            self.assertIsNone(tiered.get('key'))
+
+    def test_local_tier_expires(self):
+        """ локальная копия живет не дольше LOCAL_TIMEOUT """
+        with override_settings(CACHES=self.caches):
+            tiered = TieredCache('tiered-expire', {
+                'OPTIONS': {'SHARED': 'tiered_shared', 'LOCAL_TIMEOUT': 0.05},
+            })
+            tiered.set('key', 'old')
+            tiered.shared.set('key', 'new')
+            self.assertEqual(tiered.get('key'), 'old')
+            time.sleep(0.1)
+            self.assertEqual(tiered.get('key'), 'new')
@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import Histogram, Registry, registry, thumbnail_timer
+from posts.models import Post
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        self.guest_client = Client()
+
+    def series(self, histogram, view):
+        return histogram.series[(('view', view),)]
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        """ тестируем подробности и Server-Timing выбранного запроса """
+        self.guest_client.get(reverse('posts:main'))
+        response = self.guest_client.get(reverse('posts:main'))
+        timing = response['Server-Timing']
+        for part in ('db;dur=', 'render;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(part, timing)
+        self.assertEqual(self.series(registry.requests, 'posts:main')[2], 2)
+        _, _, total = self.series(registry.queries, 'posts:main')
+        self.assertEqual(total, 2)
+        self.assertGreater(
+            self.series(registry.render, 'posts:main')[1], 0
+        )
+        hits = registry.cache.series[
+            (('view', 'posts:main'), ('result', 'hit'))
+        ]
+        self.assertGreater(hits, 0)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        """ тестируем, что без выборки считается только время ответа """
+        response = self.guest_client.get(reverse('posts:main'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.series(registry.requests, 'posts:main')[2], 1)
+        self.assertEqual(registry.queries.series, {})
+
+    def test_unresolved_path(self):
+        """ тестируем общее имя для несуществующих адресов """
+        self.guest_client.get('/unexisting_page/')
+        self.assertIn((('view', '<unresolved>'),), registry.requests.series)
+
+    def test_endpoint(self):
+        """ тестируем выгрузку в формате Prometheus """
+        self.guest_client.get(reverse('posts:main'))
+        with thumbnail_timer():
+            pass
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn(
+            '# TYPE yatube_request_duration_seconds histogram', body
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:main"} 1',
+            body,
+        )
+        self.assertIn('yatube_thumbnail_seconds_count 1', body)
+
+    def test_worker_metrics(self):
+        """ тестируем миниатюры исполнителя на /metrics/ """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        worker = Registry()
+        worker.record_thumbnail(0.3)
+        worker.flush_worker(directory)
+        # Файл другого процесса-исполнителя.
+        os.replace(
+            os.path.join(directory, f'{os.getpid()}.json'),
+            os.path.join(directory, '1.json'),
+        )
+        with open(os.path.join(directory, 'broken.json'), 'w') as stream:
+            stream.write('{')
+        with thumbnail_timer():
+            pass
+        with override_settings(METRICS_WORKER_DIR=directory):
+            body = self.guest_client.get(reverse('metrics')).content.decode()
+        self.assertIn('yatube_thumbnail_seconds_count 1', body)
+        self.assertIn(
+            'yatube_thumbnail_seconds_count{source="worker"} 1', body
+        )
+        self.assertEqual(body.count('# TYPE yatube_thumbnail_seconds'), 1)
+
+    def test_worker_flush_only_with_new_data(self):
+        """ тестируем, что исполнитель пишет файл только с новыми данными """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        worker = Registry()
+        with override_settings(METRICS_WORKER_DIR=directory):
+            worker.maybe_flush_worker()
+            self.assertEqual(os.listdir(directory), [])
+            worker.record_thumbnail(0.3)
+            worker.maybe_flush_worker()
+        with open(os.path.join(directory, f'{os.getpid()}.json')) as stream:
+            dumped = json.load(stream)['thumbnails']
+        self.assertEqual(dumped[0][3], 1)
+
+    def test_endpoint_is_local(self):
+        """ тестируем, что метрики не видны снаружи """
+        response = self.guest_client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_histogram_exposition(self):
+        """ тестируем накопительные корзины гистограммы """
+        histogram = Histogram('test_seconds', 'Тест', (0.1, 1))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe((('view', 'a"b'),), value)
+        lines = list(histogram.exposition())
+        self.assertIn('test_seconds_bucket{view="a\\"b",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{view="a\\"b",le="1"} 3', lines)
+        self.assertIn('test_seconds_bucket{view="a\\"b",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_count{view="a\\"b"} 4', lines)
@@ -0,0 +1,123 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import querylog
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class FingerprintTests(TestCase):
+    def test_values_are_removed(self):
+        """ тестируем одинаковый отпечаток для разных значений """
+        self.assertEqual(
+            querylog.fingerprint(
+                "SELECT * FROM t WHERE a = 'x''y' AND b IN (%s, %s, %s)"
+                ' LIMIT 21'
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?',
+        )
+        self.assertEqual(
+            querylog.fingerprint('SELECT * FROM t WHERE b IN (%s)'),
+            querylog.fingerprint('SELECT * FROM t WHERE b IN (%s, %s)'),
+        )
+
+    def test_bulk_insert(self):
+        """ тестируем схлопывание VALUES у bulk_create """
+        self.assertEqual(
+            querylog.fingerprint(
+                'INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)'
+            ),
+            'INSERT INTO "t" ("a", "b") VALUES (...)',
+        )
+
+
+class QueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        Comment.objects.create(post=cls.post, author=cls.user, text='к')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        querylog.stats.reset()
+        self.addCleanup(setattr, querylog.stats, 'flushed', False)
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_queries_grouped_by_view(self):
+        """ тестируем сводку по view и отпечатку """
+        for _ in range(2):
+            cache.clear()
+            self.guest_client.get(reverse('posts:main'))
+        views = {view for view, _ in querylog.stats.entries}
+        self.assertIn('posts:main', views)
+        counts = [
+            count for (view, sql), (count, _, _)
+            in querylog.stats.entries.items()
+            if view == 'posts:main' and sql.startswith('SELECT')
+        ]
+        self.assertTrue(counts)
+        self.assertTrue(all(count == 2 for count in counts))
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_points_to_template(self):
+        """ тестируем view и строку шаблона в логе медленных запросов """
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with self.assertLogs('core.querylog', 'WARNING') as logs:
+            self.guest_client.get(url)
+        self.assertTrue(
+            all('view posts:post_detail' in line for line in logs.output)
+        )
+        self.assertTrue(any('.html:' in line for line in logs.output))
+        self.assertTrue(any('posts/' in line for line in logs.output))
+
+    def test_report_command(self):
+        """ тестируем top-N отчет по сводкам процессов """
+        with override_settings(QUERY_LOG_DIR=self.directory):
+            self.guest_client.get(reverse('posts:main'))
+            querylog.stats.flush()
+            out = StringIO()
+            call_command('query_report', top=3, json=True, stdout=out)
+            report = json.loads(out.getvalue())
+            self.assertLessEqual(len(report), 3)
+            self.assertEqual(
+                report,
+                sorted(report, key=lambda entry: -entry['total']),
+            )
+            call_command(
+                'query_report', view='posts:main', reset=True,
+                stdout=StringIO(),
+            )
+            self.assertEqual(querylog.load_reports(), [])
+
+    def test_reset_reaches_other_processes(self):
+        """ тестируем сброс сводок, которые еще в памяти других процессов """
+        other = querylog.QueryStats()
+        other.add('posts:main', 'SELECT ?', 0.5)
+        stale = os.path.join(self.directory, '1.json')
+        with open(stale, 'w', encoding='utf-8') as stream:
+            json.dump({'since': 0, 'entries': other.snapshot()}, stream)
+        with override_settings(QUERY_LOG_DIR=self.directory):
+            querylog.clear_reports()
+            # Файл процесса, записанный после удаления старых.
+            with open(stale, 'w', encoding='utf-8') as stream:
+                json.dump({'since': 0, 'entries': other.snapshot()}, stream)
+            self.assertEqual(querylog.load_reports(), [])
+            other.flush()
+            self.assertEqual(querylog.load_reports(), [])
+            other.add('posts:main', 'SELECT ?', 0.1)
+            other.flush()
+            self.assertEqual(querylog.load_reports()[0]['count'], 1)
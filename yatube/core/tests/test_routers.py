@@ -0,0 +1,102 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.db.routers import COOKIE_NAME, ReplicaRouter
+from posts.models import Group, Post
+
+User = get_user_model()
+ALIAS = 'replica'
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Основная тестовая база и ее копия-реплика — два файла SQLite.
+
+    Реплика снимается после подготовки данных, а следующие записи в
+    нее не попадают: так выглядит отставание репликации.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.snapshot_replica()
+        settings = override_settings(DATABASE_REPLICAS=[ALIAS])
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def snapshot_replica(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'replica.sqlite3')
+        primary = connections['default']
+        primary.ensure_connection()
+        replica = sqlite3.connect(path)
+        primary.connection.backup(replica)
+        replica.close()
+        connections.databases[ALIAS] = {
+            'ENGINE': 'core.db.sqlite3', 'NAME': path,
+        }
+        connections.ensure_defaults(ALIAS)
+        connections.prepare_test_settings(ALIAS)
+        self.addCleanup(self.drop_replica)
+
+    def drop_replica(self):
+        connections[ALIAS].close()
+        delattr(connections._connections, ALIAS)
+        del connections.databases[ALIAS]
+
+    def main_page_texts(self, client):
+        cache.clear()
+        response = client.get(reverse('posts:main'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_reads_go_to_replica(self):
+        """ тестируем чтение GET-запросов с реплики """
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.main_page_texts(Client()), ['Старый пост'])
+
+    def test_read_your_writes(self):
+        """ тестируем чтение из основной базы после записи """
+        response = self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.group.pk},
+        )
+        self.assertIn(COOKIE_NAME, response.cookies)
+        self.assertEqual(
+            self.main_page_texts(self.author_client),
+            ['Новый пост', 'Старый пост'],
+        )
+        # Другой клиент метки не имеет и читает реплику.
+        self.assertEqual(self.main_page_texts(Client()), ['Старый пост'])
+
+    def test_writing_view_uses_primary(self):
+        """ тестируем пишущий GET-view целиком на основной базе """
+        reader = User.objects.create_user(username='reader')
+        client = Client()
+        client.force_login(reader)
+        response = client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(COOKIE_NAME, response.cookies)
+        self.assertTrue(reader.follower.filter(author=self.author).exists())
+
+    def test_router_outside_requests(self):
+        """ тестируем основную базу вне запросов и запрет миграций """
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertFalse(router.allow_migrate(ALIAS, 'posts'))
+        self.assertIsNone(router.allow_migrate('default', 'posts'))
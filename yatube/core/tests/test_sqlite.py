@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.test import SimpleTestCase
+
+from core.db.retry import retry_on_busy
+
+ALIAS = 'writers'
+WRITERS = 8
+WRITES = 25
+
+
+class SQLiteTests(SimpleTestCase):
+    """Отдельная файловая база: в памяти нет ни WAL, ни блокировок."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.databases[ALIAS] = {
+            'ENGINE': 'core.db.sqlite3',
+            'NAME': os.path.join(directory, 'writers.sqlite3'),
+            'OPTIONS': {
+                'pragmas': settings.SQLITE_PRAGMAS,
+                'immediate_transactions': True,
+            },
+        }
+        connections.ensure_defaults(ALIAS)
+        connections.prepare_test_settings(ALIAS)
+        self.addCleanup(self.drop_alias)
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('CREATE TABLE log (n INTEGER, writer INTEGER)')
+
+    def drop_alias(self):
+        connections[ALIAS].close()
+        delattr(connections._connections, ALIAS)
+        del connections.databases[ALIAS]
+
+    def pragma(self, name):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """ тестируем PRAGMA при подключении """
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+
+    def test_parallel_writers(self):
+        """ тестируем, что параллельные писатели не теряют записи """
+
+        @retry_on_busy(using=ALIAS)
+        def write(writer):
+            # Чтение перед записью: с обычным BEGIN второй писатель
+            # получил бы «database is locked» при повышении блокировки.
+            with connections[ALIAS].cursor() as cursor:
+                cursor.execute('SELECT COALESCE(MAX(n), 0) FROM log')
+                last = cursor.fetchone()[0]
+                cursor.execute(
+                    'INSERT INTO log (n, writer) VALUES (%s, %s)',
+                    [last + 1, writer],
+                )
+
+        def run(writer):
+            try:
+                for _ in range(WRITES):
+                    write(writer)
+            finally:
+                connections[ALIAS].close()
+
+        with ThreadPoolExecutor(WRITERS) as pool:
+            list(pool.map(run, range(WRITERS)))
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT n), COUNT(DISTINCT writer) '
+                'FROM log'
+            )
+            total = WRITERS * WRITES
+            self.assertEqual(cursor.fetchone(), (total, total, WRITERS))
+
+    def test_retry_on_busy(self):
+        """ тестируем повтор только при занятой базе """
+        calls = []
+
+        @retry_on_busy(using=ALIAS, delay=0.001)
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        self.assertEqual(flaky(), 'ok')
+        self.assertEqual(len(calls), 3)
+
+        @retry_on_busy(using=ALIAS, delay=0.001)
+        def broken():
+            calls.append(1)
+            raise OperationalError('no such table: missing')
+
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            broken()
+        self.assertEqual(len(calls), 1)
+
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            with transaction.atomic(using=ALIAS):
+                flaky()
+        self.assertEqual(len(calls), 1)
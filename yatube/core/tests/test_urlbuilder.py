@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Engine
+from django.test import SimpleTestCase, TestCase
+from django.urls import NoReverseMatch, reverse, set_script_prefix
+
+from core import urlbuilder
+from posts import microbench
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class BuildTests(SimpleTestCase):
+    def tearDown(self):
+        set_script_prefix('/')
+
+    def test_matches_reverse(self):
+        """ тестируем совпадение адресов с reverse() """
+        cases = (
+            ('posts:main', ()),
+            ('posts:post_detail', (15,)),
+            ('posts:post_edit', (7,)),
+            ('posts:group_posts', ('group-1',)),
+            ('posts:profile', ('leo',)),
+            ('posts:profile', ('Лев Толстой',)),
+            ('posts:profile', ('a?b#c',)),
+            ('about:tech', ()),
+            ('api:v1:post_detail', (3,)),
+            ('metrics', ()),
+        )
+        for name, args in cases:
+            with self.subTest(name=name, args=args):
+                self.assertEqual(
+                    urlbuilder.build(name, *args), reverse(name, args=args)
+                )
+        self.assertEqual(
+            urlbuilder.build('posts:post_detail', post_id=15),
+            reverse('posts:post_detail', kwargs={'post_id': 15}),
+        )
+
+    def test_compiled_namespace(self):
+        """ тестируем, что простые шаблоны компилируются """
+        table = urlbuilder.compile_namespace('posts')
+        self.assertIn('post_detail', table)
+        self.assertIn('profile', table)
+        self.assertEqual(urlbuilder.compile_namespace('missing'), {})
+
+    def test_invalid_values(self):
+        """ тестируем ошибки как у reverse() """
+        for args in ((-1,), ('x',), (1, 2), ()):
+            with self.subTest(args=args):
+                with self.assertRaises(NoReverseMatch):
+                    urlbuilder.build('posts:post_detail', *args)
+        with self.assertRaises(NoReverseMatch):
+            urlbuilder.build('posts:group_posts', 'плохой slug')
+        self.assertEqual(
+            urlbuilder.build('posts:post_detail', '5'), '/posts/5/'
+        )
+
+    def test_script_prefix(self):
+        """ тестируем префикс приложения """
+        set_script_prefix('/yatube/')
+        self.assertEqual(
+            urlbuilder.build('posts:post_detail', 1), '/yatube/posts/1/'
+        )
+
+    def test_template_tag(self):
+        """ тестируем тег fast_url """
+        template = Engine.get_default().from_string(
+            "{% load fast_urls %}{% fast_url 'posts:profile' name %}"
+            "{% fast_url 'posts:main' as main %}[{{ main }}]"
+        )
+        self.assertEqual(
+            template.render(Context({'name': 'leo'})), '/profile/leo/[/]'
+        )
+
+
+class ModelURLTests(TestCase):
+    def test_model_properties(self):
+        """ тестируем адреса поста и группы """
+        user = User.objects.create_user(username='leo')
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(author=user, group=group, text='Пост')
+        self.assertEqual(post.detail_url, f'/posts/{post.pk}/')
+        self.assertEqual(group.url, '/group/group/')
+
+    def test_microbench_urls(self):
+        """ тестируем микрозамер адресов """
+        user = User.objects.create_user(username='leo')
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=user, group=group, text='Пост')
+        report = microbench.urls(iterations=2)
+        self.assertEqual(
+            set(report['posts:post_detail']), {'reverse', 'build', 'speedup'}
+        )
@@ -1,5 +1,11 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import registry
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,13 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def metrics(request):
+    """Метрики процесса в текстовом формате Prometheus."""
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1'])
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        raise Http404
+    return HttpResponse(
+        registry.exposition(), content_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from . import search
 from .models import Group, Post, Follow
 
 
@@ -15,6 +16,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице ищем по поисковому индексу.
+        tokens = search.tokenize(search_term)
+        if not tokens:
+            return queryset, False
+        post_ids = search.get_backend().search(tokens, search.max_results())
+        return queryset.filter(pk__in=post_ids), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
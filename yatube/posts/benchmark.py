@@ -0,0 +1,258 @@
+"""Нагрузочный замер страниц.
+
+Страницы запрашиваются тестовым клиентом в том же процессе, без
+сети: замер показывает стоимость view, шаблонов, кэша и базы. Для
+каждой страницы считаются перцентили задержки, число SQL-запросов на
+запрос и пропускная способность. Результат — JSON, который удобно
+сохранять и сравнивать между коммитами.
+
+Замер идет с DEBUG=False и пустым INTERNAL_IPS: иначе каждый ответ
+дорисовывает debug_toolbar, и цифры не похожи на продакшен. Замер
+с --cold очищает кэш перед каждым запросом, поэтому идет на своем
+LocMem-кэше (ISOLATED_CACHES): настроенный общий кэш, например redis,
+не очищается.
+"""
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+PERCENTILES = (50, 95, 99)
+MEASURE_SETTINGS = {'DEBUG': False, 'INTERNAL_IPS': []}
+# Отдельный кэш для замеров, которые его очищают.
+ISOLATED_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.instrumented.InstrumentedCache',
+        'OPTIONS': {'TARGET': 'benchmark'},
+    },
+    'benchmark': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+def percentile(values, percent):
+    """Перцентиль отсортированного списка с линейной интерполяцией."""
+    if not values:
+        return None
+    position = (len(values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (
+        position - lower
+    )
+
+
+class QueryCounter:
+    """execute_wrapper, считающий запросы без сохранения их текста."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _first_word(text):
+    return next((word for word in text.split() if word.isalpha()), text)
+
+
+def targets():
+    """{имя URL: (адрес, пользователь)} для самых тяжелых объектов."""
+    group = (
+        Post.objects.filter(group__isnull=False).order_by()
+        .values('group').annotate(total=Count('pk'))
+        .order_by('-total').values_list('group', flat=True).first()
+    )
+    author = UserCounters.objects.order_by('-posts_count').first()
+    reader = UserCounters.objects.order_by('-following_count').first()
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    pages = {
+        'posts:main': (reverse('posts:main'), None),
+        'api:v1:posts': (reverse('api:v1:posts'), None),
+    }
+    if group is not None:
+        slug = Group.objects.get(pk=group).slug
+        pages['posts:group_posts'] = (
+            reverse('posts:group_posts', kwargs={'slug': slug}), None
+        )
+    if author is not None:
+        pages['posts:profile'] = (
+            reverse(
+                'posts:profile',
+                kwargs={
+                    'username': User.objects.get(pk=author.user_id).username
+                },
+            ),
+            None,
+        )
+    if post is not None:
+        pages['posts:post_detail'] = (
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}), None
+        )
+        pages['posts:search'] = (
+            f'{reverse("posts:search")}?'
+            f'{urlencode({"q": _first_word(post.text)})}',
+            None,
+        )
+    if reader is not None and reader.following_count:
+        pages['posts:follow_index'] = (
+            reverse('posts:follow_index'),
+            User.objects.get(pk=reader.user_id),
+        )
+    return pages
+
+
+def dataset():
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'follows': Follow.objects.count(),
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+class Benchmark:
+    def __init__(self, requests=100, warmup=10, concurrency=1,
+                 cold=False, names=None):
+        self.requests = requests
+        self.warmup = warmup
+        self.concurrency = concurrency
+        self.cold = cold
+        self.names = names
+
+    def request(self, client, url):
+        """Один запрос: (секунды, число SQL-запросов, код ответа)."""
+        if self.cold:
+            cache.clear()
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+        return elapsed, counter.count, response.status_code
+
+    def series(self, url, user, amount):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        return [self.request(client, url) for _ in range(amount)]
+
+    def threaded_series(self, url, user, amount):
+        try:
+            return self.series(url, user, amount)
+        finally:
+            # У каждого потока свое соединение с базой.
+            connection.close()
+
+    def measure(self, url, user):
+        self.series(url, user, self.warmup)
+        started = time.perf_counter()
+        if self.concurrency > 1:
+            shares = [
+                self.requests // self.concurrency
+                + (number < self.requests % self.concurrency)
+                for number in range(self.concurrency)
+            ]
+            with ThreadPoolExecutor(self.concurrency) as pool:
+                parts = pool.map(
+                    lambda amount: self.threaded_series(url, user, amount),
+                    shares,
+                )
+                samples = [sample for part in parts for sample in part]
+        else:
+            samples = self.series(url, user, self.requests)
+        wall = time.perf_counter() - started
+        latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+        result = {
+            'url': url,
+            'requests': len(samples),
+            'errors': sum(status >= 400 for _, _, status in samples),
+        }
+        for percent in PERCENTILES:
+            result[f'p{percent}_ms'] = round(
+                percentile(latencies, percent), 3
+            )
+        result['mean_ms'] = round(sum(latencies) / len(latencies), 3)
+        result['queries_per_request'] = round(
+            sum(queries for _, queries, _ in samples) / len(samples), 2
+        )
+        result['throughput_rps'] = round(len(samples) / wall, 1)
+        return result
+
+    def run(self, progress=None):
+        pages = targets()
+        names = self.names or sorted(pages)
+        unknown = sorted(set(names) - set(pages))
+        if unknown:
+            raise ValueError(
+                f'Нет данных для страниц: {", ".join(unknown)}'
+            )
+        results = {}
+        overrides = dict(MEASURE_SETTINGS)
+        if self.cold:
+            overrides['CACHES'] = ISOLATED_CACHES
+        with override_settings(**overrides):
+            for name in names:
+                url, user = pages[name]
+                results[name] = self.measure(url, user)
+                if progress is not None:
+                    progress(name, results[name])
+            debug = settings.DEBUG
+            internal_ips = list(settings.INTERNAL_IPS)
+        return {
+            'meta': {
+                'commit': git_commit(),
+                'created': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'requests': self.requests,
+                'warmup': self.warmup,
+                'concurrency': self.concurrency,
+                'cold_cache': self.cold,
+                'cache': 'isolated' if self.cold else 'configured',
+                'debug': debug,
+                'internal_ips': internal_ips,
+                'dataset': dataset(),
+            },
+            'results': results,
+        }
+
+
+def compare(baseline, current, metric='p95_ms'):
+    """Строки (страница, было, стало, изменение в %) по общим страницам."""
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name, {}).get(metric)
+        after = result.get(metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        rows.append((name, before, after, round(change, 1)))
+    return rows
@@ -0,0 +1,375 @@
+"""Потоковые импорт и экспорт групп, постов, комментариев и подписок.
+
+Данные идут конвейером генераторов: чтение записей -> разбор пачками
+(с workers > 1 — в пуле процессов) -> bulk_create пачками в
+транзакции. В памяти одновременно лежит не больше нескольких пачек,
+поэтому размер файла не важен.
+
+Число обработанных записей хранится в контрольной точке
+(ImportCheckpoint) и пишется в той же транзакции, что и пачка: после
+сбоя повторный запуск с тем же именем продолжает ровно с первой
+незаписанной пачки. С контрольной точкой записи, которые уже есть в
+базе (по id, подписки — по паре), пропускаются.
+
+Записи без id получают id перед вставкой только там, где bulk_create
+не возвращает первичные ключи (SQLite), — они нужны лентам и поиску.
+На PostgreSQL id выдает последовательность.
+
+Пользователи не переносятся: авторы и подписчики задаются username.
+bulk_create не вызывает сигналы, поэтому производные данные
+(счетчики, ленты, поисковый индекс, версии кэша) обновляются после
+каждой пачки явно.
+"""
+import csv
+import json
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from itertools import islice
+from multiprocessing import Pool
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, feed, fragments, graph, search
+from .models import Comment, Follow, Group, ImportCheckpoint, Post, User
+
+FORMATS = ('ndjson', 'csv')
+BATCH_SIZE = 2000
+LOOKUP_CHUNK = 500
+
+# fields — колонки файла; users — колонки с username; dates — даты,
+# которые нужно сохранить, несмотря на auto_now_add.
+Spec = namedtuple('Spec', 'model fields users dates')
+
+SPECS = {
+    'group': Spec(Group, ('id', 'title', 'slug', 'description'), (), ()),
+    'post': Spec(
+        Post,
+        ('id', 'text', 'pub_date', 'author', 'group', 'image'),
+        ('author',),
+        ('pub_date',),
+    ),
+    'comment': Spec(
+        Comment,
+        ('id', 'post', 'author', 'text', 'created'),
+        ('author',),
+        ('created',),
+    ),
+    'follow': Spec(Follow, ('user', 'author'), ('user', 'author'), ()),
+}
+
+
+def guess_format(path):
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'ndjson'
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def is_key(spec, name):
+    """Колонка с числовым ключом: id или внешний ключ не на пользователя."""
+    field = spec.model._meta.get_field(name)
+    return field.primary_key or (field.is_relation and name not in spec.users)
+
+
+# Экспорт.
+
+def _dump(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export_rows(kind):
+    spec = SPECS[kind]
+    columns = [
+        f'{name}__username' if name in spec.users else name
+        for name in spec.fields
+    ]
+    rows = spec.model.objects.order_by('pk').values_list(*columns)
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        yield {
+            name: _dump(value) for name, value in zip(spec.fields, row)
+        }
+
+
+def write_rows(rows, stream, fmt, fields):
+    """Пишет строки в NDJSON или CSV, возвращает их число."""
+    total = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fields)
+        writer.writeheader()
+    for row in rows:
+        if fmt == 'csv':
+            writer.writerow(row)
+        else:
+            stream.write(json.dumps(row, ensure_ascii=False))
+            stream.write('\n')
+        total += 1
+    return total
+
+
+# Разбор. Функции верхнего уровня, чтобы их можно было отдать в пул.
+
+def read_records(stream, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield line
+
+
+def _parse_value(spec, name, value):
+    if name in spec.dates:
+        return parse_datetime(value) if value else None
+    if is_key(spec, name):
+        return int(value) if value not in (None, '') else None
+    return value if value is not None else ''
+
+
+def parse_chunk(task):
+    kind, fmt, records = task
+    spec = SPECS[kind]
+    rows = []
+    for record in records:
+        if fmt == 'ndjson':
+            record = json.loads(record)
+        rows.append({
+            name: _parse_value(spec, name, record.get(name))
+            for name in spec.fields
+        })
+    return rows
+
+
+def parallel_map(func, tasks, workers):
+    """map по порядку задач; в работе не больше workers * 2 задач."""
+    if workers <= 1:
+        yield from map(func, tasks)
+        return
+    with Pool(workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(func, (task,)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+# Запись в базу.
+
+def resolve_users(usernames, create_missing=False):
+    users = {}
+    for chunk in chunks(usernames, LOOKUP_CHUNK):
+        users.update(
+            User.objects.filter(username__in=chunk).values_list(
+                'username', 'pk'
+            )
+        )
+    missing = sorted(set(usernames) - set(users))
+    if missing and not create_missing:
+        raise ValueError(
+            f'Нет пользователей: {", ".join(missing[:10])}'
+        )
+    if missing:
+        password = make_password(None)
+        User.objects.bulk_create(
+            (User(username=name, password=password) for name in missing),
+            batch_size=LOOKUP_CHUNK,
+        )
+        users.update(resolve_users(missing))
+        fragments.invalidate('users')
+    return users
+
+
+def build_objects(spec, rows, create_users=False):
+    users = resolve_users(
+        {row[name] for row in rows for name in spec.users}, create_users
+    )
+    now = timezone.now()
+    objects = []
+    for row in rows:
+        values = {}
+        for name in spec.fields:
+            value = row[name]
+            if name in spec.users:
+                values[f'{name}_id'] = users[value]
+            elif name in spec.dates:
+                values[name] = value or now
+            elif name != 'id' and is_key(spec, name):
+                values[f'{name}_id'] = value
+            else:
+                values[name] = value
+        objects.append(spec.model(**values))
+    return objects
+
+
+def update_derived(kind, objects):
+    """То, что при обычном сохранении сделали бы сигналы."""
+    if kind == 'group':
+        fragments.invalidate('groups')
+    elif kind == 'post':
+        authors = {post.author_id for post in objects}
+        groups = {post.group_id for post in objects}
+        counters.rebuild_users(authors)
+        feed.fan_out_posts(objects)
+        search.index_posts([post.pk for post in objects])
+        fragments.invalidate('index')
+        for author_id in authors:
+            fragments.invalidate('profile', author_id)
+        for group_id in groups - {None}:
+            fragments.invalidate('group', group_id)
+    elif kind == 'comment':
+        post_ids = sorted({comment.post_id for comment in objects})
+        counters.rebuild_posts(post_ids)
+        search.index_posts(post_ids)
+        for post_id in post_ids:
+            fragments.invalidate('comments', post_id)
+    elif kind == 'follow':
+        pairs = [(follow.user_id, follow.author_id) for follow in objects]
+        user_ids = {pk for pair in pairs for pk in pair}
+        counters.rebuild_users(user_ids)
+        feed.mark_pull_authors({author_id for _, author_id in pairs})
+        feed.backfill_many(pairs)
+        graph.invalidate_pairs(pairs)
+        for user_id in user_ids:
+            fragments.invalidate('profile', user_id)
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def assign_ids(model, objects):
+    """Выдает id объектам без него, продолжая максимальный id таблицы."""
+    missing = [obj for obj in objects if obj.pk is None]
+    if missing:
+        start = next_id(model)
+        for number, obj in enumerate(missing):
+            obj.pk = start + number
+
+
+def new_objects(kind, objects):
+    """Объекты пачки, которых еще нет в базе.
+
+    Подписки сравниваются по паре (user, author), остальное — по id.
+    """
+    if kind == 'follow':
+        existing = set(Follow.objects.filter(
+            user_id__in={follow.user_id for follow in objects},
+            author_id__in={follow.author_id for follow in objects},
+        ).values_list('user_id', 'author_id'))
+        fresh = []
+        for follow in objects:
+            pair = (follow.user_id, follow.author_id)
+            if pair not in existing:
+                existing.add(pair)
+                fresh.append(follow)
+        return fresh
+    model = SPECS[kind].model
+    existing = set(model.objects.filter(
+        pk__in=[obj.pk for obj in objects]
+    ).values_list('pk', flat=True))
+    return [obj for obj in objects if obj.pk not in existing]
+
+
+def save_batch(kind, objects, derived=True, ignore_conflicts=False):
+    """Вставляет пачку объектов и обновляет производные данные.
+
+    С ignore_conflicts уже существующие объекты отбрасываются до
+    вставки, чтобы производные данные считались только по новым.
+    Сама вставка идет без ignore_conflicts: иначе PostgreSQL не вернет
+    id новых строк.
+    """
+    model = SPECS[kind].model
+    with transaction.atomic():
+        if not connection.features.can_return_ids_from_bulk_insert:
+            assign_ids(model, objects)
+        if ignore_conflicts:
+            objects = new_objects(kind, objects)
+        model.objects.bulk_create(objects)
+        if derived:
+            update_derived(kind, objects)
+
+
+@contextmanager
+def preserved_dates(spec):
+    """Отключает auto_now_add, чтобы сохранить даты из файла."""
+    fields = [spec.model._meta.get_field(name) for name in spec.dates]
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+def read_checkpoint(name, kind):
+    if not name:
+        return 0
+    state = ImportCheckpoint.objects.filter(name=name).first()
+    if state is None:
+        return 0
+    if state.kind != kind:
+        raise ValueError(
+            f'Контрольная точка записана для {state.kind}, а не {kind}'
+        )
+    return state.records
+
+
+def write_checkpoint(name, kind, records):
+    """Вызывается внутри транзакции пачки."""
+    ImportCheckpoint.objects.update_or_create(
+        name=name, defaults={'kind': kind, 'records': records}
+    )
+
+
+def reset_sequences(model):
+    """После вставки с явными id сдвигает последовательности (PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def import_records(kind, stream, fmt, batch_size=BATCH_SIZE, workers=1,
+                   checkpoint=None, derived=True, create_users=False,
+                   progress=None):
+    """Импортирует записи из потока, возвращает число обработанных."""
+    spec = SPECS[kind]
+    done = read_checkpoint(checkpoint, kind)
+    records = islice(read_records(stream, fmt), done, None)
+    tasks = ((kind, fmt, chunk) for chunk in chunks(records, batch_size))
+    with preserved_dates(spec):
+        for rows in parallel_map(parse_chunk, tasks, workers):
+            # Пользователи из create_users, пачка и контрольная
+            # точка — одна транзакция.
+            with transaction.atomic():
+                save_batch(
+                    kind,
+                    build_objects(spec, rows, create_users),
+                    derived=derived,
+                    ignore_conflicts=bool(checkpoint),
+                )
+                if checkpoint:
+                    write_checkpoint(checkpoint, kind, done + len(rows))
+            done += len(rows)
+            if progress is not None:
+                progress(done)
+    reset_sequences(spec.model)
+    return done
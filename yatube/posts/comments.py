@@ -0,0 +1,71 @@
+"""Комментарии поста порциями, от старых к новым.
+
+Курсор — (created, id) последнего показанного комментария. Следующая
+порция выбирается условием по нему в порядке индекса
+comment_post_created_idx, без OFFSET и COUNT(*), поэтому размер и
+стоимость страницы поста не зависят от числа комментариев. Первая
+порция выводится на странице поста, остальные отдает
+views.post_comments.
+"""
+import base64
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import Comment
+
+
+def per_page():
+    return getattr(settings, 'COMMENTS_PER_PAGE', 20)
+
+
+class CommentThread:
+    field = Comment._meta.get_field('created')
+
+    def __init__(self, post_id, cursor=None, limit=None):
+        self.post_id = post_id
+        self.cursor = cursor or None
+        self.limit = limit or per_page()
+
+    def encode_cursor(self, comment):
+        raw = f'{self.field.value_to_string(comment)}|{comment.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        padded = cursor + '=' * (-len(cursor) % 4)
+        try:
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            created, pk = raw.split('|')
+            return self.field.to_python(created), int(pk)
+        except (ValueError, ValidationError):
+            return None
+
+    def queryset(self):
+        comments = Comment.objects.filter(
+            post_id=self.post_id
+        ).select_related('author').order_by('created', 'pk')
+        decoded = self.decode_cursor(self.cursor) if self.cursor else None
+        if decoded is None:
+            return comments
+        created, pk = decoded
+        # Как в CursorPaginator.ordered: диапазон по индексу, а не OR.
+        return comments.filter(
+            Q(created__gte=created), Q(created__gt=created) | Q(pk__gt=pk)
+        )
+
+    @cached_property
+    def window(self):
+        return list(self.queryset()[:self.limit + 1])
+
+    @property
+    def comments(self):
+        """Комментарии порции; читаются при первом обращении."""
+        return self.window[:self.limit]
+
+    @property
+    def next_cursor(self):
+        if len(self.window) <= self.limit:
+            return None
+        return self.encode_cursor(self.window[self.limit - 1])
@@ -0,0 +1,124 @@
+from itertools import islice
+
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, User, UserCounters
+
+USER_COUNTERS = ('posts_count', 'followers_count', 'following_count')
+CHUNK_SIZE = 500
+
+
+def _deltas(**deltas):
+    return {field: F(field) + delta for field, delta in deltas.items()}
+
+
+def _guarded(queryset, deltas):
+    """Не дает счетчику уйти ниже нуля при рассинхронизации."""
+    return queryset.filter(**{
+        f'{field}__gte': -delta
+        for field, delta in deltas.items() if delta < 0
+    })
+
+
+def bump_user(user_id, **deltas):
+    """Атомарно меняет счетчики пользователя через F().
+
+    Если строки счетчиков еще нет, при увеличении она пересчитывается
+    целиком; уменьшение без строки (каскадное удаление) пропускается.
+    """
+    updated = _guarded(
+        UserCounters.objects.filter(user_id=user_id), deltas
+    ).update(**_deltas(**deltas))
+    if not updated and max(deltas.values()) > 0:
+        rebuild_users([user_id])
+
+
+def bump_post(post_id, delta):
+    deltas = {'comments_count': delta}
+    _guarded(Post.objects.filter(pk=post_id), deltas).update(
+        **_deltas(**deltas)
+    )
+
+
+def _grouped(queryset, field):
+    return dict(
+        queryset.order_by().values(field).annotate(total=Count('pk'))
+        .values_list(field, 'total')
+    )
+
+
+def _rebuild_chunk(user_ids):
+    actual = {
+        'posts_count': _grouped(
+            Post.objects.filter(author__in=user_ids), 'author'
+        ),
+        'followers_count': _grouped(
+            Follow.objects.filter(author__in=user_ids), 'author'
+        ),
+        'following_count': _grouped(
+            Follow.objects.filter(user__in=user_ids), 'user'
+        ),
+    }
+    existing = UserCounters.objects.in_bulk(user_ids)
+    created, changed = [], []
+    for user_id in user_ids:
+        counters = existing.get(user_id)
+        is_new = counters is None
+        if is_new:
+            counters = UserCounters(user_id=user_id)
+        dirty = False
+        for field in USER_COUNTERS:
+            value = actual[field].get(user_id, 0)
+            if getattr(counters, field) != value:
+                setattr(counters, field, value)
+                dirty = True
+        if is_new:
+            created.append(counters)
+        elif dirty:
+            changed.append(counters)
+    UserCounters.objects.bulk_create(created, ignore_conflicts=True)
+    UserCounters.objects.bulk_update(changed, USER_COUNTERS)
+    return len(created) + len(changed)
+
+
+def rebuild_users(user_ids=None):
+    """Пересчитывает счетчики пользователей, возвращает число исправлений."""
+    if user_ids is None:
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        user_ids = user_ids.iterator()
+    user_ids = iter(user_ids)
+    fixed = 0
+    chunk = list(islice(user_ids, CHUNK_SIZE))
+    while chunk:
+        fixed += _rebuild_chunk(chunk)
+        chunk = list(islice(user_ids, CHUNK_SIZE))
+    return fixed
+
+
+def _rebuild_posts_chunk(post_ids):
+    actual = _grouped(Comment.objects.filter(post__in=post_ids), 'post')
+    changed = []
+    posts = Post.objects.filter(pk__in=post_ids).only(
+        'pk', 'comments_count'
+    ).order_by()
+    for post in posts:
+        value = actual.get(post.pk, 0)
+        if post.comments_count != value:
+            post.comments_count = value
+            changed.append(post)
+    Post.objects.bulk_update(changed, ['comments_count'])
+    return len(changed)
+
+
+def rebuild_posts(post_ids=None):
+    """Пересчитывает число комментариев, возвращает число исправлений."""
+    if post_ids is None:
+        post_ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+        post_ids = post_ids.iterator()
+    post_ids = iter(post_ids)
+    fixed = 0
+    chunk = list(islice(post_ids, CHUNK_SIZE))
+    while chunk:
+        fixed += _rebuild_posts_chunk(chunk)
+        chunk = list(islice(post_ids, CHUNK_SIZE))
+    return fixed
@@ -0,0 +1,229 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import FeedItem, Follow, Post, UserCounters
+from .utils import CursorPaginator
+
+BATCH_SIZE = 500
+
+
+def fanout_limit():
+    """Посты авторов с большим числом подписчиков не раскладываются
+    по лентам, а подтягиваются при чтении."""
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+
+
+def _pull(prefix=''):
+    """Условие pull-автора: сейчас выше лимита или был выше когда-то.
+
+    Пока автор выше лимита, его новые посты не раскладываются, поэтому
+    после падения ниже лимита он остается на pull-пути (pull_feed),
+    иначе эти посты пропали бы из лент.
+    """
+    return (
+        Q(**{f'{prefix}followers_count__gt': fanout_limit()})
+        | Q(**{f'{prefix}pull_feed': True})
+    )
+
+
+def is_pull_author(author_id):
+    return UserCounters.objects.filter(_pull(), user_id=author_id).exists()
+
+
+def mark_pull_authors(author_ids):
+    """Запоминает авторов, превысивших лимит, в pull_feed."""
+    UserCounters.objects.filter(
+        user_id__in=author_ids,
+        followers_count__gt=fanout_limit(),
+        pull_feed=False,
+    ).update(pull_feed=True)
+
+
+def pull_authors(user):
+    return list(
+        Follow.objects.filter(
+            _pull('author__counters__'), user=user
+        ).values_list('author', flat=True)
+    )
+
+
+def _push(items):
+    items = iter(items)
+    batch = list(islice(items, BATCH_SIZE))
+    while batch:
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(items, BATCH_SIZE))
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_pull_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user', flat=True)
+    _push(
+        FeedItem(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if is_pull_author(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _push(
+        FeedItem(
+            user_id=user_id,
+            post_id=pk,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def _pulled_among(author_ids):
+    return set(
+        UserCounters.objects.filter(
+            _pull(), user_id__in=author_ids
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out_posts(posts):
+    """fan_out_post для пачки постов: по запросу на подписчиков пачки."""
+    by_author = {}
+    for post in posts:
+        by_author.setdefault(post.author_id, []).append(post)
+    pulled = _pulled_among(list(by_author))
+    followers = Follow.objects.filter(
+        author__in=[pk for pk in by_author if pk not in pulled]
+    ).values_list('author', 'user')
+    _push(
+        FeedItem(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=author_id,
+            pub_date=post.pub_date,
+        )
+        for author_id, user_id in followers.iterator()
+        for post in by_author[author_id]
+    )
+
+
+def backfill_many(pairs):
+    """backfill для пачки подписок (user_id, author_id)."""
+    followers = {}
+    for user_id, author_id in pairs:
+        followers.setdefault(author_id, []).append(user_id)
+    pulled = _pulled_among(list(followers))
+    posts = Post.objects.filter(
+        author__in=[pk for pk in followers if pk not in pulled]
+    ).order_by().values_list('author', 'pk', 'pub_date')
+    _push(
+        FeedItem(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for author_id, post_id, pub_date in posts.iterator()
+        for user_id in followers[author_id]
+    )
+
+
+def prune(user_id, author_id):
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follow_feed(user, pulled=None):
+    """Посты ленты подписок: материализованная лента плюс pull-авторы."""
+    condition = Q(pk__in=FeedItem.objects.filter(user=user).values('post'))
+    if pulled is None:
+        pulled = pull_authors(user)
+    if pulled:
+        condition |= Q(author__in=pulled)
+    return Post.objects.filter(condition)
+
+
+class FeedItemPosts:
+    """Посты материализованной ленты как последовательность для Paginator.
+
+    Страница ?page=N читается по индексу ленты с OFFSET, без сортировки.
+    """
+
+    def __init__(self, items):
+        self.items = items
+
+    def count(self):
+        return self.items.count()
+
+    def __getitem__(self, index):
+        return [item.post for item in self.items[index]]
+
+
+class FollowFeedPaginator(CursorPaginator):
+    """Курсорные страницы ленты подписок без сортировки в базе.
+
+    Материализованная лента читается из FeedItem в порядке индекса
+    (user, pub_date, post) вместе с постами, посты pull-авторов — по
+    индексу (author, pub_date, id); два окна сливаются в Python.
+    object_list (follow_feed) нужен для страниц из кэша и ?page=N.
+    """
+
+    def __init__(self, user, per_page, cache_key=None):
+        self.user = user
+        self.pulled = pull_authors(user)
+        super().__init__(
+            follow_feed(user, self.pulled).select_related('author', 'group'),
+            per_page,
+            'pub_date',
+            cache_key,
+        )
+
+    def feed_items(self):
+        return FeedItem.objects.filter(user=self.user).select_related(
+            'post__author', 'post__group'
+        )
+
+    @property
+    def post_list(self):
+        """Список постов для старой пагинации ?page=N."""
+        if self.pulled:
+            return self.object_list
+        return FeedItemPosts(
+            self.feed_items().order_by('-pub_date', '-post_id')
+        )
+
+    def window(self, decoded=None):
+        limit = self.per_page + 1
+        items = self.feed_items()
+        rows = {
+            item.post_id: item.post
+            for item in self.ordered(items, decoded, 'post_id')[:limit]
+        }
+        if self.pulled:
+            posts = Post.objects.filter(
+                author__in=self.pulled
+            ).select_related('author', 'group')
+            rows.update(
+                (post.pk, post)
+                for post in self.ordered(posts, decoded)[:limit]
+            )
+        forward = decoded is None or decoded[0] == 'n'
+        return sorted(
+            rows.values(),
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=forward,
+        )[:limit]
@@ -1,4 +1,6 @@
 from django import forms
+
+from . import uploads
 from .models import Post, Comment
 
 
@@ -22,6 +24,16 @@ class PostForm(forms.ModelForm):
             'image': 'Изображение в посте',
         }
 
+    def clean(self):
+        # Файл, отвергнутый при приеме, сохранен не целиком: вместо
+        # общей ошибки картинки показываем причину.
+        error = uploads.upload_error(self.files.get('image'))
+        if error is not None:
+            self._errors.pop('image', None)
+            self.cleaned_data.pop('image', None)
+            self.add_error('image', error)
+        return super().clean()
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
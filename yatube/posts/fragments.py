@@ -0,0 +1,75 @@
+"""Ключи фрагментного кэша лент.
+
+Каждая лента ('index', ('group', id), ('profile', id), ('comments', id))
+имеет счетчик версии. Списки id постов на странице кэшируются под
+ключом с текущей версией, поэтому изменение поста инвалидирует только
+затронутые ленты: старые ключи просто перестают читаться.
+Карточки постов кэшируются в шаблонах по (post.pk, post.updated_at).
+
+Общие версии ('groups', 'users') меняются при правке групп и
+профилей, которые видны в карточках любой ленты. Рядом с версией
+хранится время последнего изменения ленты — из него и версий
+собираются ETag и Last-Modified страниц (см. feed_state).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def feed_timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 300)
+
+
+def _version_key(name, key):
+    return f'feed-version:{name}:{key}'
+
+
+def feed_version(name, key=''):
+    version_key = _version_key(name, key)
+    version = cache.get(version_key)
+    if version is None:
+        # Значение от времени не повторяет версии, вытесненные из кэша.
+        cache.add(version_key, time.time_ns(), None)
+        version = cache.get(version_key)
+    return version
+
+
+def feed_key(name, key=''):
+    return f'feed:{name}:{key}:{feed_version(name, key)}'
+
+
+def _changed_key(name, key):
+    return f'feed-changed:{name}:{key}'
+
+
+def invalidate(name, key=''):
+    try:
+        cache.incr(_version_key(name, key))
+    except ValueError:
+        cache.add(_version_key(name, key), time.time_ns(), None)
+    cache.set(_changed_key(name, key), time.time(), None)
+
+
+def feed_state(*feeds):
+    """Версии лент (пары (name, key)) и время последнего изменения.
+
+    Если время вытеснено из кэша, изменение считается только что
+    случившимся: лучше лишний ответ 200, чем устаревший 304.
+    """
+    versions = tuple(feed_version(name, key) for name, key in feeds)
+    keys = [_changed_key(name, key) for name, key in feeds]
+    changed = cache.get_many(keys)
+    for changed_key in keys:
+        if changed_key not in changed:
+            cache.add(changed_key, time.time(), None)
+            changed[changed_key] = cache.get(changed_key) or time.time()
+    return versions, max(changed.values())
+
+
+def invalidate_post_feeds(author_id, *group_ids):
+    invalidate('index')
+    invalidate('profile', author_id)
+    for group_id in set(group_ids):
+        if group_id is not None:
+            invalidate('group', group_id)
@@ -0,0 +1,77 @@
+"""Токены свежести публичных страниц для core.conditional.
+
+Токен собирается из версий лент в кэше (posts.fragments). Общие версии
+'groups' и 'users' входят в каждый токен: название группы и имя автора
+видны в карточках всех лент. Группа, автор или пост, найденные для
+токена, запоминаются на запросе и переиспользуются view через
+get_object_or_404, так что проверка свежести не добавляет запросов.
+"""
+from django.shortcuts import get_object_or_404 as django_get_object_or_404
+
+from .fragments import feed_state
+from .models import Group, Post, User
+
+SHARED = (('groups', ''), ('users', ''))
+
+
+def group_queryset():
+    return Group.objects.all()
+
+
+def author_queryset():
+    return User.objects.select_related('counters')
+
+
+def post_queryset():
+    return Post.objects.select_related('author__counters', 'group')
+
+
+def _lookup(request, queryset, **lookup):
+    key = (queryset.model, tuple(sorted(lookup.items())))
+    found = getattr(request, '_page_objects', None)
+    if found is None:
+        found = request._page_objects = {}
+    if key not in found:
+        found[key] = queryset.filter(**lookup).first()
+    return found[key]
+
+
+def get_object_or_404(request, queryset, **lookup):
+    """get_object_or_404 с учетом объекта, найденного для токена."""
+    key = (queryset.model, tuple(sorted(lookup.items())))
+    found = getattr(request, '_page_objects', {}).get(key)
+    if found is not None:
+        return found
+    return django_get_object_or_404(queryset, **lookup)
+
+
+def index_state(request):
+    return feed_state(('index', ''), *SHARED)
+
+
+def group_state(request, slug):
+    group = _lookup(request, group_queryset(), slug=slug)
+    if group is None:
+        return None
+    return feed_state(('group', group.pk), *SHARED)
+
+
+def profile_state(request, username):
+    author = _lookup(request, author_queryset(), username=username)
+    if author is None:
+        return None
+    return feed_state(('profile', author.pk), *SHARED)
+
+
+def post_state(request, post_id):
+    post = _lookup(request, post_queryset(), pk=post_id)
+    if post is None:
+        return None
+    versions, changed = feed_state(
+        ('comments', post.pk), ('profile', post.author_id), *SHARED
+    )
+    updated_at = post.updated_at.timestamp()
+    return (
+        (versions, updated_at, post.comments_count),
+        max(changed, updated_at),
+    )
@@ -0,0 +1,266 @@
+"""Граф подписок: множества id из кэша и рекомендации.
+
+FollowGraph отдает id авторов, на которых подписан пользователь, и id
+его подписчиков. Множества читаются из кэша, а при промахе — одним
+запросом и кладутся в кэш. Множества больше FOLLOW_GRAPH_CACHE_LIMIT
+не кэшируются: у популярных авторов они слишком велики. Подписка и
+отписка сбрасывают оба затронутых ключа (сигналы и bulk), поэтому
+следующее чтение видит базу. Проверка подписки на целую страницу
+авторов — одно пересечение с уже загруженным множеством.
+
+Рекомендации «кого почитать» считаются офлайн командой
+build_suggestions: граф сжимается в два array('i') (смещения и
+соседи по плотным номерам пользователей), отдается каждому процессу
+пула один раз, и для каждого пользователя считаются авторы, на
+которых подписаны его подписки (друзья друзей). Результат пишется в
+таблицу FollowSuggestion: команда и веб-процессы могут не делить кэш
+(LocMem по умолчанию), а база у них общая.
+"""
+import heapq
+from array import array
+from collections import Counter
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow, FollowSuggestion, User
+
+SUGGESTIONS = 10
+CHUNK_SIZE = 1000
+
+
+def cache_limit():
+    return getattr(settings, 'FOLLOW_GRAPH_CACHE_LIMIT', 10000)
+
+
+def graph_timeout():
+    return getattr(settings, 'FOLLOW_GRAPH_TIMEOUT', 24 * 60 * 60)
+
+
+def _key(direction, user_id):
+    return f'follow-graph:{direction}:{user_id}'
+
+
+def invalidate(user_id, author_id):
+    """Сбрасывает множества обеих сторон подписки.
+
+    Второй сброс после коммита закрывает окно, в котором параллельный
+    запрос успел положить в кэш множество до изменения.
+    """
+    keys = [_key('following', user_id), _key('followers', author_id)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_pairs(pairs):
+    for user_id, author_id in pairs:
+        invalidate(user_id, author_id)
+
+
+class FollowGraph:
+    """Подписки в пределах одного запроса или задачи.
+
+    Загруженные множества запоминаются на экземпляре, так что
+    повторные проверки не обращаются даже к кэшу.
+    """
+    COLUMNS = {
+        'following': ('user_id', 'author_id'),
+        'followers': ('author_id', 'user_id'),
+    }
+
+    def __init__(self):
+        self.loaded = {}
+
+    def _ids(self, direction, user_id):
+        key = _key(direction, user_id)
+        if key in self.loaded:
+            return self.loaded[key]
+        ids = cache.get(key)
+        if ids is None:
+            column, value = self.COLUMNS[direction]
+            ids = frozenset(Follow.objects.filter(
+                **{column: user_id}
+            ).values_list(value, flat=True))
+            if len(ids) <= cache_limit():
+                cache.set(key, ids, graph_timeout())
+        self.loaded[key] = ids
+        return ids
+
+    def following(self, user_id):
+        """id авторов, на которых подписан пользователь."""
+        return self._ids('following', user_id)
+
+    def followers(self, user_id):
+        """id подписчиков пользователя."""
+        return self._ids('followers', user_id)
+
+    def is_following(self, user_id, author_id):
+        return author_id in self.following(user_id)
+
+    def following_among(self, user_id, author_ids):
+        """Те из author_ids, на кого подписан пользователь."""
+        return self.following(user_id).intersection(author_ids)
+
+    def suggestions(self, user_id, limit=SUGGESTIONS):
+        """Рекомендации build_suggestions без уже сделанных подписок.
+
+        Возвращает [(id автора, число общих подписок)].
+        """
+        # Строк не больше лимита build_suggestions: сортируем в памяти,
+        # а выборка идет по индексу уникальности (user, author).
+        suggested = sorted(
+            FollowSuggestion.objects.filter(user_id=user_id).values_list(
+                'author_id', 'score'
+            ),
+            key=lambda item: (-item[1], item[0]),
+        )
+        if not suggested:
+            return []
+        followed = self.following_among(
+            user_id, [author_id for author_id, _ in suggested]
+        )
+        return [
+            (author_id, score) for author_id, score in suggested
+            if author_id not in followed
+        ][:limit]
+
+    def suggested_authors(self, user_id, limit=SUGGESTIONS):
+        """Пользователи из suggestions() с полем common — их счетом."""
+        suggested = self.suggestions(user_id, limit)
+        if not suggested:
+            return []
+        users = User.objects.in_bulk([author_id for author_id, _ in suggested])
+        authors = []
+        for author_id, score in suggested:
+            if author_id in users:
+                users[author_id].common = score
+                authors.append(users[author_id])
+        return authors
+
+
+def follow(user, author):
+    """Подписывает user на author; True, если подписки еще не было."""
+    if user.pk == author.pk:
+        return False
+    _, created = Follow.objects.get_or_create(user=user, author=author)
+    return created
+
+
+def unfollow(user, author):
+    """Отписывает; сигналы post_delete сбрасывают кэш и ленты."""
+    deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+    return bool(deleted)
+
+
+# Рекомендации. Функции верхнего уровня, чтобы их можно было отдать в пул.
+
+def build_adjacency():
+    """(ids, offsets, targets): подписки в виде сжатых строк.
+
+    ids[i] — id пользователя с плотным номером i; номера авторов, на
+    которых он подписан, лежат в targets[offsets[i]:offsets[i + 1]].
+    """
+    ids = array('i', User.objects.order_by('pk').values_list(
+        'pk', flat=True
+    ).iterator())
+    index = {pk: number for number, pk in enumerate(ids)}
+    offsets = array('i', [0] * (len(ids) + 1))
+    targets = array('i')
+    edges = Follow.objects.order_by('user_id', 'author_id').values_list(
+        'user_id', 'author_id'
+    )
+    for user_id, author_id in edges.iterator():
+        if user_id not in index or author_id not in index:
+            # Пользователь появился после выборки ids.
+            continue
+        targets.append(index[author_id])
+        offsets[index[user_id] + 1] += 1
+    for number in range(len(ids)):
+        offsets[number + 1] += offsets[number]
+    return ids, offsets, targets
+
+
+_adjacency = None
+
+
+def _set_adjacency(adjacency):
+    global _adjacency
+    _adjacency = adjacency
+
+
+def suggest_chunk(task):
+    """Рекомендации для пользователей с номерами [start, stop)."""
+    start, stop, limit = task
+    ids, offsets, targets = _adjacency
+    result = []
+    for number in range(start, stop):
+        own = targets[offsets[number]:offsets[number + 1]]
+        if not own:
+            continue
+        scores = Counter()
+        for friend in own:
+            scores.update(targets[offsets[friend]:offsets[friend + 1]])
+        scores.pop(number, None)
+        for friend in own:
+            scores.pop(friend, None)
+        if not scores:
+            continue
+        best = heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+        result.append(
+            (ids[number], [(ids[author], score) for author, score in best])
+        )
+    return result
+
+
+def build_suggestions(processes=1, limit=SUGGESTIONS, chunk_size=CHUNK_SIZE,
+                      progress=None):
+    """Считает рекомендации для всех и пишет их в FollowSuggestion.
+
+    Рекомендации каждой задачи заменяют прежние для ее диапазона id
+    в одной транзакции, так что читатели видят либо старый, либо
+    новый список. Возвращает число пользователей, для которых они
+    нашлись.
+    """
+    adjacency = build_adjacency()
+    ids = adjacency[0]
+    users = len(ids)
+    tasks = [
+        (start, min(start + chunk_size, users), limit)
+        for start in range(0, users, chunk_size)
+    ]
+    done = 0
+
+    def store(chunks):
+        nonlocal done
+        for (start, stop, _), chunk in zip(tasks, chunks):
+            with transaction.atomic():
+                FollowSuggestion.objects.filter(
+                    user_id__gte=ids[start], user_id__lte=ids[stop - 1]
+                ).delete()
+                FollowSuggestion.objects.bulk_create(
+                    FollowSuggestion(
+                        user_id=user_id, author_id=author_id, score=score
+                    )
+                    for user_id, suggested in chunk
+                    for author_id, score in suggested
+                )
+            done += len(chunk)
+            if progress is not None:
+                progress(done)
+
+    if processes <= 1:
+        _set_adjacency(adjacency)
+        try:
+            store(map(suggest_chunk, tasks))
+        finally:
+            _set_adjacency(None)
+    else:
+        with Pool(
+            processes, initializer=_set_adjacency, initargs=(adjacency,)
+        ) as pool:
+            store(pool.imap(suggest_chunk, tasks))
+    return done
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts import graph
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает рекомендации «кого почитать» по подпискам друзей и '
+        'сохраняет их в таблицу рекомендаций.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов для подсчета.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=graph.SUGGESTIONS,
+            help='Рекомендаций на пользователя.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=graph.CHUNK_SIZE,
+            help='Пользователей в одной задаче пула.',
+        )
+
+    def handle(self, *args, **options):
+        users = graph.build_suggestions(
+            processes=options['processes'],
+            limit=options['limit'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации готовы для пользователей: {users}'
+        ))
@@ -0,0 +1,130 @@
+import re
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.feed import follow_feed
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import AMOUNT, CursorPaginator
+
+# Полный проход по таблице без индекса и сортировка во временном дереве.
+BAD_PLAN = re.compile(
+    r'^SCAN (TABLE )?\w+( AS \w+)?$|USE TEMP B-TREE'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает ленты, профиль и пост на временных данных, выполняет '
+        'EXPLAIN QUERY PLAN для каждого SELECT и завершается с ошибкой, '
+        'если запрос читает таблицу без индекса или сортирует во '
+        'временном B-дереве. Данные откатываются, кэш не трогается.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'Проверка планов написана для EXPLAIN QUERY PLAN в SQLite.'
+            )
+        isolated = override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'check-query-plans',
+            }},
+            THUMBNAIL_ASYNC=False,
+        )
+        with isolated, transaction.atomic():
+            failures = self.check_pages(options['verbosity'])
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(
+                f'Запросы без подходящего индекса: {failures}'
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы'))
+
+    def create_fixtures(self):
+        suffix = uuid.uuid4().hex[:8]
+        author = User.objects.create_user(username=f'plan-author-{suffix}')
+        reader = User.objects.create_user(username=f'plan-reader-{suffix}')
+        group = Group.objects.create(
+            title='План', slug=f'plan-{suffix}', description='План'
+        )
+        Follow.objects.create(user=reader, author=author)
+        for i in range(AMOUNT * 2 + 1):
+            Post.objects.create(
+                author=author, group=group if i % 2 else None, text=f'{i}'
+            )
+        post = Post.objects.filter(author=author).first()
+        Comment.objects.create(post=post, author=reader, text='План')
+        return author, reader, group, post
+
+    @staticmethod
+    def next_cursor(queryset):
+        paginator = CursorPaginator(queryset, AMOUNT)
+        paginator.page()
+        return paginator.next_cursor
+
+    def pages(self, author, reader, group, post):
+        """(название, пользователь, адрес) для каждого запроса лент."""
+        feeds = (
+            ('index', reverse('posts:main'), Post.objects.all()),
+            (
+                'group',
+                reverse('posts:group_posts', kwargs={'slug': group.slug}),
+                group.posts.all(),
+            ),
+            (
+                'profile',
+                reverse(
+                    'posts:profile', kwargs={'username': author.username}
+                ),
+                author.posts.all(),
+            ),
+            ('follow', reverse('posts:follow_index'), follow_feed(reader)),
+        )
+        for name, url, queryset in feeds:
+            user = reader if name == 'follow' else None
+            yield name, user, url
+            cursor = self.next_cursor(queryset)
+            yield f'{name} (курсор)', user, f'{url}?cursor={cursor}'
+            yield f'{name} (?page=2)', user, f'{url}?page=2'
+        yield 'post_detail', None, reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}
+        )
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def check_pages(self, verbosity):
+        fixtures = self.create_fixtures()
+        failures = 0
+        for label, user, url in list(self.pages(*fixtures)):
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{label}: ответ {response.status_code}')
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                plan = self.explain(sql)
+                bad = [step for step in plan if BAD_PLAN.search(step)]
+                failures += bool(bad)
+                if bad:
+                    self.stdout.write(self.style.ERROR(f'{label}: {sql}'))
+                elif verbosity > 1:
+                    self.stdout.write(f'{label}: {sql}')
+                if bad or verbosity > 1:
+                    for step in plan:
+                        self.stdout.write(f'    {step}')
+        return failures
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает группы, посты, комментарии или подписки в '
+        'NDJSON или CSV. Путь «-» — стандартный вывод.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(bulk.SPECS))
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS,
+            help='По умолчанию по расширению файла, иначе ndjson.',
+        )
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        fmt = options['format'] or bulk.guess_format(path)
+        rows = bulk.export_rows(kind)
+        fields = bulk.SPECS[kind].fields
+        if path == '-':
+            total = bulk.write_rows(rows, sys.stdout, fmt, fields)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                total = bulk.write_rows(rows, stream, fmt, fields)
+        self.stderr.write(f'Выгружено записей: {total}')
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk
+from posts.synthetic import Generator
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает синтетические группы, пользователей, подписки, посты и '
+        'комментарии для нагрузочных замеров. Подписчики, посты и '
+        'комментарии распределены по степенному закону; одно зерно дает '
+        'один и тот же набор данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--images', type=float, default=0.1,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель степенного закона; 0 — равномерно.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней разбросаны даты публикации.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE
+        )
+
+    def progress(self, kind, done):
+        if self.verbosity > 1:
+            self.stderr.write(f'{kind}: {done}')
+
+    def handle(self, *args, **options):
+        sizes = ('users', 'posts', 'follows', 'comments', 'groups')
+        if any(options[name] < 0 for name in sizes):
+            raise CommandError('Размеры не могут быть отрицательными')
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images должна быть от 0 до 1')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть > 0')
+        self.verbosity = options['verbosity']
+        created = Generator(
+            **{name: options[name] for name in sizes},
+            images=options['images'],
+            skew=options['skew'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            progress=self.progress,
+        ).run()
+        summary = ', '.join(
+            f'{kind} {total}' for kind, total in created.items()
+        )
+        self.stdout.write(self.style.SUCCESS(f'Создано: {summary}'))
@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит миниатюры и адаптивные варианты для постов с картинкой, '
+        'у которых их еще нет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков для обработки картинок.',
+        )
+
+    def handle(self, *args, **options):
+        pending = Post.objects.exclude(image='').filter(
+            Q(thumbnail='') | Q(image_variants='')
+        ).values_list('pk', 'image')
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            jobs = {
+                pool.submit(thumbnails.run_in_worker, pk, image): pk
+                for pk, image in pending.iterator()
+            }
+            for job in as_completed(jobs):
+                try:
+                    job.result()
+                except Exception:
+                    failed += 1
+                    thumbnails.logger.exception(
+                        'Не удалось подготовить миниатюру поста %s', jobs[job]
+                    )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {len(jobs) - failed}, с ошибкой: {failed}'
+        ))
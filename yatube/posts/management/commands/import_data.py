@@ -0,0 +1,89 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает группы, посты, комментарии или подписки из '
+        'NDJSON или CSV пачками через bulk_create. С --checkpoint '
+        'прерванную загрузку можно продолжить повторным запуском. '
+        'Путь «-» — стандартный ввод.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(bulk.SPECS))
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS,
+            help='По умолчанию по расширению файла, иначе ndjson.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE,
+            help='Записей в одной транзакции.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Процессов для разбора записей.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help=(
+                'Имя контрольной точки: число загруженных записей '
+                'хранится в базе вместе с пачками.'
+            ),
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать отсутствующих пользователей без пароля.',
+        )
+        parser.add_argument(
+            '--no-derived', action='store_true',
+            help=(
+                'Не обновлять счетчики, ленты и поиск; после загрузки '
+                'запустите rebuild_counters и rebuild_search_index.'
+            ),
+        )
+
+    def progress(self, done):
+        self.done = done
+        if self.verbosity > 1:
+            self.stderr.write(f'Загружено записей: {done}')
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size и --workers должны быть > 0')
+        self.verbosity = options['verbosity']
+        self.done = 0
+        fmt = options['format'] or bulk.guess_format(path)
+        arguments = {
+            'batch_size': options['batch_size'],
+            'workers': options['workers'],
+            'checkpoint': options['checkpoint'],
+            'derived': not options['no_derived'],
+            'create_users': options['create_users'],
+            'progress': self.progress,
+        }
+        try:
+            self.done = bulk.read_checkpoint(options['checkpoint'], kind)
+            if path == '-':
+                total = bulk.import_records(kind, sys.stdin, fmt, **arguments)
+            else:
+                with open(path, encoding='utf-8', newline='') as stream:
+                    total = bulk.import_records(kind, stream, fmt, **arguments)
+        except (ValueError, KeyError) as exc:
+            raise CommandError(f'Ошибка в данных: {exc}')
+        except DatabaseError as exc:
+            # Пачки до ошибки уже записаны, каждая в своей транзакции.
+            raise CommandError(
+                f'Ошибка базы в пачке с записи {self.done + 1}: {exc}. '
+                f'Загружено записей: {self.done}; продолжить можно с '
+                f'--checkpoint.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано записей: {total}'
+        ))
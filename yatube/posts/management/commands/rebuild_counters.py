@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счетчики постов, комментариев '
+        'и подписок и исправляет расхождения.'
+    )
+
+    def handle(self, *args, **options):
+        users = counters.rebuild_users()
+        posts = counters.rebuild_posts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков: пользователей {users}, постов {posts}'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов целиком.'
+
+    def handle(self, *args, **options):
+        total = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {total} '
+            f'(бэкенд {search.get_backend().name})'
+        ))
@@ -0,0 +1,79 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from posts.benchmark import Benchmark, compare
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет ленты, профиль, пост, поиск и API на текущих данных: '
+        'p50/p95/p99, SQL-запросы на запрос и пропускную способность. '
+        'Результат пишется в JSON; --compare сравнивает с прошлым '
+        'замером. Данные удобно готовить командой generate_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Потоков, одновременно отправляющих запросы.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--url', action='append', dest='names',
+            help='Имя URL, например posts:main; можно повторять.',
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для JSON; по умолчанию стандартный вывод.',
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого замера для сравнения p95.'
+        )
+
+    def progress(self, name, result):
+        self.stderr.write(
+            f'{name}: p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+            f'p99 {result["p99_ms"]} мс, '
+            f'{result["queries_per_request"]} запросов, '
+            f'{result["throughput_rps"]} rps'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests и --concurrency должны быть > 0')
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                baseline = json.load(stream)
+        benchmark = Benchmark(
+            requests=options['requests'],
+            warmup=options['warmup'],
+            concurrency=options['concurrency'],
+            cold=options['cold'],
+            names=options['names'],
+        )
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        try:
+            with override_settings(ALLOWED_HOSTS=hosts):
+                report = benchmark.run(progress=self.progress)
+        except ValueError as exc:
+            raise CommandError(exc)
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(output + '\n')
+        if baseline is not None:
+            for name, before, after, change in compare(baseline, report):
+                self.stderr.write(
+                    f'{name}: p95 {before} -> {after} мс ({change:+}%)'
+                )
@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import microbench
+
+
+class Command(BaseCommand):
+    help = (
+        'Микрозамеры рендера на текущих данных, в микросекундах на '
+        'операцию. cards — карточка поста разными способами: без кэша '
+        'шаблонов, include, {% cache %} и {% cached_card %}.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help=(
+                'Какие замеры выполнить: '
+                f'{", ".join(sorted(microbench.BENCHMARKS))}; '
+                'по умолчанию все.'
+            ),
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должно быть > 0')
+        try:
+            report = microbench.run(
+                options['names'], iterations=options['iterations']
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,145 @@
+"""Микрозамеры рендера: стоимость одной операции в микросекундах.
+
+В отличие от benchmark, здесь нет запросов к страницам: объекты
+выбираются заранее, а замеряется только сама операция — например,
+рендер карточки поста разными способами. Каждый способ выполняется
+repeat раз по iterations повторов, в отчет идет лучший результат.
+Кэш фрагментов — свой LocMem (benchmark.ISOLATED_CACHES), а не
+настроенный общий.
+"""
+import time
+
+from django.core.cache import cache
+from django.template import Context, Engine
+from django.test import override_settings
+from django.urls import reverse
+
+from core.urlbuilder import build
+
+from .benchmark import ISOLATED_CACHES
+from .models import Post
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+CARD_LOOPS = {
+    'include': (
+        "{% for post in posts %}{% include 'includes/post_card.html' %}"
+        '{% endfor %}'
+    ),
+    'cache_tag': (
+        '{% load cache %}{% for post in posts %}'
+        '{% cache 86400 bench_card post.pk post.updated_at %}'
+        "{% include 'includes/post_card.html' %}{% endcache %}"
+        '{% endfor %}'
+    ),
+    'cached_card': (
+        '{% load post_cards %}'
+        '{% for post in posts %}{% cached_card post %}{% endfor %}'
+    ),
+}
+
+
+def best_time(func, iterations, repeat=3):
+    """Лучшее из repeat время одного вызова func в секундах."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = (time.perf_counter() - started) / iterations
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def card_posts(amount):
+    return list(
+        Post.objects.select_related('author', 'group').order_by('-pk')[
+            :amount
+        ]
+    )
+
+
+def cards(iterations=50, amount=10):
+    """Микросекунды на карточку для каждого способа рендера.
+
+    uncached_loader — include без кэша шаблонов (загрузчики по
+    умолчанию с DEBUG): файл читается и компилируется на каждом рендере;
+    include — скомпилированный шаблон без кэша фрагментов; cache_tag —
+    прежний {% cache %} вокруг каждой карточки; cached_card — тег
+    cached_card. Замер с прогретыми кэшами.
+    """
+    posts = card_posts(amount)
+    if not posts:
+        raise ValueError('Нет постов для замера карточек')
+    engine = Engine.get_default()
+    uncached = Engine(
+        dirs=engine.dirs,
+        loaders=UNCACHED_LOADERS,
+        libraries=engine.libraries,
+    )
+    loops = {'uncached_loader': uncached.from_string(CARD_LOOPS['include'])}
+    loops.update(
+        (name, engine.from_string(source))
+        for name, source in CARD_LOOPS.items()
+    )
+    results = {}
+    with override_settings(CACHES=ISOLATED_CACHES):
+        cache.clear()
+        for name, loop in loops.items():
+            context = Context({'posts': posts})
+            loop.render(context)
+            seconds = best_time(lambda: loop.render(context), iterations)
+            results[name] = round(seconds / len(posts) * 10 ** 6, 2)
+    return results
+
+
+def urls(iterations=1000, amount=10):
+    """Микросекунды на адрес: reverse() против core.urlbuilder.build.
+
+    Для каждого имени URL — адреса постов выборки, их групп и авторов,
+    как в карточках лент.
+    """
+    posts = [post for post in card_posts(amount) if post.group_id]
+    if not posts:
+        raise ValueError('Нет постов с группой для замера адресов')
+    cases = {
+        'posts:post_detail': [(post.pk,) for post in posts],
+        'posts:group_posts': [(post.group.slug,) for post in posts],
+        'posts:profile': [(post.author.username,) for post in posts],
+    }
+    results = {}
+    for name, arguments in cases.items():
+        calls = {
+            'reverse': lambda name=name, arguments=arguments: [
+                reverse(name, args=args) for args in arguments
+            ],
+            'build': lambda name=name, arguments=arguments: [
+                build(name, *args) for args in arguments
+            ],
+        }
+        timings = {
+            label: round(
+                best_time(call, iterations) / len(arguments) * 10 ** 6, 3
+            )
+            for label, call in calls.items()
+        }
+        timings['speedup'] = round(timings['reverse'] / timings['build'], 1)
+        results[name] = timings
+    return results
+
+
+BENCHMARKS = {
+    'cards': cards,
+    'urls': urls,
+}
+
+
+def run(names=None, **options):
+    """{имя: результат} для выбранных микрозамеров."""
+    names = names or sorted(BENCHMARKS)
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        raise ValueError(f'Нет микрозамеров: {", ".join(unknown)}')
+    return {name: BENCHMARKS[name](**options) for name in names}
@@ -0,0 +1,68 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserCounters = apps.get_model('posts', 'UserCounters')
+
+    def grouped(queryset, field):
+        return dict(
+            queryset.order_by().values(field).annotate(total=Count('pk'))
+            .values_list(field, 'total')
+        )
+
+    posts = grouped(Post.objects.all(), 'author')
+    followers = grouped(Follow.objects.all(), 'author')
+    following = grouped(Follow.objects.all(), 'user')
+    UserCounters.objects.bulk_create(
+        (
+            UserCounters(
+                user_id=pk,
+                posts_count=posts.get(pk, 0),
+                followers_count=followers.get(pk, 0),
+                following_count=following.get(pk, 0),
+            )
+            for pk in User.objects.values_list('pk', flat=True)
+        ),
+        batch_size=500,
+    )
+    for post_id, total in grouped(Comment.objects.all(), 'post').items():
+        Post.objects.filter(pk=post_id).update(comments_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_feeditem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+            ],
+            options={
+                'verbose_name': 'Счетчики пользователя',
+                'verbose_name_plural': 'Счетчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
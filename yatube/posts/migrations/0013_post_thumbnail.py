@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Миниатюра'),
+        ),
+    ]
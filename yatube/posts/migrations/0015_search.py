@@ -0,0 +1,61 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:13
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+import django.db.models.deletion
+
+
+def create_fts_table(apps, schema_editor):
+    """На SQLite с FTS5 создает и заполняет индекс posts_search."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_search USING fts5('
+            'text, comments, group_title, '
+            "tokenize = 'unicode61 remove_diacritics 0')"
+        )
+    except OperationalError:
+        # SQLite собран без FTS5: поиск работает на SearchTerm.
+        return
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text, comments, group_title) '
+        'SELECT p.id, p.text, '
+        "(SELECT group_concat(c.text, ' ') FROM posts_comment c "
+        'WHERE c.post_id = p.id), '
+        "coalesce(g.title, '') "
+        'FROM posts_post p LEFT JOIN posts_group g ON g.id = p.group_id'
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, max_length=64, verbose_name='Слово')),
+                ('weight', models.PositiveIntegerField(default=0, verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term_post'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounters',
+            name='pull_feed',
+            field=models.BooleanField(default=False, verbose_name='Лента по запросу'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_pull_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Имя')),
+                ('kind', models.CharField(max_length=16, verbose_name='Тип записей')),
+                ('records', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлена')),
+            ],
+            options={
+                'verbose_name': 'Контрольная точка загрузки',
+                'verbose_name_plural': 'Контрольные точки загрузки',
+            },
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from core.urlbuilder import build
+from . import variants
+
 User = get_user_model()
 MAX_LENGHT = 15
 COMMENTS_LENGHT = 200
@@ -14,6 +17,10 @@ class Group(models.Model):
     def __str__(self):
         return self.title
 
+    @property
+    def url(self):
+        return build('posts:group_posts', self.slug)
+
 
 class Post(models.Model):
 
@@ -46,15 +53,72 @@ class Post(models.Model):
         blank=True,
         help_text='Картинка, которая будет в после'
     )
+    thumbnail = models.CharField(
+        'Миниатюра',
+        max_length=255,
+        blank=True,
+        editable=False,
+    )
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        editable=False,
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы под ленты: (условие, pub_date, id) отдает страницу
+        # курсорной пагинации без сортировки.
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:MAX_LENGHT]
 
+    @property
+    def detail_url(self):
+        return build('posts:post_detail', self.pk)
+
+    @property
+    def image_sources(self):
+        """srcset для <source> в современных форматах."""
+        return [
+            {'type': mime, 'srcset': srcset}
+            for mime, srcset in variants.srcsets(self.image_variants)
+            if mime != 'image/jpeg'
+        ]
+
+    @property
+    def image_srcset(self):
+        """srcset запасного JPEG для <img>."""
+        for mime, srcset in variants.srcsets(self.image_variants):
+            if mime == 'image/jpeg':
+                return srcset
+        return ''
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -78,6 +142,14 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.text[:MAX_LENGHT]
 
@@ -105,3 +177,140 @@ class Follow(models.Model):
                 name="unique_user_author"
             )
         ]
+
+
+class UserCounters(models.Model):
+    """Денормализованные счетчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        related_name='counters',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+    # Хоть раз превышал FEED_FANOUT_LIMIT: посты читаются при запросе.
+    pull_feed = models.BooleanField('Лента по запросу', default=False)
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class FeedItem(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        related_name='feed',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='feed_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='feed_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_user_post'
+            )
+        ]
+
+
+class FollowSuggestion(models.Model):
+    """Рекомендация «кого почитать» от команды build_suggestions."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        related_name='suggestions',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+',
+    )
+    score = models.PositiveIntegerField('Общих подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_suggestion_user_author',
+            )
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Сколько записей загрузил import_data под этим именем."""
+    name = models.CharField('Имя', max_length=255, unique=True)
+    kind = models.CharField('Тип записей', max_length=16)
+    records = models.PositiveIntegerField('Записей', default=0)
+    updated = models.DateTimeField('Обновлена', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Контрольная точка загрузки'
+        verbose_name_plural = 'Контрольные точки загрузки'
+
+    def __str__(self):
+        return self.name
+
+
+class SearchTerm(models.Model):
+    """Запись обратного индекса поиска: слово и его вес в посте."""
+    term = models.CharField('Слово', max_length=64, db_index=True)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='search_terms',
+    )
+    weight = models.PositiveIntegerField('Вес', default=0)
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term_post',
+            )
+        ]
+
+    def __str__(self):
+        return self.term
@@ -0,0 +1,316 @@
+"""Полнотекстовый поиск по постам, комментариям и названиям групп.
+
+На SQLite с FTS5 индекс — виртуальная таблица posts_search (rowid
+совпадает с id поста), ранжирование bm25 и сниппеты считает сама база.
+На остальных базах работает обратный индекс в модели SearchTerm: слова
+поста с весами полей, ранжирование tf-idf на Python.
+
+Индекс обновляется сигналами при изменении постов, комментариев и
+групп; целиком его перестраивает команда rebuild_search_index.
+"""
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Sum
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post, SearchTerm
+
+FTS_TABLE = 'posts_search'
+CHUNK_SIZE = 500
+MAX_TERM_LENGTH = 64
+SNIPPET_WORDS = 16
+WORD_RE = re.compile(r'\w+')
+# Веса полей документа: текст поста, комментарии, название группы.
+FIELDS = (('text', 2), ('comments', 1), ('group_title', 4))
+# Маркеры подсветки; заменяются на <mark> после экранирования.
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def max_results():
+    return getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+
+
+def fold(word):
+    """Приводит слово к виду из индекса.
+
+    Только нормализация и регистр: диакритику не снимаем, иначе «й»
+    превратится в «и». Так же настроен токенизатор FTS5.
+    """
+    return unicodedata.normalize('NFKC', word).lower()[:MAX_TERM_LENGTH]
+
+
+def tokenize(text):
+    return [fold(word) for word in WORD_RE.findall(text)]
+
+
+def chunks(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def documents(post_ids):
+    """Поля документов индекса: {post_id: {'text': ..., ...}}."""
+    docs = {
+        pk: {'text': text, 'comments': [], 'group_title': title or ''}
+        for pk, text, title in Post.objects.filter(
+            pk__in=post_ids
+        ).values_list('pk', 'text', 'group__title')
+    }
+    comments = Comment.objects.filter(post__in=list(docs)).order_by('pk')
+    for post_id, text in comments.values_list('post', 'text'):
+        docs[post_id]['comments'].append(text)
+    for doc in docs.values():
+        doc['comments'] = ' '.join(doc['comments'])
+    return docs
+
+
+def highlight(text, tokens):
+    """Отрывок текста вокруг первого совпадения с маркерами подсветки."""
+    words = list(WORD_RE.finditer(text))
+    if not words:
+        return text
+    matched = [
+        any(fold(word.group()).startswith(token) for token in tokens)
+        for word in words
+    ]
+    first = matched.index(True) if True in matched else 0
+    start = min(first - SNIPPET_WORDS // 4, len(words) - SNIPPET_WORDS)
+    start = max(0, start)
+    end = min(len(words), start + SNIPPET_WORDS)
+    parts = ['…'] if start else []
+    position = words[start].start()
+    for word, hit in zip(words[start:end], matched[start:end]):
+        parts.append(text[position:word.start()])
+        if hit:
+            parts.append(f'{MARK_START}{word.group()}{MARK_END}')
+        else:
+            parts.append(word.group())
+        position = word.end()
+    if end < len(words):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def render_snippet(raw):
+    """Безопасный HTML сниппета: текст экранирован, совпадения в <mark>."""
+    return mark_safe(
+        escape(raw).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    )
+
+
+class FTS5Backend:
+    name = 'fts5'
+
+    def index(self, post_ids):
+        docs = documents(post_ids)
+        self.remove(post_ids)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} '
+                '(rowid, text, comments, group_title) VALUES (%s, %s, %s, %s)',
+                [
+                    (pk, doc['text'], doc['comments'], doc['group_title'])
+                    for pk, doc in docs.items()
+                ],
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            for chunk in chunks(post_ids):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                    chunk,
+                )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    @staticmethod
+    def match(tokens):
+        # Слова — только \w, поэтому кавычки внутри невозможны.
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def search(self, tokens, limit):
+        weights = ', '.join(str(float(weight)) for _, weight in FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}), rowid DESC LIMIT %s',
+                [self.match(tokens), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def snippets(self, tokens, post_ids):
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, snippet({FTS_TABLE}, -1, char(2), char(3), "
+                f"'…', {SNIPPET_WORDS}) FROM {FTS_TABLE} "
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid IN ({placeholders})',
+                [self.match(tokens), *post_ids],
+            )
+            return dict(cursor.fetchall())
+
+
+class InvertedIndexBackend:
+    name = 'inverted'
+
+    @staticmethod
+    def term_weights(doc):
+        weights = {}
+        for field, weight in FIELDS:
+            for term in tokenize(doc[field]):
+                weights[term] = weights.get(term, 0) + weight
+        return weights
+
+    def index(self, post_ids):
+        docs = documents(post_ids)
+        self.remove(post_ids)
+        SearchTerm.objects.bulk_create(
+            (
+                SearchTerm(post_id=pk, term=term, weight=weight)
+                for pk, doc in docs.items()
+                for term, weight in self.term_weights(doc).items()
+            ),
+            batch_size=CHUNK_SIZE,
+        )
+
+    def remove(self, post_ids):
+        for chunk in chunks(post_ids):
+            SearchTerm.objects.filter(post__in=chunk).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def search(self, tokens, limit):
+        total = Post.objects.count() or 1
+        scores = None
+        for token in set(tokens):
+            matches = dict(
+                SearchTerm.objects.filter(term__startswith=token)
+                .order_by().values('post').annotate(weight=Sum('weight'))
+                .values_list('post', 'weight')
+            )
+            idf = math.log(1 + total / (len(matches) or 1))
+            if scores is None:
+                scores = {pk: weight * idf for pk, weight in matches.items()}
+            else:
+                scores = {
+                    pk: score + matches[pk] * idf
+                    for pk, score in scores.items() if pk in matches
+                }
+            if not scores:
+                return []
+        return sorted(scores, key=lambda pk: (-scores[pk], -pk))[:limit]
+
+    @staticmethod
+    def matches(text, tokens):
+        return any(
+            term.startswith(token)
+            for term in tokenize(text) for token in tokens
+        )
+
+    def snippets(self, tokens, post_ids):
+        result = {}
+        for pk, doc in documents(post_ids).items():
+            field = next(
+                (
+                    doc[name] for name, _ in FIELDS
+                    if self.matches(doc[name], tokens)
+                ),
+                doc['text'],
+            )
+            result[pk] = highlight(field, tokens)
+        return result
+
+
+BACKENDS = {
+    backend.name: backend for backend in (FTS5Backend, InvertedIndexBackend)
+}
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(database):
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def get_backend():
+    """Бэкенд из settings.SEARCH_BACKEND; 'auto' выбирает FTS5, если есть."""
+    name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'inverted'
+        if connection.vendor == 'sqlite' and _has_fts_table(
+            connection.settings_dict['NAME']
+        ):
+            name = 'fts5'
+    return BACKENDS[name]()
+
+
+def index_posts(post_ids):
+    backend = get_backend()
+    for chunk in chunks(post_ids):
+        backend.index(chunk)
+
+
+def remove_posts(post_ids):
+    get_backend().remove(list(post_ids))
+
+
+def rebuild():
+    """Перестраивает индекс целиком; возвращает число постов."""
+    backend = get_backend()
+    backend.clear()
+    total = 0
+    post_ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+    for chunk in chunks(post_ids.iterator()):
+        backend.index(chunk)
+        total += len(chunk)
+    return total
+
+
+class SearchResults:
+    """Выдача поиска для Paginator.
+
+    Ранжированные id считаются сразу, а посты и сниппеты загружаются
+    только для запрошенного среза, то есть для текущей страницы.
+    """
+
+    def __init__(self, query, backend=None):
+        self.tokens = tokenize(query)
+        self.backend = backend or get_backend()
+        self.ids = (
+            self.backend.search(self.tokens, max_results())
+            if self.tokens else []
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        if not ids:
+            return []
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        snippets = self.backend.snippets(self.tokens, ids)
+        page = []
+        for pk in ids:
+            if pk in posts:
+                post = posts[pk]
+                post.snippet = render_snippet(snippets.get(pk) or post.text)
+                page.append(post)
+        return page
@@ -0,0 +1,123 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counters, feed, fragments, graph, search, tasks, thumbnails
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if created:
+        UserCounters.objects.get_or_create(user=instance)
+    elif update_fields != frozenset({'last_login'}):
+        # Имя автора видно в карточках всех лент.
+        fragments.invalidate('users')
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        'group', 'image'
+    ).first() if instance.pk is not None else None
+    instance._previous_group_id, previous_image = previous or (None, '')
+    instance._image_changed = (instance.image.name or '') != previous_image
+    if instance._image_changed:
+        instance.thumbnail = ''
+        instance.image_variants = ''
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, posts_count=1)
+        tasks.fan_out_post.delay(instance.pk, key=f'fan_out:{instance.pk}')
+    if getattr(instance, '_image_changed', False):
+        thumbnails.schedule(instance)
+    tasks.index_posts.delay([instance.pk])
+    fragments.invalidate_post_feeds(
+        instance.author_id,
+        instance.group_id,
+        getattr(instance, '_previous_group_id', None),
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts_count=-1)
+    fragments.invalidate_post_feeds(instance.author_id, instance.group_id)
+    search.remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, 1)
+    fragments.invalidate('comments', instance.post_id)
+    tasks.index_posts.delay([instance.post_id])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    fragments.invalidate('comments', instance.post_id)
+    tasks.index_posts.delay([instance.post_id])
+
+
+def touch_group_posts(group):
+    """Карточки показывают данные группы: меняем их версию."""
+    Post.objects.filter(group=group).update(updated_at=timezone.now())
+
+
+def group_post_ids(group):
+    return list(group.posts.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        touch_group_posts(instance)
+        tasks.index_group.delay(instance.pk)
+        fragments.invalidate('groups')
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    touch_group_posts(instance)
+    fragments.invalidate('group', instance.pk)
+    fragments.invalidate('groups')
+    instance._post_ids = group_post_ids(instance)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    tasks.index_posts.delay(getattr(instance, '_post_ids', []))
+
+
+def invalidate_follow_profiles(follow):
+    """Профили показывают счетчики подписчиков и подписок."""
+    fragments.invalidate('profile', follow.author_id)
+    fragments.invalidate('profile', follow.user_id)
+    graph.invalidate(follow.user_id, follow.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, followers_count=1)
+        counters.bump_user(instance.user_id, following_count=1)
+        feed.mark_pull_authors([instance.author_id])
+        tasks.backfill.delay(
+            instance.user_id, instance.author_id, key=f'backfill:{instance.pk}'
+        )
+        invalidate_follow_profiles(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, followers_count=-1)
+    counters.bump_user(instance.user_id, following_count=-1)
+    feed.prune(instance.user_id, instance.author_id)
+    invalidate_follow_profiles(instance)
@@ -0,0 +1,241 @@
+"""Синтетические данные для нагрузочных замеров.
+
+Распределения с перекосом, как в живых соцсетях: число подписчиков,
+постов и комментариев подчиняется степенному закону (Ципф с
+показателем skew), у части постов есть группа и картинка. Одно и то же
+зерно дает один и тот же набор данных, поэтому замеры разных коммитов
+сравнимы.
+
+Объекты пишутся пачками через bulk.save_batch с явными id: счетчики,
+ленты и поисковый индекс обновляются так же, как при импорте.
+Подписки создаются раньше постов, чтобы раскладка по лентам сразу
+учитывала итоговое число подписчиков.
+"""
+import random
+from array import array
+from bisect import bisect
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from . import bulk, counters, fragments
+from .models import Comment, Follow, Group, Post, User
+
+IMAGE_POOL = 8
+IMAGE_SIZE = (960, 640)
+# Доля постов без группы.
+UNGROUPED = 0.3
+
+
+class PowerLaw:
+    """Случайный элемент items с весом 1 / (ранг + 1) ** skew."""
+
+    def __init__(self, items, skew, rng):
+        self.items = items
+        self.cumulative = list(accumulate(
+            1 / (rank + 1) ** skew for rank in range(len(self.items))
+        ))
+        self.rng = rng
+
+    def __call__(self):
+        point = self.rng.random() * self.cumulative[-1]
+        return self.items[bisect(self.cumulative, point)]
+
+
+class Generator:
+    def __init__(self, users=1000, posts=10000, follows=5000, comments=5000,
+                 groups=20, images=0.1, skew=1.1, days=365, seed=0,
+                 batch_size=bulk.BATCH_SIZE, progress=None):
+        self.sizes = {
+            'group': groups,
+            'user': users,
+            'follow': follows,
+            'post': posts,
+            'comment': comments,
+        }
+        self.images = images
+        self.skew = skew
+        self.days = days
+        self.seed = seed
+        self.batch_size = batch_size
+        self.progress = progress
+        self.rng = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.now = timezone.now()
+
+    def report(self, kind, done):
+        if self.progress is not None:
+            self.progress(kind, done)
+
+    def ranked(self, items):
+        items = list(items)
+        self.rng.shuffle(items)
+        return items
+
+    def save(self, kind, objects, **options):
+        done = 0
+        for batch in bulk.chunks(objects, self.batch_size):
+            bulk.save_batch(kind, batch, **options)
+            done += len(batch)
+            self.report(kind, done)
+
+    def run(self):
+        """Создает данные, возвращает {вид: число созданных}."""
+        group_ids = self.create_groups()
+        user_ids = self.create_users()
+        # Одни и те же авторы популярны и у подписчиков, и по числу
+        # постов; ранги перемешаны, чтобы это были не первые id.
+        authors = self.ranked(user_ids)
+        self.create_follows(user_ids, authors)
+        post_ids, published = self.create_posts(
+            user_ids, authors, self.ranked(group_ids)
+        )
+        self.create_comments(user_ids, post_ids, published)
+        for model in (Group, User, Post, Comment):
+            bulk.reset_sequences(model)
+        return dict(self.sizes)
+
+    def create_groups(self):
+        start = bulk.next_id(Group)
+        ids = range(start, start + self.sizes['group'])
+        self.save('group', (
+            Group(
+                id=pk,
+                title=self.fake.catch_phrase()[:200],
+                slug=f'group-{pk}',
+                description=self.fake.paragraph(),
+            )
+            for pk in ids
+        ))
+        return list(ids)
+
+    def create_users(self):
+        start = bulk.next_id(User)
+        ids = range(start, start + self.sizes['user'])
+        password = make_password(None)
+        users = (
+            User(
+                id=pk,
+                username=f'{self.fake.user_name()}{pk}'[:150],
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+            )
+            for pk in ids
+        )
+        done = 0
+        for batch in bulk.chunks(users, self.batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create(batch)
+                counters.rebuild_users([user.pk for user in batch])
+            done += len(batch)
+            self.report('user', done)
+        fragments.invalidate('users')
+        return list(ids)
+
+    def create_follows(self, user_ids, authors):
+        if len(user_ids) < 2:
+            self.sizes['follow'] = 0
+            return
+        author = PowerLaw(authors, self.skew, self.rng)
+
+        def follows():
+            for _ in range(self.sizes['follow']):
+                user_id = self.rng.choice(user_ids)
+                author_id = author()
+                while author_id == user_id:
+                    author_id = author()
+                yield Follow(user_id=user_id, author_id=author_id)
+
+        # Повторные пары отбрасывает уникальный индекс.
+        self.save('follow', follows(), ignore_conflicts=True)
+        self.sizes['follow'] = Follow.objects.filter(
+            user__gte=user_ids[0]
+        ).count()
+
+    def image_pool(self):
+        names = []
+        for number in range(IMAGE_POOL):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            image = Image.new('RGB', IMAGE_SIZE, color)
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=80)
+            names.append(default_storage.save(
+                f'posts/synthetic-{self.seed}-{number}.jpg',
+                ContentFile(buffer.getvalue()),
+            ))
+        return names
+
+    def create_posts(self, user_ids, authors, group_ids):
+        """Посты; возвращает их id и даты публикации в секундах."""
+        start = bulk.next_id(Post)
+        ids = range(start, start + self.sizes['post'])
+        if not user_ids:
+            self.sizes['post'] = 0
+            return [], array('d')
+        author = PowerLaw(authors, self.skew, self.rng)
+        group = PowerLaw(group_ids, self.skew, self.rng) if group_ids else None
+        images = self.image_pool() if self.images else []
+        published = array('d')
+        period = self.days * 24 * 60 * 60
+
+        def posts():
+            for pk in ids:
+                pub_date = self.now - timedelta(
+                    seconds=self.rng.random() * period
+                )
+                published.append(pub_date.timestamp())
+                with_group = group and self.rng.random() > UNGROUPED
+                with_image = images and self.rng.random() < self.images
+                yield Post(
+                    id=pk,
+                    author_id=author(),
+                    group_id=group() if with_group else None,
+                    text=self.fake.paragraph(
+                        nb_sentences=self.rng.randint(1, 6)
+                    ),
+                    pub_date=pub_date,
+                    image=self.rng.choice(images) if with_image else '',
+                )
+
+        with bulk.preserved_dates(bulk.SPECS['post']):
+            self.save('post', posts())
+        return list(ids), published
+
+    def create_comments(self, user_ids, post_ids, published):
+        if not post_ids:
+            self.sizes['comment'] = 0
+            return
+        start = bulk.next_id(Comment)
+        post = PowerLaw(
+            self.ranked(range(len(post_ids))), self.skew, self.rng
+        )
+
+        def comments():
+            for pk in range(start, start + self.sizes['comment']):
+                index = post()
+                since = self.now.timestamp() - published[index]
+                created = self.now - timedelta(
+                    seconds=since * self.rng.random()
+                )
+                yield Comment(
+                    id=pk,
+                    post_id=post_ids[index],
+                    author_id=self.rng.choice(user_ids),
+                    text=self.fake.sentence(
+                        nb_words=self.rng.randint(3, 20)
+                    ),
+                    created=created,
+                )
+
+        with bulk.preserved_dates(bulk.SPECS['comment']):
+            self.save('comment', comments())
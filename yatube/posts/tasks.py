@@ -0,0 +1,45 @@
+"""Фоновые задачи после записи постов, комментариев и подписок.
+
+Сигналы в запросе делают только дешевое — счетчики одним UPDATE и
+сброс версий кэша, — а работу, растущую с числом подписчиков и постов,
+ставят сюда. Задачи проверяют, что объект еще существует: между
+постановкой и выполнением его могли удалить.
+"""
+from tasks.registry import task
+
+from . import feed, search, thumbnails
+from .models import Follow, Post
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'author', 'pub_date'
+    ).first()
+    if post is not None:
+        feed.fan_out_post(post)
+
+
+@task
+def backfill(user_id, author_id):
+    # Отписка до выполнения задачи уже почистила ленту.
+    if Follow.objects.filter(user=user_id, author=author_id).exists():
+        feed.backfill(user_id, author_id)
+
+
+@task
+def index_posts(post_ids):
+    search.index_posts(post_ids)
+
+
+@task
+def index_group(group_id):
+    """Переиндексирует посты группы: в документе есть ее название."""
+    search.index_posts(list(
+        Post.objects.filter(group=group_id).values_list('pk', flat=True)
+    ))
+
+
+@task(max_attempts=3)
+def generate_thumbnail(post_id, image_name):
+    thumbnails.process(post_id, image_name)
@@ -0,0 +1,71 @@
+"""Тег {% cached_card post [show_group=False] %}.
+
+Карточка поста рендерится из includes/post_card.html один раз на
+версию поста: HTML лежит в кэше под (pk, updated_at, версия 'users',
+параметры карточки). Шаблон карточки компилируется один раз загрузчиком
+и рендерится в отдельном маленьком контексте, а не во всем контексте
+страницы, как include.
+"""
+from django import template
+from django.core.cache import cache
+
+from posts.fragments import feed_version
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post_card.html'
+CARD_TIMEOUT = 86400
+DEFAULTS = {'show_group': True}
+
+
+def card_key(post, options, users_version):
+    flags = ','.join(
+        f'{name}={int(bool(value))}' for name, value in sorted(options.items())
+    )
+    return (
+        f'card:{post.pk}:{post.updated_at.timestamp()}:'
+        f'{users_version}:{flags}'
+    )
+
+
+class CachedCardNode(template.Node):
+    def __init__(self, post, options):
+        self.post = post
+        self.options = options
+
+    def users_version(self, context):
+        # Имя автора видно в карточке; версию читаем раз на страницу.
+        if self not in context.render_context:
+            context.render_context[self] = feed_version('users')
+        return context.render_context[self]
+
+    def render(self, context):
+        post = self.post.resolve(context)
+        options = dict(DEFAULTS)
+        options.update(
+            (name, value.resolve(context))
+            for name, value in self.options.items()
+        )
+        key = card_key(post, options, self.users_version(context))
+        html = cache.get(key)
+        if html is None:
+            card = context.template.engine.get_template(CARD_TEMPLATE)
+            html = card.render(context.new({'post': post, **options}))
+            cache.set(key, html, CARD_TIMEOUT)
+        return html
+
+
+@register.tag
+def cached_card(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает пост: {{% {bits[0]} post %}}'
+        )
+    options = template.base.token_kwargs(bits[2:], parser)
+    unknown = set(options) - set(DEFAULTS)
+    if unknown or len(options) != len(bits) - 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]}: неизвестные параметры {" ".join(bits[2:])}'
+        )
+    return CachedCardNode(parser.compile_filter(bits[1]), options)
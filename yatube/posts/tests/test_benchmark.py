@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from posts.benchmark import Benchmark, compare, percentile
+from posts.models import Comment, FeedItem, Follow, Group, Post
+from posts.synthetic import Generator
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SIZES = {
+    'users': 40, 'posts': 200, 'follows': 150, 'comments': 100, 'groups': 4,
+}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GeneratorTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, **options):
+        return Generator(**SIZES, images=0.2, seed=7, **options).run()
+
+    def test_sizes(self):
+        """ тестируем объем созданных данных """
+        created = self.generate()
+        self.assertEqual(User.objects.count(), SIZES['users'])
+        self.assertEqual(Group.objects.count(), SIZES['groups'])
+        self.assertEqual(Post.objects.count(), SIZES['posts'])
+        self.assertEqual(Comment.objects.count(), SIZES['comments'])
+        self.assertEqual(Follow.objects.count(), created['follow'])
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertTrue(FeedItem.objects.exists())
+
+    def test_power_law(self):
+        """ тестируем перекос числа подписчиков и постов """
+        self.generate()
+        followers = Counter(
+            Follow.objects.values_list('author', flat=True)
+        )
+        posts = Counter(Post.objects.values_list('author', flat=True))
+        for counts in (followers, posts):
+            top = counts.most_common(1)[0][1]
+            average = sum(counts.values()) / SIZES['users']
+            self.assertGreater(top, 4 * average)
+
+    def test_seed_is_reproducible(self):
+        """ тестируем одинаковые данные при одном зерне """
+        self.generate()
+        texts = Post.objects.order_by('pk').values_list('text', flat=True)
+        first = list(texts)
+        for model in (Post, Follow, Group, User):
+            model.objects.all().delete()
+        self.generate()
+        self.assertEqual(list(texts.all()), first)
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Generator(**SIZES, images=0, seed=1).run()
+
+    def test_percentile(self):
+        """ тестируем расчет перцентилей """
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.5)
+        self.assertAlmostEqual(percentile(values, 99), 99.01)
+        self.assertIsNone(percentile([], 95))
+
+    def test_report(self):
+        """ тестируем отчет замера по всем страницам """
+        report = Benchmark(requests=3, warmup=1).run()
+        self.assertEqual(report['meta']['dataset']['posts'], SIZES['posts'])
+        self.assertIs(report['meta']['debug'], False)
+        self.assertEqual(report['meta']['internal_ips'], [])
+        self.assertIn('posts:follow_index', report['results'])
+        for name, result in report['results'].items():
+            with self.subTest(page=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertEqual(result['requests'], 3)
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+                self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+                self.assertGreater(result['queries_per_request'], 0)
+        self.assertEqual(
+            len(compare(report, report)), len(report['results'])
+        )
+
+    @override_settings(DEBUG=True, INTERNAL_IPS=['127.0.0.1'])
+    def test_debug_toolbar_is_off(self):
+        """ тестируем замер без debug_toolbar """
+        benchmark = Benchmark(requests=1, warmup=0, names=['posts:main'])
+        bodies = []
+        request = benchmark.request
+
+        def recording(client, url):
+            bodies.append(client.get(url).content)
+            return request(client, url)
+
+        benchmark.request = recording
+        benchmark.run()
+        self.assertTrue(bodies)
+        for body in bodies:
+            self.assertNotIn(b'djDebug', body)
+
+    def test_cold_keeps_configured_cache(self):
+        """ тестируем, что --cold не очищает общий кэш """
+        cache.set('kept', 1)
+        report = Benchmark(
+            requests=2, warmup=0, cold=True, names=['posts:main']
+        ).run()
+        self.assertEqual(report['results']['posts:main']['errors'], 0)
+        self.assertEqual(report['meta']['cache'], 'isolated')
+        self.assertEqual(cache.get('kept'), 1)
+
+    def test_command_writes_json(self):
+        """ тестируем JSON команды run_benchmark """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'bench.json')
+        call_command(
+            'run_benchmark', requests=2, warmup=0, names=['posts:main'],
+            output=path, stderr=open(os.devnull, 'w'),
+        )
+        with open(path, encoding='utf-8') as stream:
+            report = json.load(stream)
+        self.assertEqual(list(report['results']), ['posts:main'])
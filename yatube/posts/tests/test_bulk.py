@@ -0,0 +1,267 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts import search
+from posts.models import (Comment, FeedItem, Follow, Group,
+                          ImportCheckpoint, Post, UserCounters)
+
+User = get_user_model()
+KINDS = ('group', 'post', 'comment', 'follow')
+OLD_DATE = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+class BulkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.group = Group.objects.create(
+            title='Садоводство', slug='garden', description='Про сад'
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.author,
+                group=self.group if i % 2 else None,
+                text=f'Пост, "в кавычках"\nномер {i}',
+            )
+            for i in range(5)
+        ]
+        Post.objects.filter(pk=self.posts[0].pk).update(pub_date=OLD_DATE)
+        Comment.objects.create(
+            post=self.posts[1], author=self.reader, text='Помидоры'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def export(self, extension):
+        for kind in KINDS:
+            call_command(
+                'export_data', kind, self.path(f'{kind}.{extension}'),
+                stderr=open(os.devnull, 'w'),
+            )
+
+    def wipe(self):
+        Follow.objects.all().delete()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        search.get_backend().clear()
+
+    def load(self, extension, **options):
+        for kind in KINDS:
+            call_command(
+                'import_data', kind, self.path(f'{kind}.{extension}'),
+                stdout=open(os.devnull, 'w'), **options
+            )
+
+    def snapshot(self):
+        return (
+            list(Group.objects.values_list('pk', 'title', 'slug')),
+            list(Post.objects.values_list(
+                'pk', 'text', 'pub_date', 'author', 'group'
+            )),
+            list(Comment.objects.values_list(
+                'pk', 'post', 'author', 'text', 'created'
+            )),
+            list(Follow.objects.values_list('user', 'author')),
+        )
+
+    def test_round_trip(self):
+        """ тестируем выгрузку и загрузку в обоих форматах """
+        for extension, workers in (('ndjson', 1), ('csv', 2)):
+            with self.subTest(format=extension):
+                before = self.snapshot()
+                self.export(extension)
+                self.wipe()
+                self.load(extension, workers=workers, batch_size=2)
+                self.assertEqual(self.snapshot(), before)
+                self.assertEqual(
+                    Post.objects.get(pk=self.posts[0].pk).pub_date, OLD_DATE
+                )
+
+    def test_derived_data_rebuilt(self):
+        """ тестируем счетчики, ленту и поиск после загрузки """
+        self.export('ndjson')
+        self.wipe()
+        self.load('ndjson')
+        counters = UserCounters.objects.get(user=self.author)
+        self.assertEqual(counters.posts_count, 5)
+        self.assertEqual(counters.followers_count, 1)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[1].pk).comments_count, 1
+        )
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.reader).count(), 5
+        )
+        self.assertEqual(
+            list(search.SearchResults('помидоры').ids), [self.posts[1].pk]
+        )
+
+    def test_checkpoint_resume(self):
+        """ тестируем продолжение загрузки с контрольной точки """
+        self.export('ndjson')
+        self.wipe()
+        call_command(
+            'import_data', 'group', self.path('group.ndjson'),
+            stdout=open(os.devnull, 'w'),
+        )
+        checkpoint = 'posts'
+        ImportCheckpoint.objects.create(
+            name=checkpoint, kind='post', records=2
+        )
+        call_command(
+            'import_data', 'post', self.path('post.ndjson'),
+            checkpoint=checkpoint, stdout=open(os.devnull, 'w'),
+        )
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)),
+            sorted(post.pk for post in self.posts[2:]),
+        )
+        self.assertEqual(
+            ImportCheckpoint.objects.get(name=checkpoint).records, 5
+        )
+        # Повтор с начала не создает дубликатов.
+        ImportCheckpoint.objects.all().delete()
+        call_command(
+            'import_data', 'post', self.path('post.ndjson'),
+            checkpoint=checkpoint, stdout=open(os.devnull, 'w'),
+        )
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_records_without_id(self):
+        """ тестируем посты без id: ленты и поиск видят их """
+        path = self.path('new.ndjson')
+        with open(path, 'w', encoding='utf-8') as stream:
+            for text in ('Огурцы на балконе', 'Рассада томатов'):
+                stream.write(json.dumps(
+                    {'text': text, 'author': 'author'}, ensure_ascii=False
+                ) + '\n')
+        call_command(
+            'import_data', 'post', path, stdout=open(os.devnull, 'w'),
+        )
+        imported = list(
+            Post.objects.filter(text__in=(
+                'Огурцы на балконе', 'Рассада томатов'
+            )).values_list('pk', flat=True)
+        )
+        self.assertEqual(len(imported), 2)
+        self.assertEqual(
+            FeedItem.objects.filter(
+                user=self.reader, post__in=imported
+            ).count(),
+            2,
+        )
+        self.assertEqual(
+            list(search.SearchResults('огурцы').ids),
+            [min(imported)],
+        )
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 7
+        )
+
+    def test_resume_skips_existing_rows(self):
+        """ тестируем, что пропущенные при повторе строки не раскладываются """
+        Follow.objects.create(user=self.author, author=self.reader)
+        taken = self.posts[0]
+        path = self.path('clash.ndjson')
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(json.dumps({
+                'id': taken.pk, 'text': 'Чужой пост', 'author': 'reader',
+            }, ensure_ascii=False) + '\n')
+        call_command(
+            'import_data', 'post', path, checkpoint='clash',
+            stdout=open(os.devnull, 'w'),
+        )
+        self.assertEqual(Post.objects.get(pk=taken.pk).author, self.author)
+        self.assertFalse(
+            FeedItem.objects.filter(user=self.author, post=taken).exists()
+        )
+        self.assertEqual(
+            UserCounters.objects.get(user=self.reader).posts_count, 0
+        )
+
+    def test_failed_batch_resumes_without_duplicates(self):
+        """ тестируем повтор после сбоя: записи без id не дублируются """
+        path = self.path('resume.ndjson')
+
+        def write(last_author):
+            with open(path, 'w', encoding='utf-8') as stream:
+                for text, author in (
+                    ('Первый', 'author'), ('Второй', 'author'),
+                    ('Третий', last_author),
+                ):
+                    stream.write(json.dumps(
+                        {'text': text, 'author': author}, ensure_ascii=False
+                    ) + '\n')
+
+        write('nobody')
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_data', 'post', path, batch_size=2,
+                checkpoint='resume', stdout=open(os.devnull, 'w'),
+            )
+        self.assertEqual(ImportCheckpoint.objects.get().records, 2)
+        write('reader')
+        call_command(
+            'import_data', 'post', path, batch_size=2,
+            checkpoint='resume', stdout=open(os.devnull, 'w'),
+        )
+        for text in ('Первый', 'Второй', 'Третий'):
+            self.assertEqual(Post.objects.filter(text=text).count(), 1)
+        self.assertEqual(ImportCheckpoint.objects.get().records, 3)
+
+    def test_database_error_reported(self):
+        """ тестируем ошибку базы: номер пачки вместо трассировки """
+        path = self.path('duplicate.ndjson')
+        with open(path, 'w', encoding='utf-8') as stream:
+            for text in ('Первый', 'Второй', 'Третий'):
+                stream.write(json.dumps({
+                    'id': self.posts[0].pk if text == 'Третий' else None,
+                    'text': text,
+                    'author': 'author',
+                }, ensure_ascii=False) + '\n')
+        with self.assertRaisesMessage(CommandError, 'с записи 3'):
+            call_command(
+                'import_data', 'post', path, batch_size=2,
+                stdout=open(os.devnull, 'w'),
+            )
+        self.assertTrue(Post.objects.filter(text='Второй').exists())
+
+    def test_unknown_users(self):
+        """ тестируем отсутствующих авторов """
+        self.export('ndjson')
+        self.wipe()
+        User.objects.filter(username='author').update(username='renamed')
+        call_command(
+            'import_data', 'group', self.path('group.ndjson'),
+            stdout=open(os.devnull, 'w'),
+        )
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_data', 'post', self.path('post.ndjson'),
+                stdout=open(os.devnull, 'w'),
+            )
+        self.assertFalse(Post.objects.exists())
+        call_command(
+            'import_data', 'post', self.path('post.ndjson'),
+            create_users=True, stdout=open(os.devnull, 'w'),
+        )
+        self.assertEqual(
+            Post.objects.filter(author__username='author').count(), 5
+        )
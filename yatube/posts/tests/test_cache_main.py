@@ -1,8 +1,10 @@
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Post
+from posts.models import Group, Post
 from posts.models import User
 
 
@@ -11,26 +13,62 @@ class TestaCache(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
         cls.post = Post.objects.create(
             author=cls.user,
-            text='Просто название'
+            text='Просто название',
+            group=cls.group,
         )
 
     def setUp(self):
         self.guest_client = Client()
         self.main = reverse('posts:main')
+        cache.clear()
 
     def test_cache_index(self):
-        """ Тестируем, что в кэш добавляется и удалается пост """
+        """ Тестируем, что удаленный пост сразу пропадает из кэша """
         get_obj = self.guest_client.get(self.main)
         Post.objects.filter(
             text='Просто название',
             author=self.user,
         ).delete()
         get_obj_1 = self.guest_client.get(self.main)
-        self.assertEqual(get_obj.content, get_obj_1.content)
+        self.assertNotEqual(get_obj.content, get_obj_1.content)
+        self.assertNotContains(get_obj_1, 'Просто название')
 
-        cache.clear()
+    def test_cached_pages_skip_queries(self):
+        """ Повторный запрос ленты берет страницу и карточки из кэша """
+        addresses = (
+            self.main,
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                with CaptureQueriesContext(connection) as cold:
+                    first = self.guest_client.get(address)
+                with CaptureQueriesContext(connection) as warm:
+                    second = self.guest_client.get(address)
+                self.assertEqual(first.content, second.content)
+                self.assertLessEqual(len(warm), len(cold))
+                self.assertNotIn('LIMIT', warm[-1]['sql'])
+
+    def test_group_change_updates_cards(self):
+        """ Изменение группы обновляет карточки ее постов """
+        self.guest_client.get(self.main)
+        self.group.description = 'Новое описание'
+        self.group.save()
+        response = self.guest_client.get(self.main)
+        self.assertContains(response, 'Новое описание')
 
-        get_obj_2 = self.guest_client.get(self.main)
-        self.assertNotEqual(get_obj_1.content, get_obj_2.content)
+    def test_post_edit_updates_card(self):
+        """ Редактирование поста обновляет его карточку """
+        self.guest_client.get(self.main)
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        response = self.guest_client.get(self.main)
+        self.assertContains(response, 'Исправленный текст')
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Engine, TemplateSyntaxError
+from django.test import TestCase
+from django.utils import timezone
+
+from posts import microbench
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class CachedCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание группы'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Текст поста'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, source, post=None):
+        template = Engine.get_default().from_string(
+            '{% load post_cards %}' + source
+        )
+        return template.render(Context({'post': post or self.post}))
+
+    def test_card_content(self):
+        """ тестируем содержимое карточки """
+        html = self.render('{% cached_card post %}')
+        self.assertIn('Лев Толстой', html)
+        self.assertIn('Текст поста', html)
+        self.assertIn(f'/posts/{self.post.pk}/', html)
+        self.assertIn('Описание группы', html)
+
+    def test_hide_group(self):
+        """ тестируем карточку без ссылки на группу """
+        html = self.render('{% cached_card post show_group=False %}')
+        self.assertNotIn('Описание группы', html)
+
+    def test_rendered_once_per_version(self):
+        """ тестируем, что карточка берется из кэша до новой версии """
+        source = '{% cached_card post %}'
+        self.render(source)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        self.assertIn('Текст поста', self.render(source, post))
+        post.updated_at = timezone.now()
+        self.assertIn('Новый текст', self.render(source, post))
+
+    def test_bad_arguments(self):
+        """ тестируем ошибки синтаксиса тега """
+        for source in (
+            '{% cached_card %}',
+            '{% cached_card post color=1 %}',
+            '{% cached_card post extra %}',
+        ):
+            with self.subTest(source=source):
+                with self.assertRaises(TemplateSyntaxError):
+                    self.render(source)
+
+    def test_microbench_cards(self):
+        """ тестируем микрозамер карточек """
+        cache.set('kept', 1)
+        report = microbench.run(['cards'], iterations=2)
+        self.assertEqual(cache.get('kept'), 1)
+        self.assertEqual(
+            set(report['cards']),
+            {'uncached_loader', 'include', 'cache_tag', 'cached_card'},
+        )
+        with self.assertRaises(ValueError):
+            microbench.run(['nothing'])
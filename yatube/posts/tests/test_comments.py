@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.comments import CommentThread
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'комментарий {number}'
+            )
+            for number in range(8)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def fragment(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        return self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            params,
+        )
+
+    def test_thread_pages(self):
+        """ тестируем порции комментариев по курсору """
+        seen = []
+        cursor = None
+        while True:
+            thread = CommentThread(self.post.pk, cursor)
+            seen.extend(thread.comments)
+            cursor = thread.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.comments)
+
+    def test_same_created_uses_id(self):
+        """ тестируем курсор при одинаковом времени создания """
+        Comment.objects.filter(post=self.post).update(
+            created=self.comments[0].created
+        )
+        first = CommentThread(self.post.pk)
+        second = CommentThread(self.post.pk, first.next_cursor)
+        self.assertEqual(first.comments, self.comments[:3])
+        self.assertEqual(second.comments, self.comments[3:6])
+
+    def test_invalid_cursor_starts_over(self):
+        """ тестируем неверный курсор """
+        thread = CommentThread(self.post.pk, 'мусор')
+        self.assertEqual(thread.comments, self.comments[:3])
+
+    def test_detail_shows_first_page(self):
+        """ тестируем первую порцию на странице поста """
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        thread = response.context['thread']
+        self.assertEqual(thread.comments, self.comments[:3])
+        self.assertContains(response, 'комментарий 2')
+        self.assertNotContains(response, 'комментарий 3')
+        self.assertContains(response, f'cursor={thread.next_cursor}')
+
+    def test_detail_queries_do_not_grow(self):
+        """ тестируем, что число запросов не зависит от комментариев """
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text='еще')
+            for _ in range(50)
+        )
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(many), len(few))
+
+    def test_fragment_html(self):
+        """ тестируем HTML следующей порции """
+        cursor = CommentThread(self.post.pk).next_cursor
+        response = self.fragment(cursor)
+        self.assertEqual(
+            list(response.context['thread'].comments), self.comments[3:6]
+        )
+        self.assertContains(response, 'комментарий 5')
+        self.assertNotContains(response, 'комментарий 2')
+        self.assertContains(response, 'data-comments-more')
+
+    def test_fragment_json(self):
+        """ тестируем JSON последней порции """
+        cursor = CommentThread(self.post.pk, None, 6).next_cursor
+        data = self.fragment(cursor, format='json').json()
+        self.assertIsNone(data['next'])
+        self.assertIn('комментарий 7', data['html'])
+        self.assertNotIn('data-comments-more', data['html'])
+
+    def test_fragment_unknown_post(self):
+        """ тестируем порцию комментариев несуществующего поста """
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalPageTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def urls(self):
+        return (
+            reverse('posts:main'),
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_public_pages_have_validators(self):
+        """ анонимам отдаются ETag, Last-Modified и public s-maxage """
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('s-maxage=60', response['Cache-Control'])
+
+    def test_not_modified_skips_view(self):
+        """ совпавший ETag дает 304 без рендера шаблона """
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.assertMaxQueries(
+                    1, self.guest_client.get, url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+
+    def test_if_modified_since(self):
+        """ If-Modified-Since с датой ответа дает 304 """
+        url = reverse('posts:main')
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_refresh_token(self):
+        """ правка поста, комментарий и подписка меняют ETag """
+        changes = {
+            reverse('posts:main'): lambda: Post.objects.filter(
+                pk=self.post.pk
+            ).first().save(),
+            reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ): lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='к'
+            ),
+            reverse('posts:profile', kwargs={'username': 'auth'}): (
+                lambda: Follow.objects.create(
+                    user=User.objects.create_user(username='fan'),
+                    author=self.user,
+                )
+            ),
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}): (
+                lambda: Group.objects.get(pk=self.group.pk).save()
+            ),
+        }
+        for url, change in changes.items():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                change()
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_authorized_pages_are_private(self):
+        """ авторизованным страницы отдаются без публичного кэша """
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotIn('ETag', response)
+                self.assertFalse(response.has_header('Cache-Control'))
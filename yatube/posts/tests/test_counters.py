@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        """ счетчики постов и комментариев меняются при записи """
+        post = Post.objects.create(author=self.author, text='пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='коммент'
+        )
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+
+    def test_follow_counters(self):
+        """ счетчики подписок меняются при подписке и отписке """
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+
+    def test_rebuild_counters_fixes_drift(self):
+        """ команда rebuild_counters исправляет расхождения """
+        post = Post.objects.create(author=self.author, text='пост')
+        UserCounters.objects.filter(user=self.author).delete()
+        UserCounters.objects.filter(user=self.reader).update(posts_count=7)
+        Post.objects.filter(pk=post.pk).update(comments_count=3)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.reader).posts_count, 0)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_pages_do_not_count(self):
+        """ профиль и пост рендерятся без COUNT(*) """
+        post = Post.objects.create(author=self.author, text='пост')
+        addresses = (
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(address)
+                self.assertContains(response, 'Всего постов')
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'])
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.feed import follow_feed
+from posts.models import FeedItem, Follow, Post
+
+User = get_user_model()
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.old_post = Post.objects.create(author=cls.author, text='старый')
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def test_follow_backfills_feed(self):
+        """ подписка добавляет в ленту уже опубликованные посты """
+        self.follower_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertTrue(
+            FeedItem.objects.filter(
+                user=self.follower, post=self.old_post
+            ).exists()
+        )
+
+    def test_new_post_fans_out(self):
+        """ новый пост попадает в ленты подписчиков """
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='новый')
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+        entries = FeedItem.objects.filter(user=self.follower)
+        self.assertEqual(entries.count(), 2)
+
+    def test_unfollow_prunes_feed(self):
+        """ отписка убирает посты автора из ленты """
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.follower_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertFalse(FeedItem.objects.filter(user=self.follower).exists())
+        self.assertFalse(follow_feed(self.follower).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_author_is_pulled(self):
+        """ посты популярных авторов читаются без раскладки """
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='новый')
+        self.assertFalse(FeedItem.objects.exists())
+        self.assertIn(post, follow_feed(self.follower))
+        self.assertIn(self.old_post, follow_feed(self.follower))
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_stays_pulled_below_limit(self):
+        """ посты автора, упавшего ниже лимита, не пропадают из ленты """
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        post = Post.objects.create(author=self.author, text='новый')
+        self.assertFalse(FeedItem.objects.filter(post=post).exists())
+        Follow.objects.filter(user=fan).delete()
+        self.assertIn(post, follow_feed(self.follower))
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_mixed_feed_pages(self):
+        """ курсоры сливают материализованную ленту и pull-авторов """
+        star = User.objects.create_user(username='star')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=fan, author=star)
+        Follow.objects.create(user=self.follower, author=star)
+        Follow.objects.create(user=self.follower, author=self.author)
+        for i in range(12):
+            Post.objects.create(author=star, text=f'звезда {i}')
+            Post.objects.create(author=self.author, text=f'автор {i}')
+        expected = list(
+            follow_feed(self.follower).order_by('-pub_date', '-pk')
+        )
+        seen, cursor = [], ''
+        while True:
+            response = self.follower_client.get(
+                reverse('posts:follow_index'), {'cursor': cursor}
+            )
+            page_obj = response.context['page_obj']
+            seen.extend(page_obj)
+            if not page_obj.has_next():
+                break
+            cursor = page_obj.paginator.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 25)
@@ -0,0 +1,158 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import bulk, graph
+from posts.models import Follow, FollowSuggestion
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_profile_shows_following(self):
+        """ профиль знает, подписан ли на автора текущий пользователь """
+        author = self.authors[0]
+        address = reverse('posts:profile', kwargs={'username': author})
+        response = self.reader_client.get(address)
+        self.assertFalse(response.context['following'])
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': author})
+        )
+        response = self.reader_client.get(address)
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Отписаться')
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': author})
+        )
+        response = self.reader_client.get(address)
+        self.assertFalse(response.context['following'])
+
+    def test_sets_are_cached(self):
+        """ множества читаются одним запросом и дальше берутся из кэша """
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        with self.assertNumQueries(1):
+            following = graph.FollowGraph().following(self.reader.pk)
+        self.assertEqual(following, {self.authors[0].pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                graph.FollowGraph().following(self.reader.pk), following
+            )
+
+    def test_following_among_page_of_authors(self):
+        """ подписки на страницу авторов проверяются одним запросом """
+        for author in self.authors[:2]:
+            Follow.objects.create(user=self.reader, author=author)
+        ids = [author.pk for author in self.authors]
+        with self.assertNumQueries(1):
+            followed = graph.FollowGraph().following_among(
+                self.reader.pk, ids
+            )
+        self.assertEqual(followed, set(ids[:2]))
+
+    def test_changes_reset_cache(self):
+        """ подписка, отписка и импорт сбрасывают кэшированные множества """
+        author, other = self.authors[:2]
+        self.assertFalse(
+            graph.FollowGraph().is_following(self.reader.pk, author.pk)
+        )
+        graph.follow(self.reader, author)
+        self.assertTrue(
+            graph.FollowGraph().is_following(self.reader.pk, author.pk)
+        )
+        self.assertEqual(
+            graph.FollowGraph().followers(author.pk), {self.reader.pk}
+        )
+        graph.unfollow(self.reader, author)
+        self.assertFalse(
+            graph.FollowGraph().is_following(self.reader.pk, author.pk)
+        )
+        bulk.save_batch('follow', [Follow(user=self.reader, author=other)])
+        self.assertTrue(
+            graph.FollowGraph().is_following(self.reader.pk, other.pk)
+        )
+
+    def test_cannot_follow_self(self):
+        """ на себя подписаться нельзя """
+        self.assertFalse(graph.follow(self.reader, self.reader))
+        self.assertFalse(Follow.objects.exists())
+
+
+class SuggestionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'other', 'star', 'niche')
+        }
+        edges = (
+            ('reader', 'friend'), ('reader', 'other'),
+            ('friend', 'star'), ('other', 'star'), ('friend', 'niche'),
+            ('friend', 'reader'),
+        )
+        for user, author in edges:
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self):
+        return [(self.users['star'].pk, 2), (self.users['niche'].pk, 1)]
+
+    def test_friends_of_friends(self):
+        """ рекомендуются авторы, на которых подписаны подписки """
+        graph.build_suggestions()
+        suggested = graph.FollowGraph().suggestions(self.users['reader'].pk)
+        self.assertEqual(suggested, self.expected())
+        self.assertEqual(
+            graph.FollowGraph().suggestions(self.users['star'].pk), []
+        )
+
+    def test_rebuild_replaces_suggestions(self):
+        """ повторный подсчет заменяет рекомендации в таблице """
+        graph.build_suggestions()
+        reader = self.users['reader']
+        self.assertEqual(
+            FollowSuggestion.objects.filter(user=reader).count(), 2
+        )
+        Follow.objects.filter(user=self.users['friend']).delete()
+        graph.build_suggestions(chunk_size=2)
+        self.assertEqual(
+            graph.FollowGraph().suggestions(reader.pk),
+            [(self.users['star'].pk, 1)],
+        )
+
+    def test_process_pool(self):
+        """ пул процессов дает тот же результат """
+        graph.build_suggestions(processes=2, chunk_size=2)
+        suggested = graph.FollowGraph().suggestions(self.users['reader'].pk)
+        self.assertEqual(suggested, self.expected())
+
+    def test_followed_suggestions_are_hidden(self):
+        """ автор пропадает из рекомендаций после подписки на него """
+        graph.build_suggestions()
+        reader = self.users['reader']
+        Follow.objects.create(user=reader, author=self.users['star'])
+        client = Client()
+        client.force_login(reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['suggestions'], [self.users['niche']]
+        )
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Бюджет запросов на страницу при холодном кэше. Сессия и пользователь
+# авторизованного клиента входят в бюджет, в ленту подписок — еще и
+# чтение рекомендаций.
+BUDGETS = {
+    'posts:main': 1,
+    'posts:group_posts': 2,
+    'posts:profile': 2,
+    'posts:post_detail': 2,
+    'posts:follow_index': 5,
+}
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый пост'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Comment.objects.create(post=cls.post, author=cls.reader, text='к')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def add_rows(self, amount):
+        """ посты и комментарии разных авторов в тех же лентах """
+        for i in range(amount):
+            user = User.objects.create_user(username=f'user{i}')
+            Follow.objects.create(user=self.reader, author=user)
+            Post.objects.create(author=user, group=self.group, text=f'{i}')
+            Post.objects.create(author=self.author, text=f'автор {i}')
+            Comment.objects.create(post=self.post, author=user, text=f'{i}')
+
+    def pages(self):
+        return {
+            'posts:main': (self.guest_client, {}),
+            'posts:group_posts': (
+                self.guest_client, {'slug': self.group.slug}
+            ),
+            'posts:profile': (self.guest_client, {'username': 'author'}),
+            'posts:post_detail': (
+                self.guest_client, {'post_id': self.post.pk}
+            ),
+            'posts:follow_index': (self.reader_client, {}),
+        }
+
+    def measure(self):
+        counts = {}
+        for name, (client, kwargs) in self.pages().items():
+            cache.clear()
+            counts[name] = self.count_queries(
+                client.get, reverse(name, kwargs=kwargs)
+            )
+        return counts
+
+    def test_queries_do_not_grow_with_rows(self):
+        """ число запросов не зависит от числа постов и комментариев """
+        small = self.measure()
+        self.add_rows(15)
+        large = self.measure()
+        for name in BUDGETS:
+            with self.subTest(view=name):
+                self.assertEqual(small[name], large[name])
+
+    def test_views_fit_budget(self):
+        """ каждая лента укладывается в свой бюджет запросов """
+        self.add_rows(15)
+        for name, (client, kwargs) in self.pages().items():
+            with self.subTest(view=name):
+                cache.clear()
+                self.assertMaxQueries(
+                    BUDGETS[name], client.get, reverse(name, kwargs=kwargs),
+                    label=name,
+                )
@@ -0,0 +1,26 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.management.commands.check_query_plans import BAD_PLAN
+
+
+class QueryPlanTests(TestCase):
+    def test_plans_use_indexes(self):
+        """ запросы лент читают индексы без сортировки в памяти """
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('Все планы используют индексы', out.getvalue())
+
+    def test_bad_plan_pattern(self):
+        """ полный проход и временное B-дерево считаются ошибкой """
+        self.assertTrue(BAD_PLAN.search('SCAN posts_post'))
+        self.assertTrue(BAD_PLAN.search('SCAN TABLE posts_post'))
+        self.assertTrue(BAD_PLAN.search('USE TEMP B-TREE FOR ORDER BY'))
+        self.assertFalse(
+            BAD_PLAN.search('SCAN posts_post USING INDEX post_pub_date_idx')
+        )
+        self.assertFalse(BAD_PLAN.search(
+            'SEARCH posts_post USING INTEGER PRIMARY KEY (rowid=?)'
+        ))
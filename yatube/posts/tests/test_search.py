@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Group, Post, SearchTerm
+
+User = get_user_model()
+
+
+class SearchMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Садоводство',
+            slug='garden',
+            description='Тестовое описание',
+        )
+        cls.tomato = Post.objects.create(
+            author=cls.user,
+            text='Как вырастить помидоры на балконе',
+        )
+        cls.roses = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Обрезка роз весной',
+        )
+        cls.other = Post.objects.create(author=cls.user, text='Про котов')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, query):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': query}
+        )
+        return list(response.context['page_obj'])
+
+    def test_search_post_text(self):
+        """ пост находится по слову и префиксу слова из текста """
+        self.assertEqual(self.found('помидоры'), [self.tomato])
+        self.assertEqual(self.found('ПОМИД балкон'), [self.tomato])
+        self.assertEqual(self.found('помидоры котов'), [])
+
+    def test_search_comments_and_group(self):
+        """ поиск идет по комментариям и названию группы """
+        Comment.objects.create(
+            post=self.other, author=self.user, text='Рыжий кот любит розы'
+        )
+        self.assertEqual(self.found('садоводство'), [self.roses])
+        self.assertEqual(self.found('рыжий'), [self.other])
+
+    def test_index_follows_changes(self):
+        """ индекс обновляется при правке и удалении поста """
+        tomato = Post.objects.get(pk=self.tomato.pk)
+        tomato.text = 'Огурцы в теплице'
+        tomato.save()
+        self.assertEqual(self.found('помидоры'), [])
+        self.assertEqual(self.found('огурцы'), [self.tomato])
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Цветоводство'
+        group.save()
+        self.assertEqual(self.found('цветоводство'), [self.roses])
+        Post.objects.get(pk=self.roses.pk).delete()
+        self.assertEqual(self.found('роз'), [])
+
+    def test_ranking_and_snippet(self):
+        """ совпадение в названии группы весомее, сниппет подсвечен """
+        post = Post.objects.create(
+            author=self.user, text='Садоводство <b>для</b> начинающих'
+        )
+        results = self.found('садоводство')
+        self.assertEqual(results, [self.roses, post])
+        self.assertIn('<mark>Садоводство</mark>', results[1].snippet)
+        self.assertIn('&lt;b&gt;', results[1].snippet)
+
+    def test_pagination_keeps_query(self):
+        """ выдача разбивается на страницы, ссылки сохраняют запрос """
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f'Балкон номер {i}')
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'балкон'}
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, 'page=2')
+        self.assertContains(response, '?q=%D0%B1%D0%B0%D0%BB')
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class FTS5SearchTests(SearchMixin, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND='inverted')
+class InvertedIndexSearchTests(SearchMixin, TestCase):
+    def test_rebuild(self):
+        """ перестроение восстанавливает потерянный индекс """
+        SearchTerm.objects.all().delete()
+        self.assertEqual(self.found('помидоры'), [])
+        self.assertEqual(search.rebuild(), 3)
+        self.assertEqual(self.found('помидоры'), [self.tomato])
@@ -0,0 +1,126 @@
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import variants
+from posts.models import Post
+from posts.tasks import generate_thumbnail
+from tasks.models import Task
+from tasks.worker import Worker
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def create_post(self):
+        post = Post.objects.create(author=self.user, text='Пост')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(
+                    'small.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            },
+        )
+        post.refresh_from_db()
+        return post
+
+    @override_settings(THUMBNAIL_ASYNC=False)
+    def test_thumbnail_url_is_precomputed(self):
+        """ миниатюра готова после сохранения и выводится в ленте """
+        post = self.create_post()
+        self.assertTrue(post.thumbnail.startswith(settings.MEDIA_URL))
+        response = self.authorized_client.get(reverse('posts:main'))
+        self.assertContains(response, post.thumbnail)
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """ пока миниатюра не готова, показывается заглушка """
+        post = self.create_post()
+        self.assertEqual(post.thumbnail, '')
+        response = self.authorized_client.get(reverse('posts:main'))
+        self.assertContains(response, 'img/placeholder.svg')
+
+    @override_settings(THUMBNAIL_ASYNC=False)
+    def test_responsive_variants(self):
+        """ для картинки готовы варианты по ширинам и srcset в шаблоне """
+        post = self.create_post()
+        formats = variants.supported_formats()
+        self.assertEqual(
+            len(json.loads(post.image_variants)),
+            len(variants.widths()) * len(formats),
+        )
+        response = self.authorized_client.get(reverse('posts:main'))
+        self.assertContains(response, f'{post.image_srcset}')
+        self.assertIn('320w', post.image_srcset)
+        for source in post.image_sources:
+            self.assertContains(response, f'type="{source["type"]}"')
+
+    def test_new_image_resets_variants(self):
+        """ смена картинки сбрасывает устаревшие варианты """
+        with self.settings(THUMBNAIL_ASYNC=False):
+            post = self.create_post()
+        self.assertNotEqual(post.image_variants, '')
+        post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF, content_type='image/gif'
+        )
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+        self.assertEqual(post.image_srcset, '')
+
+    @override_settings(
+        TASKS_BACKEND='tasks.backends.DatabaseBackend',
+        METRICS_WORKER_DIR=TEMP_MEDIA_ROOT,
+    )
+    def test_failed_thumbnail_is_retried(self):
+        """ сбой миниатюры в задаче ставит ее на повтор """
+        post = Post.objects.create(
+            author=self.user, text='Пост', image='posts/missing.gif'
+        )
+        generate_thumbnail.delay(post.pk, post.image.name)
+        Worker(poll=0).run(once=True)
+        task = Task.objects.get(name=generate_thumbnail.name)
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('missing.gif', task.last_error)
+
+    def test_broken_thumbnail_keeps_request(self):
+        """ сбой миниатюры, выполненной сразу, не ломает сохранение """
+        with self.settings(THUMBNAIL_ASYNC=False):
+            post = Post.objects.create(
+                author=self.user, text='Пост', image='posts/missing.gif'
+            )
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
@@ -0,0 +1,121 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import uploads
+from posts.models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_bytes(size=(40, 20), image_format='PNG', exif=None):
+    buffer = BytesIO()
+    options = {'exif': exif.tobytes()} if exif is not None else {}
+    Image.new('RGB', size, (200, 30, 30)).save(
+        buffer, image_format, **options
+    )
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class UploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create(self, content, name='picture.png'):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост',
+            'image': SimpleUploadedFile(name, content),
+        })
+
+    def test_create_accepts_image(self):
+        """ тестируем картинку в новом посте """
+        self.create(image_bytes())
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.startswith('posts/'))
+        self.assertTrue(post.thumbnail)
+
+    @override_settings(UPLOAD_MAX_SIZE=1000)
+    def test_rejects_large_file(self):
+        """ тестируем ограничение размера файла """
+        response = self.create(image_bytes(size=(300, 300)) + b'\0' * 2000)
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 1000\xa0байт.'
+        )
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_rejects_by_header(self):
+        """ тестируем отказ по габаритам из заголовка """
+        response = self.create(image_bytes(size=(100, 50)))
+        self.assertFalse(Post.objects.exists())
+        errors = response.context['form'].errors['image']
+        self.assertEqual(len(errors), 1)
+        self.assertIn('100×50', errors[0])
+
+    def test_handler_stops_saving_bomb(self):
+        """ тестируем, что данные бомбы после заголовка не сохраняются """
+        handler = uploads.ImageUploadHandler()
+        handler.new_file('image', 'bomb.png', 'image/png', None)
+        content = image_bytes(size=(100, 50))
+        with override_settings(IMAGE_MAX_PIXELS=1000):
+            for start in range(0, len(content), 16):
+                handler.receive_data_chunk(content[start:start + 16], start)
+        upload = handler.file_complete(len(content))
+        self.assertIsNotNone(uploads.upload_error(upload))
+        self.assertLess(upload.file.tell(), len(content))
+
+    def test_read_size_without_decoding(self):
+        """ тестируем габариты по началу файла """
+        content = image_bytes(size=(640, 480), image_format='JPEG')
+        self.assertEqual(uploads.read_size(content[:1024]), (640, 480))
+        self.assertIsNone(uploads.read_size(b'not an image'))
+
+    @override_settings(IMAGE_MAX_DIMENSION=100)
+    def test_normalize_downscales_and_strips_exif(self):
+        """ тестируем уменьшение оригинала и удаление EXIF """
+        exif = Image.Exif()
+        exif[0x0110] = 'Camera'
+        original = default_storage.save(
+            'posts/photo.jpg',
+            ContentFile(image_bytes((400, 200), 'JPEG', exif)),
+        )
+        post = Post.objects.create(
+            author=self.user, text='Фото', image=original
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, original)
+        self.assertFalse(default_storage.exists(original))
+        with post.image.open('rb') as stored:
+            image = Image.open(stored)
+            self.assertEqual(image.size, (100, 50))
+            self.assertFalse(image.getexif())
+
+    def test_normalize_keeps_clean_image(self):
+        """ тестируем, что небольшая картинка без EXIF не пересохраняется """
+        name = default_storage.save(
+            'posts/clean.png', ContentFile(image_bytes())
+        )
+        post = Post.objects.create(author=self.user, text='Пост', image=name)
+        self.assertEqual(uploads.normalize(post.pk, name), name)
+        self.assertTrue(default_storage.exists(name))
@@ -0,0 +1,170 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.cache import cache
+
+from posts.models import Group, Post
+from posts.utils import (
+    PAGE_WINDOW, CursorPaginator, WindowPaginator, estimate_count
+)
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {i}')
+            for i in range(25)
+        )
+        pub_date = Post.objects.first().pub_date
+        Post.objects.all().update(pub_date=pub_date)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def walk(self, cursor=None):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.page(cursor)
+        return paginator, page
+
+    def test_pages_do_not_overlap(self):
+        """ курсор проходит все посты без пропусков и повторов """
+        seen = []
+        paginator, page = self.walk()
+        seen += [post.pk for post in page]
+        while page.has_next():
+            paginator, page = self.walk(paginator.next_cursor)
+            seen += [post.pk for post in page]
+        self.assertEqual(len(seen), 25)
+        expected = Post.objects.order_by('-pk').values_list('pk', flat=True)
+        self.assertEqual(seen, list(expected))
+        self.assertEqual(len(page), 5)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """ курсор назад возвращает предыдущую страницу """
+        first_paginator, first = self.walk()
+        paginator, second = self.walk(first_paginator.next_cursor)
+        self.assertTrue(second.has_previous())
+        paginator, back = self.walk(paginator.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """ испорченный курсор отдает первую страницу """
+        paginator, page = self.walk('не-курсор')
+        self.assertFalse(page.has_previous())
+        self.assertEqual(len(page), 10)
+
+    def test_views_use_cursor(self):
+        """ ленты отдают курсорные ссылки и понимают ?page=N """
+        addresses = (
+            reverse('posts:main'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                paginator = response.context['page_obj'].paginator
+                self.assertContains(response, paginator.next_cursor)
+                response = self.guest_client.get(
+                    address, {'cursor': paginator.next_cursor}
+                )
+                self.assertEqual(len(response.context['page_obj']), 10)
+                response = self.guest_client.get(address, {'page': 3})
+                self.assertEqual(len(response.context['page_obj']), 5)
+
+
+class WindowPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}') for i in range(95)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def queryset(self):
+        return Post.objects.order_by('-pk')
+
+    def test_page_without_count(self):
+        """ страница читается одним запросом без COUNT(*) """
+        paginator = WindowPaginator(self.queryset(), 10, 'none')
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.page(3)
+            self.assertTrue(page.has_next())
+            self.assertTrue(page.has_previous())
+            self.assertEqual(len(page), 10)
+            self.assertEqual(page.next_page_number(), 4)
+            window = list(paginator.window)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertEqual(window, [1, 2, 3, 4])
+        self.assertFalse(paginator.counted)
+
+    def test_last_page_found_by_extra_row(self):
+        """ последняя страница определяется без подсчета """
+        paginator = WindowPaginator(self.queryset(), 10, 'none')
+        page = paginator.page(10)
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next())
+        self.assertEqual(paginator.num_pages, 10)
+        self.assertEqual(page.end_index(), 95)
+
+    def test_window_is_bounded(self):
+        """ навигация выводит окно страниц, а не все страницы """
+        paginator = WindowPaginator(self.queryset(), 5, 'exact')
+        paginator.page(10)
+        self.assertEqual(paginator.num_pages, 19)
+        self.assertEqual(
+            list(paginator.window),
+            list(range(10 - PAGE_WINDOW, 10 + PAGE_WINDOW + 1)),
+        )
+
+    def test_cached_count(self):
+        """ число записей считается один раз и берется из кэша """
+        paginator = WindowPaginator(self.queryset(), 10, 'cached', 'feed')
+        paginator.page(2)
+        self.assertEqual(paginator.num_pages, 10)
+        paginator = WindowPaginator(self.queryset(), 10, 'cached', 'feed')
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(2)
+            self.assertEqual(paginator.num_pages, 10)
+        self.assertEqual(len(queries), 1)
+
+    def test_estimated_count_falls_back(self):
+        """ без статистики базы оценка заменяется подсчетом """
+        paginator = WindowPaginator(self.queryset(), 10, 'estimated')
+        paginator.page(1)
+        self.assertEqual(paginator.num_pages, 10)
+
+    def test_estimated_count_from_statistics(self):
+        """ после ANALYZE число постов берется из статистики """
+        if connection.vendor != 'sqlite':
+            self.skipTest('Проверяется на SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimate_count(Post.objects.all()), 95)
+        self.assertIsNone(estimate_count(Post.objects.filter(pk=1)))
+
+    def test_out_of_range_page(self):
+        """ номер за концом выдачи ведет на последнюю страницу """
+        paginator = WindowPaginator(self.queryset(), 10, 'none')
+        page = paginator.get_page(50)
+        self.assertEqual(page.number, 10)
+        self.assertEqual(paginator.get_page('x').number, 1)
@@ -251,7 +251,7 @@ class TestaCache(TestCase):
         self.main = reverse('posts:main')
 
     def test_cache_index(self):
-        """ тестируем кеш при создании поста """
+        """ новый пост сразу виден на закэшированной главной """
         get_obj = self.guest_client.get(self.main)
         Post.objects.create(
             text='Новый текст',
@@ -259,14 +259,8 @@ class TestaCache(TestCase):
             group=self.group
         )
         get_obj_2 = self.guest_client.get(self.main)
-        self.assertEqual(get_obj.content, get_obj_2.content)
-
-        cache.clear()
-
-        get_obj_3 = self.guest_client.get(self.main)
-        self.assertNotEqual(
-            get_obj.content or get_obj_2.content, get_obj_3.content
-        )
+        self.assertNotEqual(get_obj.content, get_obj_2.content)
+        self.assertContains(get_obj_2, 'Новый текст')
 
 
 class FollowerViewsTest(TestCase):
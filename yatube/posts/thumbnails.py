@@ -0,0 +1,89 @@
+"""Фоновая подготовка миниатюр для картинок постов.
+
+После сохранения поста с новой картинкой миниатюра считается фоновой
+задачей posts.tasks.generate_thumbnail, а ее адрес записывается в
+Post.thumbnail. Шаблоны читают
+готовый адрес и до его появления показывают заглушку, поэтому запрос
+пользователя никогда не ждет Pillow.
+
+Ошибки process и generate пробрасываются: задача по ним повторяется,
+а после max_attempts помечается failed. Перехватываются они только в
+запросе (schedule), когда задача выполняется сразу.
+"""
+import logging
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from core.metrics import thumbnail_timer
+
+from . import fragments, uploads, variants
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+CARD_GEOMETRY = '960x339'
+CARD_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def generate(post_id, image_name):
+    """Считает миниатюру и сохраняет ее адрес, если картинка не сменилась."""
+    post = Post.objects.only('image', 'author', 'group').filter(
+        pk=post_id, image=image_name
+    ).first()
+    if post is None:
+        return
+    with thumbnail_timer():
+        thumbnail = get_thumbnail(post.image, CARD_GEOMETRY, **CARD_OPTIONS)
+        image_variants = variants.dumps(variants.build_variants(post))
+    Post.objects.filter(pk=post_id, image=image_name).update(
+        thumbnail=thumbnail.url,
+        image_variants=image_variants,
+        updated_at=timezone.now(),
+    )
+    fragments.invalidate_post_feeds(post.author_id, post.group_id)
+
+
+def process(post_id, image_name):
+    """Приводит оригинал к норме (uploads.normalize) и готовит миниатюры."""
+    if not Post.objects.filter(pk=post_id, image=image_name).exists():
+        # Пост удален или картинку сменили, пока задача ждала.
+        return
+    image_name = uploads.normalize(post_id, image_name)
+    if image_name:
+        generate(post_id, image_name)
+
+
+def run_in_worker(post_id, image_name):
+    close_old_connections()
+    try:
+        process(post_id, image_name)
+    finally:
+        connection.close()
+
+
+def schedule(post):
+    """Ставит миниатюру поста в очередь после фиксации транзакции."""
+    if not post.image:
+        return
+    args = (post.pk, post.image.name)
+    if not getattr(settings, 'THUMBNAIL_ASYNC', True):
+        run_in_request(process, *args)
+        return
+    from .tasks import generate_thumbnail
+
+    # Картинка уже должна лежать в хранилище, поэтому после фиксации.
+    transaction.on_commit(
+        lambda: run_in_request(generate_thumbnail.delay, *args)
+    )
+
+
+def run_in_request(func, post_id, image_name):
+    # Пост уже сохранен: сбой миниатюры, выполненной сразу (без
+    # очереди), не должен превращать ответ в ошибку 500.
+    try:
+        func(post_id, image_name)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюру поста %s', post_id)
@@ -0,0 +1,179 @@
+"""Прием и нормализация картинок постов.
+
+ImageUploadHandler (settings.FILE_UPLOAD_HANDLERS) пишет каждый файл
+во временный файл кусками по CHUNK_SIZE, так что память на загрузку не
+зависит от размера файла. По первым байтам он читает заголовок
+картинки — формат и габариты, без декодирования пикселей — и, если
+файл больше UPLOAD_MAX_SIZE или картинка больше IMAGE_MAX_PIXELS
+(«бомба», раздувающаяся при распаковке), перестает сохранять данные и
+помечает файл ошибкой. PostForm показывает ее вместо общего «неверное
+изображение».
+
+Оригинал приводится к норме в фоне, перед миниатюрами (см.
+thumbnails.process): поворот по EXIF, удаление EXIF вместе с
+координатами съемки и уменьшение до IMAGE_MAX_DIMENSION по большей
+стороне. JPEG декодируется сразу в уменьшенном масштабе (draft).
+"""
+import logging
+import os
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 2 ** 10
+# Столько байт от начала файла ждем, чтобы найти заголовок: в JPEG
+# перед размерами могут идти EXIF и ICC-профиль.
+HEADER_LIMIT = 256 * 2 ** 10
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+
+
+def max_size():
+    return getattr(settings, 'UPLOAD_MAX_SIZE', 10 * 2 ** 20)
+
+
+def max_pixels():
+    return getattr(settings, 'IMAGE_MAX_PIXELS', 25_000_000)
+
+
+def max_dimension():
+    return getattr(settings, 'IMAGE_MAX_DIMENSION', 2560)
+
+
+def read_size(head):
+    """(ширина, высота) по началу файла или None, если заголовка нет.
+
+    Пропускает DecompressionBombError: Pillow не открывает картинки
+    больше 2 * Image.MAX_IMAGE_PIXELS.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            return Image.open(BytesIO(head)).size
+    except Image.DecompressionBombError:
+        raise
+    except Exception:
+        return None
+
+
+def too_many_pixels(size=None):
+    limit = f'{max_pixels() / 10 ** 6:g} Мп'
+    if size is None:
+        return f'Картинка слишком большая: можно не больше {limit}.'
+    width, height = size
+    return (
+        f'Картинка слишком большая: {width}×{height}, '
+        f'можно не больше {limit}.'
+    )
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Потоковая загрузка во временный файл с ранними проверками."""
+
+    chunk_size = CHUNK_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.head = b''
+        self.size = None
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.error is None and self.received > max_size():
+            self.error = (
+                f'Файл больше {filesizeformat(max_size())}.'
+            )
+        if self.error is None and self.size is None:
+            self.check_header(raw_data)
+        if self.error is not None:
+            # Остаток файла читается из запроса, но не сохраняется.
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self, raw_data):
+        if len(self.head) >= HEADER_LIMIT:
+            return
+        self.head += raw_data[:HEADER_LIMIT - len(self.head)]
+        try:
+            self.size = read_size(self.head)
+        except Image.DecompressionBombError:
+            self.error = too_many_pixels()
+            return
+        if self.size is not None:
+            self.head = b''
+            if self.size[0] * self.size[1] > max_pixels():
+                self.error = too_many_pixels(self.size)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(self.received)
+        upload.upload_error = self.error
+        return upload
+
+
+def upload_error(upload):
+    """Ошибка, найденная ImageUploadHandler при приеме файла."""
+    return getattr(upload, 'upload_error', None)
+
+
+def _normalized_name(name, image_format):
+    stem, extension = os.path.splitext(name)
+    if image_format == 'JPEG':
+        extension = '.jpg'
+    return f'{stem}-normalized{extension}'
+
+
+def normalize(post_id, image_name):
+    """Поворот по EXIF, удаление EXIF и уменьшение оригинала.
+
+    Возвращает имя файла картинки поста: новое, если оригинал пришлось
+    пересохранить, иначе прежнее.
+    """
+    limit = max_dimension()
+    with default_storage.open(image_name, 'rb') as source:
+        image = Image.open(source)
+        image_format = image.format
+        oversized = max(image.size) > limit
+        has_exif = bool(image.info.get('exif')) or bool(image.getexif())
+        if image_format not in SAVE_OPTIONS or not (oversized or has_exif):
+            return image_name
+        if getattr(image, 'is_animated', False):
+            return image_name
+        if image_format == 'JPEG':
+            image.draft('RGB', (limit, limit))
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > limit:
+        image.thumbnail((limit, limit), Image.LANCZOS)
+    buffer = BytesIO()
+    # Без exif= Pillow не переносит метаданные в новый файл.
+    image.save(buffer, image_format, **SAVE_OPTIONS[image_format])
+    name = default_storage.save(
+        _normalized_name(image_name, image_format),
+        ContentFile(buffer.getvalue()),
+    )
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        image=name, updated_at=timezone.now()
+    )
+    if not updated:
+        # Картинку успели заменить — новая нормализуется своей задачей.
+        default_storage.delete(name)
+        return None
+    if not Post.objects.filter(image=image_name).exists():
+        default_storage.delete(image_name)
+    return name
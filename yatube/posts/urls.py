@@ -10,6 +10,11 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
@@ -23,5 +28,6 @@ urlpatterns = [
         name='profile_unfollow'
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
     path('', views.index, name='main'),
 ]
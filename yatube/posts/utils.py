@@ -1,10 +1,291 @@
-from django.core.paginator import Paginator
+import base64
+import inspect
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import (
+    EmptyPage, Page, PageNotAnInteger, Paginator
+)
+from django.db import DatabaseError, connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.inspect import method_has_no_args
+
+from .fragments import feed_timeout
 
 AMOUNT = 10
+# Ссылок на страницы по обе стороны от текущей.
+PAGE_WINDOW = 2
+COUNT_MODES = ('exact', 'cached', 'estimated', 'none')
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (ordering, pk) вместо OFFSET.
+
+    Страница выбирается условием по последней записи предыдущей
+    страницы, поэтому стоимость запроса не зависит от глубины.
+    COUNT(*) не выполняется: num_pages считается по соседям текущей
+    страницы.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, ordering='pub_date',
+                 cache_key=None):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.cache_key = cache_key
+        self.field = object_list.model._meta.get_field(ordering)
+        self.number = 1
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._has_next = False
+
+    @property
+    def num_pages(self):
+        return self.number + 1 if self._has_next else self.number
+
+    def encode_cursor(self, direction, obj):
+        value = self.field.value_to_string(obj)
+        raw = f'{direction}|{value}|{obj.pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        padded = cursor + '=' * (-len(cursor) % 4)
+        try:
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            direction, value, pk = raw.split('|')
+            if direction not in ('n', 'p'):
+                raise ValueError
+            return direction, self.field.to_python(value), int(pk)
+        except (ValueError, ValidationError):
+            return None
+
+    def ordered(self, queryset, decoded=None, tiebreak='pk'):
+        """queryset в порядке страницы, начиная с позиции курсора.
+
+        tiebreak — поле, совпадающее с pk поста (например, post_id у
+        записей ленты), чтобы курсоры разных источников были совместимы.
+        """
+        if decoded is None:
+            return queryset.order_by(f'-{self.ordering}', f'-{tiebreak}')
+        direction, value, pk = decoded
+        lookup = 'lt' if direction == 'n' else 'gt'
+        # Условие на ordering вынесено отдельно от OR: так база берет
+        # диапазон по индексу (..., ordering, id), а не объединяет два.
+        queryset = queryset.filter(
+            Q(**{f'{self.ordering}__{lookup}e': value}),
+            Q(**{f'{self.ordering}__{lookup}': value})
+            | Q(**{f'{tiebreak}__{lookup}': pk}),
+        )
+        if direction == 'n':
+            return queryset.order_by(f'-{self.ordering}', f'-{tiebreak}')
+        return queryset.order_by(self.ordering, tiebreak)
+
+    def window(self, decoded=None):
+        """До per_page + 1 записей от позиции курсора в его направлении."""
+        return list(
+            self.ordered(self.object_list, decoded)[:self.per_page + 1]
+        )
+
+    def page(self, cursor=None):
+        if self.cache_key is None:
+            return self.build_page(*self.fetch(cursor))
+        key = f'{self.cache_key}:{cursor or ""}'
+        cached = cache.get(key)
+        if cached is None:
+            rows, has_next, has_previous = self.fetch(cursor)
+            ids = [obj.pk for obj in rows]
+            cache.set(key, (ids, has_next, has_previous), feed_timeout())
+            return self.build_page(rows, has_next, has_previous)
+        ids, has_next, has_previous = cached
+        objects = self.object_list.in_bulk(ids)
+        rows = [objects[pk] for pk in ids if pk in objects]
+        return self.build_page(rows, has_next, has_previous)
+
+    def fetch(self, cursor=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        rows = self.window(decoded)
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if decoded is None:
+            return rows, more, False
+        if not rows:
+            return self.fetch()
+        if decoded[0] == 'n':
+            return rows, more, True
+        rows.reverse()
+        return rows, True, more
+
+    def build_page(self, rows, has_next, has_previous):
+        self.number = 2 if has_previous else 1
+        self._has_next = has_next
+        if rows:
+            self.next_cursor = (
+                self.encode_cursor('n', rows[-1]) if has_next else None
+            )
+            self.previous_cursor = (
+                self.encode_cursor('p', rows[0]) if has_previous else None
+            )
+        return Page(rows, self.number, self)
+
+
+def estimate_count(queryset):
+    """Оценка числа строк по статистике базы без COUNT(*).
+
+    Только для queryset без условий: статистика знает размер таблицы,
+    а не выборки. SQLite берет его из sqlite_stat1 (после ANALYZE),
+    PostgreSQL — из pg_class.reltuples. None, если оценки нет.
+    """
+    if not isinstance(queryset, QuerySet):
+        return None
+    query = queryset.query
+    if query.where.children or not query.can_filter() or query.distinct:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+                )
+                if cursor.fetchone() is None:
+                    return None
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0].split('.')[0])
+    return estimate if estimate >= 0 else None
+
+
+class WindowPaginator(Paginator):
+    """Нумерованные страницы без обязательного COUNT(*).
+
+    Страница читается с одной лишней записью: по ней видно, есть ли
+    следующая. Число записей нужно только для ссылки на последнюю
+    страницу и берется по count_mode: 'exact' — COUNT(*) на каждый
+    запрос, 'cached' — COUNT(*) раз в FEED_CACHE_TIMEOUT под cache_key,
+    'estimated' — оценка по статистике базы (иначе как 'cached'),
+    'none' — не считается. Навигация выводит только окно из
+    PAGE_WINDOW страниц по обе стороны от текущей.
+    """
+    windowed = True
+
+    def __init__(self, object_list, per_page, count_mode='cached',
+                 cache_key=None):
+        if count_mode not in COUNT_MODES:
+            raise ValueError(f'Неизвестный count_mode {count_mode!r}')
+        super().__init__(object_list, per_page)
+        self.count_mode = count_mode
+        self.cache_key = cache_key
+        self.number = 1
+        self._has_next = False
+
+    def exact_count(self):
+        count = getattr(self.object_list, 'count', None)
+        if (
+            callable(count) and not inspect.isbuiltin(count)
+            and method_has_no_args(count)
+        ):
+            return count()
+        return len(self.object_list)
+
+    @cached_property
+    def count(self):
+        if self.count_mode == 'estimated':
+            estimate = estimate_count(self.object_list)
+            if estimate is not None:
+                return estimate
+        if self.count_mode == 'exact' or self.cache_key is None:
+            return self.exact_count()
+        key = f'{self.cache_key}:count'
+        count = cache.get(key)
+        if count is None:
+            count = self.exact_count()
+            cache.set(key, count, feed_timeout())
+        return count
+
+    @property
+    def counted(self):
+        return self.count_mode != 'none'
+
+    @property
+    def num_pages(self):
+        if not self._has_next:
+            return self.number
+        known = 0
+        if self.counted:
+            known = ceil(self.count / self.per_page)
+        return max(known, self.number + 1)
+
+    @property
+    def window(self):
+        """Номера страниц для навигации вокруг текущей."""
+        return range(
+            max(1, self.number - PAGE_WINDOW),
+            min(self.num_pages, self.number + PAGE_WINDOW) + 1,
+        )
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На этой странице нет записей')
+        self.number = number
+        self._has_next = len(rows) > self.per_page
+        return Page(rows[:self.per_page], number, self)
+
+    def get_page(self, number):
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            # Ссылка на несуществующую страницу: ведем на последнюю.
+            last = max(1, ceil(self.exact_count() / self.per_page))
+            try:
+                return self.page(last)
+            except EmptyPage:
+                return self.page(1)
+
+
+def count_mode():
+    return getattr(settings, 'PAGINATOR_COUNT', 'cached')
+
 
+def Paginate(request, post_list, ordering=None, cache_key=None,
+             paginator=None, count=None):
+    """Возвращает страницу постов.
 
-def Paginate(request, post_list):
-    paginator = Paginator(post_list, AMOUNT)
+    Если передан ordering, используется курсорная пагинация по
+    ?cursor=; ссылки вида ?page=N обслуживает WindowPaginator, count —
+    его count_mode (по умолчанию settings.PAGINATOR_COUNT). С
+    cache_key список id постов страницы берется из кэша. paginator —
+    готовый курсорный пагинатор для лент с особым чтением.
+    """
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if ordering is None or page_number is not None:
+        paginator = WindowPaginator(
+            post_list, AMOUNT, count or count_mode(), cache_key
+        )
+        return paginator.get_page(page_number)
+    if paginator is None:
+        paginator = CursorPaginator(post_list, AMOUNT, ordering, cache_key)
+    return paginator.page(request.GET.get('cursor'))
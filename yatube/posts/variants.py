@@ -0,0 +1,80 @@
+"""Адаптивные варианты картинок постов для srcset и <picture>.
+
+Для каждой ширины из IMAGE_VARIANT_WIDTHS картинка кадрируется под
+пропорции карточки и сохраняется во всех форматах, которые умеет
+текущая сборка Pillow: AVIF, WebP и JPEG как запасной вариант.
+Файлы лежат рядом с кэшем sorl, в cache/variants/.
+"""
+import hashlib
+import json
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+CARD_RATIO = 339 / 960
+FORMATS = (
+    ('AVIF', 'image/avif', 'avif', {'quality': 50}),
+    ('WEBP', 'image/webp', 'webp', {'quality': 75, 'method': 4}),
+    ('JPEG', 'image/jpeg', 'jpg', {'quality': 80, 'optimize': True}),
+)
+
+
+def widths():
+    return getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 960))
+
+
+def supported_formats():
+    Image.init()
+    return [fmt for fmt in FORMATS if fmt[0] in Image.SAVE]
+
+
+def _encode(image, pil_format, options):
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(post):
+    """Сохраняет варианты картинки поста и возвращает их описание."""
+    digest = hashlib.sha1(post.image.name.encode()).hexdigest()[:10]
+    prefix = f'cache/variants/{post.pk}/{digest}'
+    variants = []
+    with post.image.open('rb') as source:
+        original = Image.open(source)
+        original.load()
+    original = original.convert('RGB')
+    for width in widths():
+        size = (width, round(width * CARD_RATIO))
+        resized = ImageOps.fit(original, size, Image.LANCZOS)
+        for pil_format, mime, extension, options in supported_formats():
+            name = f'{prefix}-{width}.{extension}'
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            name = default_storage.save(
+                name, ContentFile(_encode(resized, pil_format, options))
+            )
+            variants.append({
+                'type': mime,
+                'width': width,
+                'url': default_storage.url(name),
+            })
+    return variants
+
+
+def dumps(variants):
+    return json.dumps(variants, separators=(',', ':'))
+
+
+def srcsets(raw):
+    """Группирует варианты по типу: [(mime, 'url 320w, url 640w'), ...]."""
+    if not raw:
+        return []
+    grouped = {}
+    for variant in json.loads(raw):
+        grouped.setdefault(variant['type'], []).append(
+            f'{variant["url"]} {variant["width"]}w'
+        )
+    return [(mime, ', '.join(items)) for mime, items in grouped.items()]
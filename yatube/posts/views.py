@@ -1,7 +1,17 @@
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.decorators.cache import cache_page
-from .models import Post, Group, User, Follow
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+
+from core.conditional import conditional_page
+from core.db.retry import retry_on_busy
+from . import freshness, graph
+from .comments import CommentThread
+from .models import Post, User
+from .feed import FollowFeedPaginator
+from .fragments import feed_key
+from .search import SearchResults
 from .utils import Paginate
 from .forms import PostForm, CommentForm
 
@@ -9,20 +19,25 @@ from .forms import PostForm, CommentForm
 AMOUNT: int = 10
 
 
-@cache_page(20, key_prefix='index_page')
+@conditional_page(freshness.index_state)
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = Paginate(request, post_list)
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = Paginate(request, post_list, 'pub_date', feed_key('index'))
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(freshness.group_state)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = freshness.get_object_or_404(
+        request, freshness.group_queryset(), slug=slug
+    )
     post_list = group.posts.select_related('author')
-    page_obj = Paginate(request, post_list)
+    page_obj = Paginate(
+        request, post_list, 'pub_date', feed_key('group', group.pk)
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -30,45 +45,72 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(freshness.profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = freshness.get_object_or_404(
+        request, freshness.author_queryset(), username=username
+    )
     post = Post.objects.select_related('author', 'group').filter(author=author)
-    page_obj = Paginate(request, post)
-    user = request.user
-    if user is True:
-        following = Follow.objects.filter(user=request.user, author=author)
-        context = {
-            'page_obj': page_obj,
-            'author': author,
-            'following': following
-        }
-    else:
-        context = {
-            'page_obj': page_obj,
-            'author': author,
-        }
+    page_obj = Paginate(
+        request, post, 'pub_date', feed_key('profile', author.pk)
+    )
+    following = False
+    if request.user.is_authenticated:
+        following = graph.FollowGraph().is_following(
+            request.user.pk, author.pk
+        )
+    context = {
+        'page_obj': page_obj,
+        'author': author,
+        'following': following,
+    }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(freshness.post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = freshness.get_object_or_404(
+        request, freshness.post_queryset(), pk=post_id
+    )
     form = CommentForm()
-    comments = post.comments.all()
     author = False
     if post.author == request.user:
         author = True
     context = {
         'post': post,
         'form': form,
-        'comments': comments,
+        'thread': CommentThread(post.pk),
+        'comments_key': feed_key('comments', post.pk),
         'author': author
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@conditional_page(freshness.post_state)
+def post_comments(request, post_id):
+    """Следующая порция комментариев: HTML или, с ?format=json, JSON."""
+    post = freshness.get_object_or_404(
+        request, freshness.post_queryset(), pk=post_id
+    )
+    context = {
+        'post': post,
+        'thread': CommentThread(post.pk, request.GET.get('cursor')),
+        'comments_key': feed_key('comments', post.pk),
+    }
+    template = 'includes/comment_list.html'
+    if request.GET.get('format') != 'json':
+        return render(request, template, context)
+    thread = context['thread']
+    return JsonResponse({
+        'html': render_to_string(template, context, request),
+        'next': thread.next_cursor,
+    })
+
+
 @login_required
+@retry_on_busy
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     context = {'form': form}
     if not form.is_valid():
         return render(request, 'posts/create_post.html', context)
@@ -79,6 +121,7 @@ def post_create(request):
 
 
 @login_required
+@retry_on_busy
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if post.author != request.user:
@@ -99,6 +142,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_busy
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -112,28 +156,40 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post = Post.objects.filter(
-        author__following__user=request.user
+    paginator = FollowFeedPaginator(request.user, AMOUNT)
+    page_obj = Paginate(
+        request, paginator.post_list, 'pub_date', paginator=paginator
     )
-    page_obj = Paginate(request, post)
-    context = {'page_obj': page_obj}
+    context = {
+        'page_obj': page_obj,
+        'suggestions': graph.FollowGraph().suggested_authors(request.user.pk),
+    }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@retry_on_busy
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
-    if user != author:
-        Follow.objects.get_or_create(
-            user=user,
-            author=author
-        )
+    graph.follow(user, author)
     return redirect('posts:profile', username=author.username)
 
 
 @login_required
+@retry_on_busy
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    graph.unfollow(request.user, author)
     return redirect('posts:main')
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = Paginate(request, SearchResults(query))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
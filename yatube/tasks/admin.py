@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'created',
+        'finished_at',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    readonly_fields = ('created', 'finished_at', 'locked_by', 'locked_at')
+
+
+admin.site.register(Task, TaskAdmin)
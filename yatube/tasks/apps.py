@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    name = 'tasks'
+    verbose_name = 'Фоновые задачи'
+
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+
+        # Задачи приложений объявлены в их модулях tasks.py.
+        autodiscover_modules('tasks')
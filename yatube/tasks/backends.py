@@ -0,0 +1,53 @@
+"""Куда delay отправляет задачу.
+
+DatabaseBackend пишет строку в таблицу Task в текущей транзакции:
+задача появится в очереди, только если зафиксирована запись, которая ее
+породила, а откат запроса отменит и ее. Постановка — один INSERT,
+сколько бы работы ни стояло за задачей; выполняет ее run_worker.
+
+EagerBackend выполняет задачу сразу в текущем процессе — для тестов и
+разработки без отдельного исполнителя. Ключи идемпотентности в нем не
+проверяются, исключения задачи пробрасываются вызывающему.
+"""
+import json
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'tasks.backends.DatabaseBackend'
+
+
+def dumps(args, kwargs):
+    return json.dumps([list(args), kwargs], ensure_ascii=False)
+
+
+class EagerBackend:
+    def enqueue(self, task, args, kwargs, key=None):
+        # Через JSON, как в очереди: несериализуемые аргументы видны
+        # уже в тестах.
+        args, kwargs = json.loads(dumps(args, kwargs))
+        task.func(*args, **kwargs)
+
+
+class DatabaseBackend:
+    def enqueue(self, task, args, kwargs, key=None):
+        from .models import Task
+
+        row = Task(
+            name=task.name,
+            payload=dumps(args, kwargs),
+            key=key,
+            max_attempts=task.max_attempts,
+        )
+        if key is None:
+            row.save()
+        else:
+            # Повтор ключа молча отбрасывает уникальный индекс.
+            Task.objects.bulk_create([row], ignore_conflicts=True)
+        return row
+
+
+def get_backend():
+    return import_string(
+        getattr(settings, 'TASKS_BACKEND', DEFAULT_BACKEND)
+    )()
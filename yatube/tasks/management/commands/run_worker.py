@@ -0,0 +1,43 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди в базе. Останавливается по '
+        'SIGTERM или Ctrl+C, доделав текущую пачку.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=2,
+            help='Число процессов, выполняющих задачи.',
+        )
+        parser.add_argument(
+            '--batch', type=int,
+            help='Сколько задач забирать за раз (по умолчанию 4 на процесс).',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            processes=max(options['processes'], 1),
+            batch=options['batch'],
+            poll=options['poll'],
+        )
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        processed = worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {processed}'
+        ))
@@ -0,0 +1,51 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы (JSON)')
+    key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text='Задача с тем же ключом второй раз не ставится',
+    )
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток', default=5)
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    locked_by = models.CharField('Исполнитель', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Поставлена', auto_now_add=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            # Выборка исполнителя: готовые к запуску по порядку.
+            models.Index(
+                fields=['status', 'run_at', 'id'],
+                name='task_status_run_at_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
@@ -0,0 +1,63 @@
+"""Объявление фоновых задач.
+
+    @task(max_attempts=3)
+    def fan_out_post(post_id):
+        ...
+
+    fan_out_post.delay(post.pk, key=f'fan_out:{post.pk}')
+
+delay передает вызов бэкенду из settings.TASKS_BACKEND: в очередь в
+базе или, в синхронном режиме, сразу на выполнение. Аргументы
+сериализуются в JSON, поэтому передавать нужно id и строки, а не
+объекты моделей. Имя задачи — путь к функции, под ним ее находит
+исполнитель.
+"""
+from django.conf import settings
+
+registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts, backoff):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<task {self.name}>'
+
+    def delay(self, *args, key=None, **kwargs):
+        """Ставит вызов в очередь; key — ключ идемпотентности."""
+        from .backends import get_backend
+
+        return get_backend().enqueue(self, args, kwargs, key=key)
+
+    def retry_delay(self, attempt):
+        """Пауза в секундах перед повтором после attempt-й попытки."""
+        limit = getattr(settings, 'TASKS_MAX_BACKOFF', 600)
+        return min(self.backoff * 2 ** (attempt - 1), limit)
+
+
+def task(func=None, *, name=None, max_attempts=5, backoff=2):
+    """Регистрирует функцию как фоновую задачу."""
+    if func is None:
+        return lambda func: task(
+            func, name=name, max_attempts=max_attempts, backoff=backoff
+        )
+    wrapper = TaskFunction(
+        func,
+        name or f'{func.__module__}.{func.__qualname__}',
+        max_attempts,
+        backoff,
+    )
+    registry[wrapper.name] = wrapper
+    return wrapper
+
+
+def get(name):
+    return registry.get(name)
@@ -0,0 +1,233 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.metrics import thumbnail_timer
+from posts.models import FeedItem, Follow, Group, Post
+from tasks.models import Task
+from tasks.registry import task
+from tasks.worker import Worker, purge_done, requeue_stale
+
+User = get_user_model()
+
+DATABASE = 'tasks.backends.DatabaseBackend'
+# Исполнитель сохраняет метрики в файлы; в тестах — во временный каталог.
+WORKER_METRICS = os.path.join(tempfile.gettempdir(), 'yatube-worker-metrics')
+calls = []
+
+
+@task(name='tasks.tests.remember')
+def remember(value, extra=None):
+    calls.append((value, extra))
+
+
+@task(name='tasks.tests.broken', max_attempts=2, backoff=30)
+def broken():
+    raise ValueError('сломано')
+
+
+@task(name='tasks.tests.timed')
+def timed():
+    with thumbnail_timer():
+        pass
+
+
+@task(name='tasks.tests.create_group')
+def create_group(slug):
+    Group.objects.create(title=slug, slug=slug)
+
+
+class EagerBackendTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    @override_settings(TASKS_BACKEND='tasks.backends.EagerBackend')
+    def test_runs_immediately(self):
+        """ тестируем синхронный режим """
+        remember.delay(1, extra='x', key='one')
+        self.assertEqual(calls, [(1, 'x')])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_BACKEND='tasks.backends.EagerBackend')
+    def test_arguments_must_be_json(self):
+        """ тестируем, что аргументы проверяются и в синхронном режиме """
+        with self.assertRaises(TypeError):
+            remember.delay(object())
+
+
+@override_settings(TASKS_BACKEND=DATABASE, METRICS_WORKER_DIR=WORKER_METRICS)
+class DatabaseBackendTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_worker(self):
+        return Worker(poll=0).run(once=True)
+
+    def test_enqueue_and_run(self):
+        """ тестируем постановку в очередь и выполнение """
+        remember.delay(1, extra='x')
+        self.assertEqual(calls, [])
+        self.assertEqual(self.run_worker(), 1)
+        self.assertEqual(calls, [(1, 'x')])
+        stored = Task.objects.get()
+        self.assertEqual(stored.status, Task.DONE)
+        self.assertEqual(stored.attempts, 1)
+
+    def test_worker_exports_metrics(self):
+        """ тестируем файл с метриками миниатюр исполнителя """
+        shutil.rmtree(WORKER_METRICS, ignore_errors=True)
+        timed.delay()
+        self.run_worker()
+        path = os.path.join(WORKER_METRICS, f'{os.getpid()}.json')
+        with open(path) as stream:
+            self.assertTrue(json.load(stream)['thumbnails'])
+
+    def test_idempotency_key(self):
+        """ тестируем, что задача с тем же ключом ставится один раз """
+        remember.delay(1, key='same')
+        remember.delay(2, key='same')
+        self.run_worker()
+        remember.delay(3, key='same')
+        self.run_worker()
+        self.assertEqual(calls, [(1, None)])
+
+    def test_rollback_drops_task(self):
+        """ тестируем, что откат транзакции отменяет задачу """
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                remember.delay(1)
+                raise RuntimeError
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_with_backoff(self):
+        """ тестируем повтор упавшей задачи с паузой """
+        broken.delay()
+        before = timezone.now()
+        self.run_worker()
+        stored = Task.objects.get()
+        self.assertEqual(stored.status, Task.QUEUED)
+        self.assertIn('сломано', stored.last_error)
+        self.assertGreaterEqual(
+            stored.run_at, before + timedelta(seconds=30)
+        )
+        # Пауза еще не прошла — исполнитель задачу не берет.
+        self.assertEqual(self.run_worker(), 0)
+
+        Task.objects.update(run_at=timezone.now())
+        self.run_worker()
+        stored.refresh_from_db()
+        self.assertEqual(stored.status, Task.FAILED)
+        self.assertEqual(stored.attempts, 2)
+        self.assertIsNotNone(stored.finished_at)
+
+    def test_unknown_task_fails(self):
+        """ тестируем задачу, которой нет в реестре """
+        Task.objects.create(name='nowhere', payload='[[], {}]')
+        self.run_worker()
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_requeue_stale(self):
+        """ тестируем возврат задач пропавшего исполнителя """
+        long_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.create(
+            name=remember.name, payload='[[1], {}]', status=Task.RUNNING,
+            attempts=1, locked_by='gone', locked_at=long_ago,
+        )
+        Task.objects.create(
+            name=remember.name, payload='[[2], {}]', status=Task.RUNNING,
+            attempts=5, locked_by='gone', locked_at=long_ago,
+        )
+        self.assertEqual(requeue_stale(), 2)
+        self.assertEqual(
+            sorted(Task.objects.values_list('status', flat=True)),
+            [Task.FAILED, Task.QUEUED],
+        )
+        self.run_worker()
+        self.assertEqual(calls, [(1, None)])
+
+    def test_purge_done(self):
+        """ тестируем удаление старых выполненных задач """
+        Task.objects.create(
+            name=remember.name, payload='[[], {}]', status=Task.DONE,
+            finished_at=timezone.now() - timedelta(days=2),
+        )
+        Task.objects.create(
+            name=remember.name, payload='[[], {}]', status=Task.DONE,
+            finished_at=timezone.now(),
+        )
+        self.assertEqual(purge_done(), 1)
+        self.assertEqual(Task.objects.count(), 1)
+
+
+@override_settings(TASKS_BACKEND=DATABASE, METRICS_WORKER_DIR=WORKER_METRICS)
+class PostSideEffectsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.followers = [
+            User.objects.create(username=f'follower{number}')
+            for number in range(30)
+        ]
+
+    def create_post(self):
+        client = self.client
+        client.force_login(self.author)
+        with CaptureQueriesContext(connection) as context:
+            client.post(reverse('posts:post_create'), {'text': 'пост'})
+        return len(context)
+
+    def test_fan_out_runs_in_worker(self):
+        """ тестируем раскладку по лентам в исполнителе """
+        Follow.objects.bulk_create(
+            Follow(user=user, author=self.author) for user in self.followers
+        )
+        self.create_post()
+        self.assertFalse(FeedItem.objects.exists())
+        self.assertTrue(Task.objects.filter(status=Task.QUEUED).exists())
+        Worker(poll=0).run(once=True)
+        self.assertEqual(FeedItem.objects.count(), len(self.followers))
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
+
+    def test_create_post_constant_queries(self):
+        """ тестируем, что запросов не больше при множестве подписчиков """
+        Follow.objects.create(user=self.followers[0], author=self.author)
+        few = self.create_post()
+        Follow.objects.bulk_create(
+            Follow(user=user, author=self.author)
+            for user in self.followers[1:]
+        )
+        self.assertEqual(self.create_post(), few)
+
+    def test_backfill_skips_removed_follow(self):
+        """ тестируем, что отписка до выполнения отменяет заполнение """
+        Post.objects.create(author=self.author, text='старый')
+        Worker(poll=0).run(once=True)
+        follow = Follow.objects.create(
+            user=self.followers[0], author=self.author
+        )
+        follow.delete()
+        Worker(poll=0).run(once=True)
+        self.assertFalse(FeedItem.objects.exists())
+
+
+@override_settings(TASKS_BACKEND=DATABASE, METRICS_WORKER_DIR=WORKER_METRICS)
+class ProcessPoolTests(TransactionTestCase):
+    def test_pool_runs_all_tasks(self):
+        """ тестируем выполнение задач в пуле процессов """
+        for number in range(12):
+            create_group.delay(f'group-{number}')
+        processed = Worker(processes=3, batch=5, poll=0).run(once=True)
+        self.assertEqual(processed, 12)
+        self.assertEqual(Group.objects.count(), 12)
+        self.assertEqual(
+            Task.objects.filter(status=Task.DONE).count(), 12
+        )
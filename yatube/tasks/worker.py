@@ -0,0 +1,221 @@
+"""Исполнитель очереди задач в базе.
+
+Цикл Worker.run: вернуть в очередь задачи, исполнитель которых пропал
+(взяты дольше TASKS_LOCK_TIMEOUT секунд назад), забрать пачку готовых
+к запуску и выполнить ее — в пуле процессов или, с processes=1, в
+текущем. Задача забирается условным UPDATE по status='queued', поэтому
+два исполнителя одну задачу не получат; блокировки вида
+SELECT ... FOR UPDATE SKIP LOCKED не нужны, и это работает на SQLite.
+
+Задача выполняется в транзакции. Если она упала, то ставится на
+повтор через TaskFunction.retry_delay, а после max_attempts попыток
+помечается failed. Выполненные задачи хранятся TASKS_KEEP_DONE секунд,
+пока действуют их ключи идемпотентности, затем удаляются.
+"""
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import metrics
+
+from . import registry
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def lock_timeout():
+    return timedelta(seconds=getattr(settings, 'TASKS_LOCK_TIMEOUT', 600))
+
+
+def requeue_stale(now=None):
+    """Возвращает в очередь задачи пропавших исполнителей."""
+    now = now or timezone.now()
+    stale = Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=now - lock_timeout()
+    )
+    exhausted = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED,
+        locked_by='',
+        finished_at=now,
+        last_error='Исполнитель не завершил задачу',
+    )
+    return exhausted + stale.update(
+        status=Task.QUEUED,
+        locked_by='',
+        locked_at=None,
+        last_error='Исполнитель не завершил задачу',
+    )
+
+
+def claim(worker_id, limit):
+    """Забирает до limit задач, готовых к запуску; возвращает их id."""
+    now = timezone.now()
+    ids = list(
+        Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        .order_by('run_at', 'id').values_list('pk', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    token = f'{worker_id}:{uuid.uuid4().hex[:8]}'
+    Task.objects.filter(pk__in=ids, status=Task.QUEUED).update(
+        status=Task.RUNNING,
+        locked_by=token,
+        locked_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return list(
+        Task.objects.filter(pk__in=ids, locked_by=token)
+        .order_by('run_at', 'id').values_list('pk', flat=True)
+    )
+
+
+def fail(task, func, error):
+    now = timezone.now()
+    if func is None or task.attempts >= task.max_attempts:
+        changes = {'status': Task.FAILED, 'finished_at': now}
+    else:
+        changes = {
+            'status': Task.QUEUED,
+            'run_at': now + timedelta(
+                seconds=func.retry_delay(task.attempts)
+            ),
+        }
+    Task.objects.filter(pk=task.pk).update(
+        locked_by='', locked_at=None, last_error=error, **changes
+    )
+
+
+def execute(task_id):
+    """Выполняет взятую задачу; True, если она завершилась успешно."""
+    try:
+        return run_task(task_id)
+    finally:
+        # Гистограммы процесса видны на /metrics/ только через файл.
+        metrics.registry.maybe_flush_worker()
+
+
+def run_task(task_id):
+    task = Task.objects.filter(pk=task_id, status=Task.RUNNING).first()
+    if task is None:
+        return False
+    func = registry.get(task.name)
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {task.name}')
+        args, kwargs = json.loads(task.payload)
+        with transaction.atomic():
+            func.func(*args, **kwargs)
+    except Exception:
+        logger.exception(
+            'Задача %s #%s упала (попытка %s из %s)',
+            task.name, task.pk, task.attempts, task.max_attempts,
+        )
+        fail(task, func, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=task.pk).update(
+        status=Task.DONE,
+        locked_by='',
+        locked_at=None,
+        finished_at=timezone.now(),
+        last_error='',
+    )
+    return True
+
+
+def purge_done(now=None):
+    """Удаляет выполненные задачи старше TASKS_KEEP_DONE секунд."""
+    now = now or timezone.now()
+    keep = timedelta(seconds=getattr(settings, 'TASKS_KEEP_DONE', 86400))
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE, finished_at__lt=now - keep
+    ).delete()
+    return deleted
+
+
+def forget_connections():
+    # Соединения, унаследованные при fork, закрывать нельзя: закрылись
+    # бы и дескрипторы родителя. Дочерний процесс откроет свои.
+    for connection in connections.all():
+        connection.connection = None
+
+
+class Worker:
+    # Как часто возвращать брошенные задачи и чистить выполненные.
+    MAINTENANCE_INTERVAL = 60
+
+    def __init__(self, processes=1, batch=None, poll=1.0, name=None):
+        self.processes = processes
+        self.batch = batch or processes * 4
+        self.poll = poll
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        self.pool = None
+        self.last_maintenance = None
+
+    def stop(self, *args):
+        """Завершает работу после текущей пачки; годится для signal."""
+        self.stopping = True
+
+    def close_old_connections(self):
+        # Как после запроса: по CONN_MAX_AGE и после ошибок. Открытую
+        # транзакцию (в тестах) не трогаем.
+        for connection in connections.all():
+            if not connection.in_atomic_block:
+                connection.close_if_unusable_or_obsolete()
+
+    def run_batch(self):
+        """Выполняет одну пачку задач, возвращает их число."""
+        self.close_old_connections()
+        if self.last_maintenance is None or (
+            time.monotonic() - self.last_maintenance
+            > self.MAINTENANCE_INTERVAL
+        ):
+            requeue_stale()
+            purge_done()
+            self.last_maintenance = time.monotonic()
+        ids = claim(self.name, self.batch)
+        if self.pool is None:
+            for task_id in ids:
+                execute(task_id)
+        else:
+            self.pool.map(execute, ids, chunksize=1)
+        return len(ids)
+
+    def run(self, once=False):
+        """Работает до stop(); с once — пока в очереди есть задачи."""
+        if self.processes > 1:
+            connections.close_all()
+            self.pool = Pool(self.processes, initializer=forget_connections)
+        processed = 0
+        try:
+            while not self.stopping:
+                done = self.run_batch()
+                processed += done
+                if done:
+                    continue
+                if once:
+                    break
+                time.sleep(self.poll)
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+            elif metrics.registry.unsaved:
+                try:
+                    metrics.registry.flush_worker()
+                except OSError:
+                    logger.exception('Не удалось сохранить метрики')
+        return processed
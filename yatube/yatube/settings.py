@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -46,11 +47,16 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'tasks.apps.TasksConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.conditional.PublicCacheMiddleware',
+    'core.db.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,12 +74,24 @@ INTERNAL_IPS = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Шаблоны компилируются один раз на процесс. Для правки шаблонов без
+# перезапуска сервера — YATUBE_TEMPLATE_CACHE=0.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if os.getenv('YATUBE_TEMPLATE_CACHE', '1') == '1':
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+# Шаблоны debug_toolbar находит app_directories.Loader внутри cached.
+SILENCED_SYSTEM_CHECKS = ['debug_toolbar.W006']
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.InstrumentedTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -91,12 +109,52 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# SQLite для одновременных запросов (core.db.sqlite3): WAL, PRAGMA на
+# каждом подключении и BEGIN IMMEDIATE, чтобы писатели ждали друг друга
+# busy_timeout, а не падали с «database is locked».
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_CONN_MAX_AGE', 60)),
+        # Тестовая база — файл, чтобы тесты реплик работали с двумя
+        # файлами SQLite, как в продакшене.
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
+        'OPTIONS': {
+            'pragmas': SQLITE_PRAGMAS,
+            'immediate_transactions': True,
+        },
     }
 }
+# Реплики только для чтения: YATUBE_DB_REPLICAS=replica1,replica2 —
+# файлы BASE_DIR/<alias>.sqlite3, которые наполняет внешняя репликация.
+# GET-запросы читают с них (core.db.routers), после записи клиент
+# REPLICA_STICKY_SECONDS секунд читает из основной базы.
+DATABASE_REPLICAS = [
+    alias for alias in os.getenv('YATUBE_DB_REPLICAS', '').split(',')
+    if alias
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
+
+# Повторы записи, если блокировку не удалось получить за busy_timeout.
+DB_RETRY_ATTEMPTS = 5
+DB_RETRY_DELAY = 0.05
 
 
 # Password validation
@@ -152,11 +210,128 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    },
-    'test': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    },
+# Кэш выбирается переменными окружения:
+# YATUBE_CACHE_BACKEND — locmem, file, memcached или redis;
+# YATUBE_CACHE_LOCATION — путь, адрес memcached или redis://host:port/db;
+# YATUBE_CACHE_TIERED=1 — локальный LRU перед общим кэшем.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'redis': 'core.cache.redis.RedisCache',
+}
+CACHE_BACKEND = os.getenv('YATUBE_CACHE_BACKEND', 'locmem')
+CACHE_LOCATIONS = {
+    'locmem': '',
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'memcached': '127.0.0.1:11211',
+    'redis': 'redis://127.0.0.1:6379/0',
+}
+SHARED_CACHE = {
+    'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+    'LOCATION': os.getenv(
+        'YATUBE_CACHE_LOCATION', CACHE_LOCATIONS[CACHE_BACKEND]
+    ),
+    'KEY_PREFIX': 'yatube',
+    'VERSION': int(os.getenv('YATUBE_CACHE_VERSION', 1)),
+    'OPTIONS': {},
+}
+if CACHE_BACKEND == 'redis':
+    SHARED_CACHE['OPTIONS'] = {'MAX_CONNECTIONS': 20, 'SOCKET_TIMEOUT': 1}
+
+if os.getenv('YATUBE_CACHE_TIERED') == '1':
+    CACHES = {
+        'backend': {
+            'BACKEND': 'core.cache.tiered.TieredCache',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_TIMEOUT': 2,
+                'MAX_LOCAL_ENTRIES': 1000,
+            },
+        },
+        'shared': SHARED_CACHE,
+    }
+else:
+    CACHES = {'backend': SHARED_CACHE}
+
+# Снаружи — обертка, считающая попадания и промахи для метрик.
+CACHES['default'] = {
+    'BACKEND': 'core.cache.instrumented.InstrumentedCache',
+    'OPTIONS': {'TARGET': 'backend'},
+}
+
+CACHES['test'] = {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+FEED_FANOUT_LIMIT = 1000
+FEED_CACHE_TIMEOUT = 300
+# Как ленты с ?page=N узнают число постов для ссылки «Последняя»:
+# 'exact', 'cached', 'estimated' или 'none' (см. posts.utils).
+PAGINATOR_COUNT = 'cached'
+# Комментариев на странице поста и в каждой подгружаемой порции.
+COMMENTS_PER_PAGE = 20
+# Множества подписок и подписчиков (posts.graph) больше лимита не
+# кэшируются.
+FOLLOW_GRAPH_CACHE_LIMIT = 10000
+FOLLOW_GRAPH_TIMEOUT = 24 * 60 * 60
+
+# Загрузки пишутся во временный файл кусками (posts.uploads); размер
+# файла и габариты картинки из заголовка проверяются на лету. Оригинал
+# больше IMAGE_MAX_DIMENSION по большей стороне уменьшается в фоне.
+FILE_UPLOAD_HANDLERS = ['posts.uploads.ImageUploadHandler']
+UPLOAD_MAX_SIZE = 10 * 2 ** 20
+IMAGE_MAX_PIXELS = 25_000_000
+IMAGE_MAX_DIMENSION = 2560
+
+# Миниатюры считаются фоновой задачей; THUMBNAIL_ASYNC = False —
+# синхронно в запросе.
+THUMBNAIL_ASYNC = True
+# Ширины адаптивных вариантов картинок (srcset).
+IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+
+# Поиск: 'auto' — FTS5 на SQLite, иначе обратный индекс SearchTerm.
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_RESULTS = 1000
+
+# Cache-Control публичных страниц для анонимов: браузер перепроверяет
+# страницу по ETag каждый раз, CDN и прокси держат ее s-maxage секунд.
+PUBLIC_CACHE_MAX_AGE = 0
+PUBLIC_CACHE_S_MAXAGE = 60
+
+# Метрики запросов: подробности (SQL, шаблоны, кэш) и Server-Timing
+# для доли запросов METRICS_SAMPLE_RATE; /metrics/ в формате
+# Prometheus доступен только адресам из METRICS_ALLOWED_IPS.
+METRICS_SAMPLE_RATE = 0.05
+METRICS_SERVER_TIMING = True
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+# Метрики процессов run_worker (миниатюры) — файлы, которые /metrics/
+# складывает с меткой source="worker"; старше MAX_AGE не учитываются.
+METRICS_WORKER_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_WORKER_FLUSH_INTERVAL = 15
+METRICS_WORKER_MAX_AGE = 24 * 60 * 60
+
+# Фоновые задачи (раскладка по лентам, поисковый индекс, миниатюры).
+# По умолчанию database — очередь в базе, которую выполняет
+# manage.py run_worker. Тесты (manage.py test и pytest) выполняют
+# задачи сразу (eager): им нужны побочные эффекты в том же запросе.
+# Для разработки без исполнителя — YATUBE_TASKS_BACKEND=eager.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+TASKS_BACKENDS = {
+    'database': 'tasks.backends.DatabaseBackend',
+    'eager': 'tasks.backends.EagerBackend',
 }
+TASKS_BACKEND = TASKS_BACKENDS[os.getenv(
+    'YATUBE_TASKS_BACKEND', 'eager' if TESTING else 'database'
+)]
+# Задача, взятая исполнителем дольше этого, возвращается в очередь.
+TASKS_LOCK_TIMEOUT = 600
+# Предел паузы между повторами упавшей задачи.
+TASKS_MAX_BACKOFF = 600
+# Сколько хранить выполненные задачи (и действуют их ключи).
+TASKS_KEEP_DONE = 24 * 60 * 60
+
+# Журнал медленных запросов и сводка по отпечаткам SQL (query_report).
+SLOW_QUERY_MS = 100
+QUERY_LOG_DIR = os.path.join(BASE_DIR, 'querylog')
+QUERY_LOG_FLUSH_INTERVAL = 60
@@ -3,6 +3,8 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics
+
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 handler403 = 'core.views.permission_denied'
@@ -13,6 +15,8 @@ urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
+    path('api/', include('api.urls', namespace='api')),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 if settings.DEBUG: